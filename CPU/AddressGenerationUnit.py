@@ -1,24 +1,67 @@
 class AGU:
+    OPERATORS = {'+': 0, # In operator : prescedence pairs
+                 '-': 0,
+                 '*': 1,
+                 '/': 1}
+
     def __init__(self, registers: dict):
         self.Registers = registers
+        self._compiledAddresses = {} # {address: function returning memory address}, so each address is only compiled once
 
     """
     Converts an direct/indirect address into a memory address value
     (e.g: [rbx+rcx+5] -> 15 (when rbx = 8 and rcx = 2))
     INPUTS: str address ([rbx+rcx+5])
-    RETURNS: str memory address ([15]) 
+    RETURNS: int memory address (15)
     """
     def Generate(self, address: str) -> int:
-        operators = {'+': 0, # In operator : prescedence pairs
-                     '-': 0,
-                     '*': 1,
-                     '/': 1}
+        compiledAddress = self._compiledAddresses.get(address)
+        if compiledAddress is None:
+            compiledAddress = self.Compile(address)
+            self._compiledAddresses[address] = compiledAddress
+        return compiledAddress()
+
+    """
+    Compiles an address into a function that works out the memory address from the current register values
+    Addresses of the form [base + index*scale + displacement] compile to a function doing just that sum,
+    anything else compiles to a function that evaluates the address's RPN expression
+    INPUTS: str address ([rbx+rcx*2+5])
+    RETURNS: function () -> int memory address
+    """
+    def Compile(self, address: str):
+        rpnExpression = self.ConvertToRPN(address)
+        load = self.Registers.Load
+
+        linearAddress = self.ReduceToLinear(rpnExpression)
+        if linearAddress is None:
+            return lambda: self.EvaluateRPN(rpnExpression)
+
+        registers, displacement = linearAddress
+        registers = [(register, scale) for register, scale in registers.items() if scale != 0]
+        match registers:
+            case []:
+                return lambda: displacement
+            case [(base, 1)]:
+                return lambda: load(base) + displacement
+            case [(index, scale)]:
+                return lambda: load(index) * scale + displacement
+            case [(base, 1), (index, scale)] | [(index, scale), (base, 1)]:
+                return lambda: load(base) + load(index) * scale + displacement
+            case _:
+                return lambda: sum(load(register) * scale for register, scale in registers) + displacement
+
+    """
+    Converts an address into an RPN expression, using Shunting Yard
+    INPUTS: str address ([rbx+rcx+5])
+    RETURNS: list RPN expression (['rbx', 'rcx', '+', 5, '+']), where registers are str names and immediate values are ints
+    """
+    def ConvertToRPN(self, address: str) -> list:
         # Strip []s, remove spaces
         rawInfixExpression = "".join(filter(lambda x: x != ' ', address.strip("[]")))
         # Split operators and values into list (e.g: ['rax', '+', '15'])
         infixExpression = ['']
         for char in rawInfixExpression:
-            if char in operators.keys():
+            if char in self.OPERATORS.keys():
                 infixExpression.append(char)
                 infixExpression.append('') # Don't need to worry about this happening last, as infix expression can't end w/ operator
             else:
@@ -30,14 +73,14 @@ class AGU:
         # Iterate over tokens
         for token in infixExpression:
             # If operator,
-            if token in operators.keys():
+            if token in self.OPERATORS.keys():
                 # If op stack empty, add to stack
                 if len(operatorStack) == 0:
                     operatorStack.append(token)
                 else:
                     # Peek at operator stack
                     # If lower/equal prescedence than top stack operator, pop operator to queue
-                    if operators[token] <= operators[operatorStack[-1]]:
+                    if self.OPERATORS[token] <= self.OPERATORS[operatorStack[-1]]:
                         rpnExpression.append(operatorStack.pop())
 
                     # Push token to stack
@@ -45,30 +88,69 @@ class AGU:
 
             # If non-operator,
             else:
-                # If token is register, find its value, and convert from list to int
+                # If token is register, keep its name (value is found when address is generated)
                 if token.startswith('r') or token.startswith('e'):
-                    operand = 0
-                    register = self.Registers.Load(token)
-                    if type(register) == int:
-                        operand = register
-                    else:
-                        for index, byte in enumerate(register):
-                            operand += byte * 2**index
-
+                    rpnExpression.append(token)
                 # If immediate value, convert to int
                 else:
-                    operand = int(token)
-                # Add to output queue
-                rpnExpression.append(operand)
+                    rpnExpression.append(int(token))
         # At end, pop rest of operator stack to queue
         rpnExpression += reversed(operatorStack)
+        return rpnExpression
+
+    """
+    Tries to reduce an RPN expression to the form (r1*s1 + r2*s2 + .. + displacement)
+    INPUTS: list RPN expression
+    RETURNS: tuple (dict {register: scale}, int displacement), or None if expression isn't of that form (e.g: rax*rbx)
+    """
+    def ReduceToLinear(self, rpnExpression: list) -> tuple|None:
+        operandStack = []
+        for token in rpnExpression:
+            # Each operand is ({register: scale}, displacement)
+            if type(token) is int:
+                operandStack.append(({}, token))
+            elif token not in self.OPERATORS.keys():
+                operandStack.append(({token: 1}, 0))
+            # When an operator is selected, pop 2 off stack, combine them, then push back to stack
+            else:
+                (registers2, displacement2) = operandStack.pop()
+                (registers1, displacement1) = operandStack.pop()
+                match token:
+                    case '+' | '-':
+                        sign = 1 if token == '+' else -1
+                        registers = dict(registers1)
+                        for register, scale in registers2.items():
+                            registers[register] = registers.get(register, 0) + sign * scale
+                        result = (registers, displacement1 + sign * displacement2)
+                    case '*':
+                        # Can only scale by a constant
+                        if registers1 and registers2:
+                            return None
+                        if registers1:
+                            result = ({register: scale * displacement2 for register, scale in registers1.items()}, displacement1 * displacement2)
+                        else:
+                            result = ({register: scale * displacement1 for register, scale in registers2.items()}, displacement1 * displacement2)
+                    case '/':
+                        # Can only divide constants (dividing a register isn't linear)
+                        if registers1 or registers2:
+                            return None
+                        result = ({}, displacement1 // displacement2)
+                operandStack.append(result)
+        return operandStack[0]
 
-        # Evaluate RPN expression
+    """
+    Evaluates an RPN expression using the current register values
+    INPUTS: list RPN expression
+    RETURNS: int result
+    """
+    def EvaluateRPN(self, rpnExpression: list) -> int:
         operandStack = []
         for token in rpnExpression:
-            # Add operands to stack
+            # Add operands to stack (registers are replaced with their value)
             if type(token) is int:
                 operandStack.append(token)
+            elif token not in self.OPERATORS.keys():
+                operandStack.append(self.Registers.Load(token))
             # When an operator is selected, pop 2 off stack, perform operation (in correct order), then push back to stack
             else:
                 # Remember, "op1 op2 -" -> "op1 - op2", even though op2 is on top of the stack
@@ -82,9 +164,7 @@ class AGU:
                     case '*':
                         result = op1 * op2
                     case '/':
-                        result = op1 / op2
+                        result = op1 // op2 # Addresses are whole numbers
                 operandStack.append(result)
         # Final item in stack = address
-        generatedAddress = operandStack[0]
-        return f"[{generatedAddress}]"
-        
\ No newline at end of file
+        return operandStack[0]
@@ -1,3 +1,5 @@
+from array import array
+from CPU.MicroOps import Opcode, MicroOp
 """
 Buffer - Temporary storage space, of fixed size 
 DATA:
@@ -11,6 +13,8 @@ Update (a specific index in buffer)
 Get (a specific index in buffer)
 Get Whole Buffer (in order)
 GetNumberOfFreeSpaces (left)
+GetCapacity (no. entries buffer was created with)
+GetState/SetState (for checkpointing)
 """
 
 class Buffer:
@@ -27,6 +31,12 @@ class Buffer:
     def GetNumberOfFreeSpaces(self) -> int:
         raise NotImplementedError()
 
+    """
+    RETURNS: int no. entries buffer was created with (e.g: no. bits, for the GHR)
+    """
+    def GetCapacity(self) -> int:
+        return self._SIZE
+
     """
     Retrieves an item in the buffer queue at a specified index
     INPUTS: int index (defaults to front)
@@ -67,10 +77,30 @@ class Buffer:
     def Flush(self):
         raise NotImplementedError()
 
+    """
+    Returns buffer to the state it was created in
+    """
+    def Reset(self):
+        self._Buffer = [{} for i in range(self._SIZE)]
+
+    """
+    Returns everything needed to put the buffer back in its current state (for checkpointing)
+    RETURNS: dict state
+    """
+    def GetState(self) -> dict:
+        raise NotImplementedError()
+
+    """
+    Puts the buffer back in a state returned by GetState
+    INPUTS: dict state
+    """
+    def SetState(self, state: dict):
+        raise NotImplementedError()
+
 # ----------------------------------------------------------------------------------------
 ### TYPES OF BUFFER
 # Circular Buffer
-# Hash Table Buffer
+# Set-Associative Buffer
 # ----------------------------------------------------------------------------------------
 
 """
@@ -151,6 +181,10 @@ class CircularBuffer(Buffer):
         self._frontPointer = -1
         self._rearPointer = -1
 
+    def Reset(self):
+        super().Reset()
+        self.Flush()
+
     # Calculates number of elements in buffer currently in use
     def Size(self):
         if self._frontPointer == -1:
@@ -158,6 +192,18 @@ class CircularBuffer(Buffer):
         else:
             return ((self._rearPointer - self._frontPointer) % self._SIZE) + 1
 
+    def GetState(self) -> dict:
+        return {"buffer": self._Buffer,
+                "frontPointer": self._frontPointer,
+                "rearPointer": self._rearPointer}
+
+    def SetState(self, state: dict):
+        if len(state["buffer"]) != self._SIZE:
+            raise Exception(f"Checkpoint's {self._NAME} has {len(state['buffer'])} entries, expected {self._SIZE}!")
+        self._Buffer = list(state["buffer"])
+        self._frontPointer = state["frontPointer"]
+        self._rearPointer = state["rearPointer"]
+
 
     ## Required methods for child classes
     """
@@ -169,192 +215,344 @@ class CircularBuffer(Buffer):
         return item
     
 """
-Hash Table Buffer - Storing data as a hash table
+Set-Associative Buffer - Storing int values by int index, in a fixed number of sets, each holding a fixed number of ways
+An index can only be stored in one set (index % no. sets), so finding it only means checking that set's ways (O(1))
+When a set is full, adding a new index evicts the least recently used entry in that set
 EXTRA DATA:
+    int no. ways (entries per set)
+    int no. sets
+    array tags (index stored in each entry), array valid bits (1 = entry in use), array values, array last time each entry was used (for LRU)
 
 EXTRA FUNCTIONALITY:
-    Hash 
-
-REQUIRED FUNCTIONALITY ON SUBCLASSES:
-    GetIndexFromItem (Takes in a value to be added to/ in bin, and returns the unique index identifier from it)
-    CreateBufferItem (formats the item fed into Add, so that it can be added to the table with the correct information)
+    Hash (finds the set an index belongs in)
 """
-class HashTableBuffer(Buffer):
-    def __init__(self, size, name):
+class SetAssociativeBuffer(Buffer):
+    EMPTY = -1 # Returned by Get when index isn't in buffer
+    # Indexes are unsigned 64 bit ints (e.g: gshare's pc xor 64 bit history), so every tag is a valid index - empty entries are marked by their valid bit instead
+
+    def __init__(self, size, name, ways: int = 4):
+        if ways <= 0 or size % ways != 0:
+            raise Exception(f"{name} size ({size}) must be a multiple of its no. ways ({ways})!")
+        self._WAYS = ways
+        self._SETS = size // ways
         super().__init__(size, name)
+        self.Reset()
 
-    # Finds number of free spaces in hash table
-    def GetNumberOfFreeSpaces(self) -> int:
-        return len(list(filter(lambda x: x == {}, self._Buffer)))
+    def Reset(self):
+        # Entries in set s are at s * ways -> (s + 1) * ways - 1
+        self._tags = array('Q', [0 for i in range(self._SIZE)])
+        self._valid = array('B', [0 for i in range(self._SIZE)])
+        self._values = array('q', [0 for i in range(self._SIZE)])
+        self._lastUsed = array('Q', [0 for i in range(self._SIZE)])
+        self._clock = 0 # Incremented on every access, so the entry with the lowest last used time is the LRU
+        self._usedSpaces = 0
 
-    # Hashes mem address location, index, then uses hash to find value in hash table 
-    def Get(self, index: int = 0) -> dict:
-        # Hash
-        key = self.Hash(index)
-        # Search from key, until we hit an empty bin - in which case, value is not in table
-        for i in range(self._SIZE):
-            binPointer = (key + i) % self._SIZE
-            item = self._Buffer[binPointer]
-            if item != {}:
-                if self.GetIndexFromItem(item) == index:
-                    return item
-
-            # -1 = Not in hash table
-            return -1
-        else:
-            raise Exception(f"{self._NAME} is full!")
-        
-    # Hashes index of item, then uses that as key to insert into hash table
-    def Add(self, item: dict|list, size: int =1):
-        if item == []:
-            return
-        elif type(item) == list:
-            self.Add(item.pop())
-            return self.Add(item)
-
-        # Hash
-        key = self.GetIndexFromItem(item)
-        key = self.Hash(key)
-
-        # Insert buffer item into buffer
-        for i in range(self._SIZE):
-            if self._Buffer[(key + i) % self._SIZE] != {}: continue
+    def GetNumberOfFreeSpaces(self) -> int:
+        return self._SIZE - self._usedSpaces
+
+    # Checks each way in index's set for index, returns -1 if not in buffer
+    def Get(self, index: int = 0) -> int:
+        start = self.Hash(index) * self._WAYS
+        for entry in range(start, start + self._WAYS):
+            if self._tags[entry] == index and self._valid[entry]:
+                self._clock += 1
+                self._lastUsed[entry] = self._clock
+                return self._values[entry]
+        # -1 = Not in buffer
+        return -1
+
+    # Returns all entries in buffer as a list of (index, value) pairs
+    def GetBuffer(self) -> list:
+        return [(self._tags[entry], self._values[entry]) for entry in range(self._SIZE) if self._valid[entry]]
+
+    # Adds value at index (replacing value already there). If index's set is full, the least recently used entry in it is evicted
+    def Add(self, index: int, value: int):
+        start = self.Hash(index) * self._WAYS
+        replacedEntry = start
+        for entry in range(start, start + self._WAYS):
+            # Index already in buffer - replace its value
+            if self._tags[entry] == index and self._valid[entry]:
+                replacedEntry = entry
+                break
+            # Otherwise, replace least recently used entry (empty entries were last used at time 0, so are filled first)
+            if self._lastUsed[entry] < self._lastUsed[replacedEntry]:
+                replacedEntry = entry
+
+        if not self._valid[replacedEntry]:
+            self._usedSpaces += 1
+            self._valid[replacedEntry] = 1
+        self._clock += 1
+        self._tags[replacedEntry] = index
+        self._values[replacedEntry] = value
+        self._lastUsed[replacedEntry] = self._clock
+
+    # Replaces value at index, which must already be in buffer
+    def Update(self, index: int, value: int):
+        start = self.Hash(index) * self._WAYS
+        for entry in range(start, start + self._WAYS):
+            if self._tags[entry] == index and self._valid[entry]:
+                self._clock += 1
+                self._values[entry] = value
+                self._lastUsed[entry] = self._clock
+                return
+        raise Exception(f"Tried to update {index} in {self._NAME} to {value}, but {index} doesn't exist in {self._NAME}!")
 
-            self._Buffer[(key + i) % self._SIZE] = self.CreateBufferItem(item)
-            break
-        else:
-            raise Exception("Hash Table is full!")
-        return
-    
-    # Hash index, find index in table, then replace current item in table with item
-    def Update(self, item: dict):
-        source = self.GetIndexFromItem(item)
-        key = self.Hash(source)
-        
-        # Search from key, until we hit an empty bin - in which case, value is not in table
-        for i in range(self._SIZE):
-            binPointer = (key + i) % self._SIZE
-            currentItem = self._Buffer[binPointer]
-            if currentItem != {}:
-                # Check if item has correct source location
-                if self.GetIndexFromItem(currentItem) == source:
-                    # Replace current item with item
-                    self._Buffer[binPointer] = item
-                    return
-
-            # -1 = Not in hash table
-            raise Exception(f"Tried to add {item} to table, but {source} doesn't exist in table!")
-        else:
-            raise Exception(f"{self._NAME} is full!")
-        
+    def Flush(self):
+        self.Reset()
+
+    def GetState(self) -> dict:
+        return {"tags": self._tags.tobytes(),
+                "valid": self._valid.tobytes(),
+                "values": self._values.tobytes(),
+                "lastUsed": self._lastUsed.tobytes(),
+                "clock": self._clock,
+                "usedSpaces": self._usedSpaces}
+
+    def SetState(self, state: dict):
+        tags, valid, values, lastUsed = array('Q'), array('B'), array('q'), array('Q')
+        tags.frombytes(state["tags"])
+        valid.frombytes(state["valid"])
+        values.frombytes(state["values"])
+        lastUsed.frombytes(state["lastUsed"])
+        if not len(tags) == len(valid) == len(values) == len(lastUsed) == self._SIZE:
+            raise Exception(f"Checkpoint's {self._NAME} has {len(tags)} entries, expected {self._SIZE}!")
+        self._tags, self._valid, self._values, self._lastUsed = tags, valid, values, lastUsed
+        self._clock = state["clock"]
+        self._usedSpaces = state["usedSpaces"]
 
     """
-    Hashes integer
-    INPUT: int value
-    RETURNS: int hashed value
+    Finds which set an index belongs in
+    INPUT: int index
+    RETURNS: int set no.
     """
     def Hash(self, value: int) -> int:
-        return value % self._SIZE
-    
-    """
-    Takes in a dict item to be added to / already in bin, and returns its index
-    INPUT: dict item
-    RETURNS: int index of item
-    """
-    def GetIndexFromItem(self, item: dict) -> int:
-        raise NotImplementedError()
-    
-    """
-    Converts an item to be added to the buffer, into the correct form
-    INPUT: dict item
-    RETURNS: dict buffer item
-    """
-    def CreateBufferItem(self, item: dict) -> dict:
-        raise NotImplementedError()
+        return value % self._SETS
 
 
 # ----------------------------------------------------------------------------------------
 ### BUFFER IMPLEMENTATIONS 
 # Re-Order Buffer (Circular)
 # Pipeline Buffer (Circular)
-# Global History Register (Circular)
-# Branch Target Buffer (Hash Table)
+# Global History Register (Shift Register)
+# Branch Target Buffer (Set-Associative)
+# Direction Buffer (Set-Associative)
 # ----------------------------------------------------------------------------------------
 
-# Buffer of mu-op metadata [{opcode: __, location: ____, speculative, ___}, ..]
+"""
+Re-Order Buffer Entry - Metadata of one mu-op in the ROB
+DATA:
+    Opcode opcode (None if entry has never been used)
+    int location (text section location of the mu-op's instruction)
+    bool speculative (whether mu-op's instruction was fetched speculatively, i.e: BP predicted branch taken)
+"""
+class ReorderBufferEntry:
+    __slots__ = ("opcode", "location", "speculative")
+
+    def __init__(self):
+        self.opcode = None
+        self.location = 0
+        self.speculative = False
+
+    def __repr__(self) -> str:
+        return f"{self.opcode.name if self.opcode is not None else None} from {self.location}{'*' if self.speculative else ''}"
+
+# Buffer of mu-op metadata [ReorderBufferEntry(opcode, location, speculative), ..]
+# Entries are allocated once (on Reset), and overwritten in place as mu-ops are added, so adding mu-ops doesn't create any new objects
 class ReorderBuffer(CircularBuffer):
     def __init__(self, size: int = 16, name: str = "ROB"):
         super().__init__(size, name) # super() calls the method on the superclass
-        
-    def CreateBufferItem(self, item: str, size: int, data: dict) -> dict:
-        bufferItem = {"opcode": item.split()[0].rstrip('*'),
-                      "location": data["location"],
-                      "speculative": item.endswith('*')} # * at end indicates BP predicted branch taken 
-        return bufferItem
+        self.Reset()
+
+    def Reset(self):
+        self._Buffer = [ReorderBufferEntry() for i in range(self._SIZE)]
+        self.Flush()
 
-# Buffer of mu-ops [{opcode: __, operand: __}, ..]
+    # Expected input: MicroOp/list of MicroOps, w/ whether their instruction is speculative
+    def Add(self, item: MicroOp|list, size: int = 1, speculative: bool = False):
+        if type(item) == list:
+            for i in item:
+                self.AddElement(i, speculative)
+        else:
+            self.AddElement(item, speculative)
+
+    # Overwrites the entry after the rear of the buffer w/ the mu-op's metadata
+    def AddElement(self, item: MicroOp, speculative: bool):
+        # Check if buffer full
+        if (self._frontPointer - 1) % self._SIZE == self._rearPointer:
+            raise Exception(f"{self._NAME} Full!")
+
+        # If buffer empty, set start pointer back to 0
+        if self._frontPointer == -1:
+            self._frontPointer = 0
+
+        self._rearPointer = (self._rearPointer + 1) % self._SIZE
+        entry = self._Buffer[self._rearPointer]
+        entry.opcode = item.opcode
+        entry.location = item.location
+        entry.speculative = speculative
+
+    # Entries are saved as [opcode name, location, speculative]
+    def GetState(self) -> dict:
+        return {"buffer": [[entry.opcode.name if entry.opcode is not None else None, entry.location, entry.speculative] for entry in self._Buffer],
+                "frontPointer": self._frontPointer,
+                "rearPointer": self._rearPointer}
+
+    # Entries stay the same objects, so only their contents are restored
+    def SetState(self, state: dict):
+        if len(state["buffer"]) != self._SIZE:
+            raise Exception(f"Checkpoint's {self._NAME} has {len(state['buffer'])} entries, expected {self._SIZE}!")
+        for entry, (opcode, location, speculative) in zip(self._Buffer, state["buffer"]):
+            entry.opcode = Opcode[opcode] if opcode is not None else None
+            entry.location = location
+            entry.speculative = speculative
+        self._frontPointer = state["frontPointer"]
+        self._rearPointer = state["rearPointer"]
+
+# Buffer of mu-ops [MicroOp(opcode, operand, operandSize, ..), ..] (None = never used)
 class PipelineBuffer(CircularBuffer):
     def __init__(self, size: int = 16, name: str = "Pipeline Buffer"):
         super().__init__(size, name)
+        self.Reset()
 
-    # Expected input: mu-op, w/ a * at end if it's speculative (Not expecting any extra data)
-    def CreateBufferItem(self, item: str, operandSize: int, data: dict) -> dict:
-        bufferItem = {"opcode": None, "operand": None, "operandSize": operandSize} # operandSize is the no. bytes the operation involves (e.g: In MOV [10] r10b, then mu_op STO [10] has an operand size of 1 byte)
-
-        decomposedMu_op = item.split()
-        match len(decomposedMu_op):
-            case 1:
-                bufferItem["opcode"] = decomposedMu_op[0].rstrip('*')
-            case 2:
-                bufferItem["opcode"] = decomposedMu_op[0]
-                # Convert operand to int, if possible
-                operand = decomposedMu_op[1].rstrip('*')
-                bufferItem["operand"] = int(operand) if operand.isnumeric() else operand
-            case _:
-                raise Exception(f"mu-op has unexpected number of operands! Expected 1 or 2, got {len(decomposedMu_op)}\n\
-                                Received mu-op: {item}\n\
-                                Decomposed mu-op: {decomposedMu_op}")
-        
-        return bufferItem
+    def Reset(self):
+        self._Buffer = [None for i in range(self._SIZE)]
+        self.Flush()
 
-class GlobalHistoryRegister(CircularBuffer):
-    def __init__(self, size: int = 8, name: str = "Global History Register"):
-        super().__init__(size, name)
-        # Fill buffer up, set pointers to front and end
-        self._Buffer = [True for i in range(size)]
-        self._frontPointer = 0
-        self._rearPointer = size - 1
-    
-    # Add removes item at front of GHR (Removes oldest item to give space to insert new item, as GHR always full)
-    def Add(self, item: bool|list, size: int = 1):
-        self._frontPointer = (self._frontPointer + size) % self._SIZE
-        super().Add(item, size)
-
-    def CreateBufferItem(self, item: bool, size: int, data: dict):
-        if type(item) != bool:
-            raise Exception(f"Attempted to insert non-bool into GHR! GHR should only contain T/F predictions! Received {item}")
+    # Expected input: pre-decoded MicroOp (Not expecting any extra data)
+    # Mu-ops come from the mu-op cache, so are added as-is (and must not be modified once in the buffer)
+    def CreateBufferItem(self, item: MicroOp, operandSize: int, data: dict) -> MicroOp:
         return item
 
-# Buffer of branch instruction {from: location, to: location}
-class BranchTargetBuffer(HashTableBuffer):
-    def __init__(self, size: int = 16, name: str = "Branch Target Buffer"):
-        super().__init__(size, name)
+    # Mu-ops are saved as lists of their fields (see MicroOp.GetState)
+    def GetState(self) -> dict:
+        return {"buffer": [mu_op.GetState() if mu_op is not None else None for mu_op in self._Buffer],
+                "frontPointer": self._frontPointer,
+                "rearPointer": self._rearPointer}
+
+    # Restored mu-ops are new records (the mu-op cache is rebuilt as instructions are decoded again)
+    def SetState(self, state: dict):
+        buffer = []
+        for savedMu_op in state["buffer"]:
+            mu_op = None
+            if savedMu_op is not None:
+                mu_op = MicroOp()
+                mu_op.SetState(savedMu_op)
+            buffer.append(mu_op)
+        super().SetState({"buffer": buffer,
+                          "frontPointer": state["frontPointer"],
+                          "rearPointer": state["rearPointer"]})
 
-    def GetIndexFromItem(self, item: dict) -> int:
-        return item["source"]
+"""
+Global History Register - Outcomes of the last n branches (including speculatively predicted ones), as the bits of an int
+(bit 0 = oldest branch, bit n-1 = newest branch, 1 = taken)
+Bits shifted out of the register by speculative predictions are kept in the outstanding branch queue (also an int, bit 0 = oldest),
+which acts as a checkpoint of the non-speculative history, so it can be restored on a mispredict
+EXTRA DATA:
+    int history, int outstanding branch queue, int no. outstanding branches
 
-    def CreateBufferItem(self, item: dict) -> dict:
-        return {"source": item["source"],
-                "destination": item["destination"]}
-    
-# Buffer of branch locations, and whether to predict taken or not
-class DirectionBuffer(HashTableBuffer):
-    def __init__(self, size: int = 16, name: str = "Branch Direction Buffer"):
+EXTRA FUNCTIONALITY:
+    GetNonSpeculative (history before any outstanding branches were predicted)
+    GetOldestPrediction (prediction made for the oldest outstanding branch)
+    Restore (rolls back to non-speculative history, then adds a branch outcome)
+"""
+class GlobalHistoryRegister(Buffer):
+    MAX_SIZE = 64 # gshare indexes its tables by pc xor history, which must fit the set-associative buffers' 64 bit tags
+
+    def __init__(self, size: int = 8, name: str = "Global History Register"):
+        if not 1 <= size <= self.MAX_SIZE:
+            raise Exception(f"{name} length ({size}) must be between 1 and {self.MAX_SIZE} bits!")
         super().__init__(size, name)
+        self._MASK = (1 << size) - 1
+        self._NEWEST_BIT = size - 1
+        self.Reset()
+
+    def Reset(self):
+        # Fill register with taken outcomes, no outstanding branches
+        self._history = self._MASK
+        self._outstanding = 0
+        self._outstandingCount = 0
+
+    # GHR is always full
+    def GetNumberOfFreeSpaces(self) -> int:
+        return 0
+
+    # Returns whole history as an int
+    def Get(self, index: int = 0) -> int:
+        return self._history
+
+    # Returns history as a list of outcomes, oldest first
+    def GetBuffer(self) -> list:
+        return [bool(self._history >> i & 1) for i in range(self._SIZE)]
+
+    # Add removes oldest outcome from GHR (to give space to insert new outcome, as GHR always full), and adds it to outstanding branch queue
+    def Add(self, prediction: bool, size: int = 1):
+        if type(prediction) != bool:
+            raise Exception(f"Attempted to insert non-bool into GHR! GHR should only contain T/F predictions! Received {prediction}")
+        self._outstanding |= (self._history & 1) << self._outstandingCount
+        self._outstandingCount += 1
+        self._history = (self._history >> 1) | (prediction << self._NEWEST_BIT)
+
+    # Remove takes oldest outstanding branch out of outstanding branch queue (once it has been evaluated, and predicted correctly)
+    def Remove(self):
+        if self._outstandingCount == 0:
+            return
+        self._outstanding >>= 1
+        self._outstandingCount -= 1
+
+    # Forgets every outstanding branch (history keeps its speculative outcomes)
+    def Flush(self):
+        self._outstanding = 0
+        self._outstandingCount = 0
+
+    # No. branches predicted, but not yet evaluated
+    def Size(self) -> int:
+        return self._outstandingCount
+
+    def GetState(self) -> dict:
+        return {"size": self._SIZE,
+                "history": self._history,
+                "outstanding": self._outstanding,
+                "outstandingCount": self._outstandingCount}
+
+    def SetState(self, state: dict):
+        if state["size"] != self._SIZE:
+            raise Exception(f"Checkpoint's {self._NAME} is {state['size']} bits long, expected {self._SIZE}!")
+        self._history = state["history"]
+        self._outstanding = state["outstanding"]
+        self._outstandingCount = state["outstandingCount"]
+
+    """
+    Works out history from before the outstanding branches were predicted
+    (Non-speculative section of GHR, w/ oldest outstanding branch queue entries in place of the speculative section)
+    RETURNS: int non-speculative history
+    """
+    def GetNonSpeculative(self) -> int:
+        if self._outstandingCount >= self._SIZE:
+            return self._outstanding & self._MASK
+        nonSpeculativeBits = self._SIZE - self._outstandingCount
+        return (self._history & ((1 << nonSpeculativeBits) - 1)) | ((self._outstanding & ((1 << self._outstandingCount) - 1)) << nonSpeculativeBits)
 
-    def GetIndexFromItem(self, item: dict) -> int:
-        return item["source"]
+    """
+    Finds the prediction made for the oldest outstanding branch (first speculative outcome in GHR)
+    RETURNS: bool predicted taken
+    """
+    def GetOldestPrediction(self) -> bool:
+        return bool(self._history >> (-self._outstandingCount % self._SIZE) & 1)
 
-    def CreateBufferItem(self, item: dict) -> dict:
-        return {"source": item["source"],
-                "certainty": item["certainty"]}
\ No newline at end of file
+    """
+    Rolls GHR back to its non-speculative history, then adds a branch's actual outcome (e.g: on a mispredict)
+    INPUTS: bool branch outcome
+    """
+    def Restore(self, branchOutcome: bool):
+        self._history = (self.GetNonSpeculative() >> 1) | (branchOutcome << self._NEWEST_BIT)
+        self.Flush()
+
+# Buffer of branch instructions (index: source location, value: destination location)
+class BranchTargetBuffer(SetAssociativeBuffer):
+    def __init__(self, size: int = 16, name: str = "Branch Target Buffer", ways: int = 4):
+        super().__init__(size, name, ways)
+    
+# Buffer of branch locations, and how certain the predictor is that they're taken (index: location, value: certainty)
+class DirectionBuffer(SetAssociativeBuffer):
+    def __init__(self, size: int = 16, name: str = "Branch Direction Buffer", ways: int = 4):
+        super().__init__(size, name, ways)
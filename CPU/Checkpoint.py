@@ -0,0 +1,103 @@
+import json
+import os
+import struct
+import zlib
+
+"""
+Checkpoint - The full state of a processor part way through a run, stored as a compact binary file
+so a long run can be resumed from it (e.g: after a crash)
+State is a tree of dicts/lists. Bulk data (register file, memory data region, predictor tables) is bytes, stored as compressed blocks,
+everything else (buffer contents, counters, flags) is small, so is stored as JSON, w/ each block replaced by a reference to it
+
+FILE FORMAT:
+    Header: MAGIC, 1 byte format version, uint32 length of JSON, uint32 no. blocks
+    JSON: UTF-8 state, where each bytes value is replaced by {"block": block no.}
+    Blocks (little-endian): uint32 length, then zlib compressed bytes
+"""
+MAGIC = b"BCKPT"
+VERSION = 4
+COMPRESSION_LEVEL = 1 # Fastest - most of the data region is usually empty, so compresses well anyway
+
+HEADER = struct.Struct("<BII")
+BLOCK_HEADER = struct.Struct("<I")
+
+"""
+Replaces every bytes value in a state with a reference to a block, collecting the blocks
+INPUTS: state (dict/list/value), list blocks found so far (added to)
+RETURNS: state without any bytes values
+"""
+def ExtractBlocks(state: object, blocks: list) -> object:
+    if type(state) is bytes:
+        blocks.append(state)
+        return {"block": len(blocks) - 1}
+    if type(state) is dict:
+        return {key: ExtractBlocks(value, blocks) for key, value in state.items()}
+    if type(state) in (list, tuple):
+        return [ExtractBlocks(value, blocks) for value in state]
+    return state
+
+"""
+Puts blocks back in place of the references to them (reverses ExtractBlocks)
+INPUTS: state read from JSON, list blocks
+RETURNS: state w/ bytes values
+"""
+def InsertBlocks(state: object, blocks: list) -> object:
+    if type(state) is dict:
+        if state.keys() == {"block"}:
+            return blocks[state["block"]]
+        return {key: InsertBlocks(value, blocks) for key, value in state.items()}
+    if type(state) is list:
+        return [InsertBlocks(value, blocks) for value in state]
+    return state
+
+"""
+Writes a processor state to a checkpoint file
+The file is written under a temporary name first, then renamed, so a crash while writing never leaves a broken checkpoint behind
+INPUTS: str path to write to, dict state (from Processor.GetState)
+"""
+def WriteCheckpoint(path: str, state: dict):
+    blocks = []
+    encodedState = json.dumps(ExtractBlocks(state, blocks), separators=(',', ':')).encode()
+
+    checkpoint = bytearray(MAGIC)
+    checkpoint += HEADER.pack(VERSION, len(encodedState), len(blocks))
+    checkpoint += encodedState
+    for block in blocks:
+        compressedBlock = zlib.compress(block, COMPRESSION_LEVEL)
+        checkpoint += BLOCK_HEADER.pack(len(compressedBlock))
+        checkpoint += compressedBlock
+
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, "wb") as f:
+        f.write(checkpoint)
+    os.replace(temporaryPath, path)
+
+"""
+Reads a processor state from a checkpoint file
+INPUTS: str path to checkpoint
+RETURNS: dict state (for Processor.SetState)
+"""
+def ReadCheckpoint(path: str) -> dict:
+    with open(path, "rb") as f:
+        checkpoint = f.read()
+
+    if not checkpoint.startswith(MAGIC) or len(checkpoint) < len(MAGIC) + HEADER.size:
+        raise Exception(f"{path} isn't a checkpoint file!")
+    version, stateLength, blockCount = HEADER.unpack_from(checkpoint, len(MAGIC))
+    if version != VERSION:
+        raise Exception(f"Checkpoint {path} is version {version}, expected version {VERSION}!")
+
+    try:
+        offset = len(MAGIC) + HEADER.size
+        encodedState = checkpoint[offset:offset + stateLength]
+        offset += stateLength
+
+        blocks = []
+        for i in range(blockCount):
+            length = BLOCK_HEADER.unpack_from(checkpoint, offset)[0]
+            offset += BLOCK_HEADER.size
+            blocks.append(zlib.decompress(checkpoint[offset:offset + length]))
+            offset += length
+        return InsertBlocks(json.loads(encodedState), blocks)
+    except (struct.error, zlib.error, ValueError, IndexError):
+        raise Exception(f"Checkpoint {path} is truncated or corrupted!")
@@ -0,0 +1,121 @@
+from CPU.MicroOps import MicroOp
+
+"""
+Debug Screen - Prints the state of the pipeline every cycle, pausing for the user to step through the run (or skip ahead to a breakpoint)
+Listens to the processor's events, so the processor does no debugging work when the screen isn't attached
+DATA:
+    Processor processor being debugged
+    What happened in the current cycle (fetched instruction, decoded instruction + mu-ops, executed mu-op)
+    Breakpoint filters (opcode, operand, cycle no.)
+FUNCTIONALITY:
+    Attach / Detach (to the processor's events)
+    Event listeners (fetch, decode, execute, cycle)
+"""
+class DebugScreen:
+    def __init__(self, processor: object):
+        self.processor = processor
+
+        self.filterOpcode = None
+        self.filterOperand = None
+        self.filterCycle = None
+
+        self.ResetCycle()
+
+    """
+    Subscribes the screen to the processor's events
+    """
+    def Attach(self):
+        events = self.processor.events
+        events.Subscribe("fetch", self.OnFetch)
+        events.Subscribe("decode", self.OnDecode)
+        events.Subscribe("execute", self.OnExecute)
+        events.Subscribe("cycle", self.OnCycle)
+
+    """
+    Unsubscribes the screen from the processor's events
+    """
+    def Detach(self):
+        events = self.processor.events
+        events.Unsubscribe("fetch", self.OnFetch)
+        events.Unsubscribe("decode", self.OnDecode)
+        events.Unsubscribe("execute", self.OnExecute)
+        events.Unsubscribe("cycle", self.OnCycle)
+
+    """
+    Clears what happened in the current cycle
+    """
+    def ResetCycle(self):
+        self.fetchedInstruction = None
+        self.decodedInstruction = None
+        self.decodedMicroOps = []
+        self.executedMicroOp = None
+
+    def OnFetch(self, cycle: int, location: int, instruction: str, speculative: bool):
+        self.fetchedInstruction = f"{instruction}*" if speculative else instruction # (* = predicted taken)
+
+    def OnDecode(self, cycle: int, location: int, instruction: str, microOps: list):
+        self.decodedInstruction = instruction
+        self.decodedMicroOps = microOps
+
+    def OnExecute(self, cycle: int, location: int, mu_op: MicroOp):
+        self.executedMicroOp = mu_op
+
+    """
+    Prints the debugging screen for the cycle, then waits for the user (unless skipping ahead to a breakpoint)
+    INPUTS: int cycle no., bool Execute ran, bool Fetch ran
+    """
+    def OnCycle(self, cycle: int, executed: bool, fetched: bool):
+        processor = self.processor
+        print(f"""
+        -----------------------CYCLE {cycle}-----------------------
+                        PROGRAM COUNTER: {processor.registers.Load("rip")}
+                        {f"Fetched: {self.fetchedInstruction} from location: {processor.registers.Load("mar")}" if self.fetchedInstruction is not None else "Fetched stalled!"}
+                        Decoded:
+                        {f"{self.decodedInstruction} into micro-ops: {self.decodedMicroOps}." if self.decodedMicroOps != [] else "Decode Stalled!"}
+                        Executed:
+                        {f"{self.executedMicroOp}." if self.executedMicroOp is not None else "Execute Stalled!"}
+
+                        Pipeline: {processor.pipelineBuffer._Buffer}
+                        (Front Pointer: {processor.pipelineBuffer._frontPointer} Rear Pointer: {processor.pipelineBuffer._rearPointer})
+
+                        Re-Order Buffer: {processor.reorderBuffer._Buffer}
+                        (Front Pointer: {processor.reorderBuffer._frontPointer} Rear Pointer: {processor.reorderBuffer._rearPointer})
+
+                        Registers: {processor.registers.GetRegisters().items()}
+
+                        Main Memory: {processor.mainMemory.GetMemory()}
+                """)
+
+        executedOpcode = self.executedMicroOp.opcode.name if self.executedMicroOp is not None else None
+        executedOperand = self.executedMicroOp.operand if self.executedMicroOp is not None else None
+        if  (
+                (
+                    (executedOpcode == self.filterOpcode and self.filterOpcode is not None)\
+                    or (executedOperand == self.filterOperand and self.filterOperand is not None)\
+                    or (cycle == self.filterCycle and self.filterCycle is not None)\
+                )\
+            )\
+            or (\
+                    self.filterOpcode == None\
+                    and self.filterOperand == None\
+                    and self.filterCycle == None\
+                ):
+
+            # Reset filters
+            self.filterOpcode = None
+            self.filterOperand = None
+            self.filterCycle = None
+
+            print("""
+                NEXT CYCLE? (C to set breakpoint on next opcode, A to set breakpoint on next operand, N to set breakpoint on specific cycle)
+                """)
+
+            response = input()
+            if response == 'C':
+                self.filterOpcode = input("Enter opcode to set breakpoint on: ")
+            elif response == 'A':
+                self.filterOperand = input("Enter operand to set breakpoint on: ")
+            elif response == 'N':
+                self.filterCycle = int(input("Enter cycle number to set breakpoint on: "))
+
+        self.ResetCycle()
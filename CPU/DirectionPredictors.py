@@ -6,16 +6,20 @@ DATA:
     bool stalled
 FUNCTIONALITY:
     Stall
+    Reset
+    GetState/SetState (for checkpointing)
 
 REQUIRED FUNCITONALITY ON SUBCLASSES:
     Predict
     Update
 """
 class BasePredictor:
+    USES_GLOBAL_HISTORY = False # Whether predictor takes a historyLength option (length of its global history register)
+
     def __init__(self, branchTargetBuffer: type[Buffers.BranchTargetBuffer], directionBuffer: type[Buffers.DirectionBuffer], name: str):
         self.name = name
-        self.BTB = branchTargetBuffer # BTB stores location branches branch to {from: --, to: --}
-        self.DirectionBuffer = directionBuffer # Direction Buffer stores whether to predict a branch taken or not {source: --, taken: --}
+        self.BTB = branchTargetBuffer # BTB stores location branches branch to (source -> destination)
+        self.DirectionBuffer = directionBuffer # Direction Buffer stores whether to predict a branch taken or not (source -> certainty)
         self.stalled = True
 
     """
@@ -24,6 +28,49 @@ class BasePredictor:
     def Stall(self):
         self.stalled = True
 
+    """
+    Returns predictor to the state it was created in (forgets everything it has learnt)
+    """
+    def Reset(self):
+        self.stalled = True
+        if self.BTB is not None:
+            self.BTB.Reset()
+        if self.DirectionBuffer is not None:
+            self.DirectionBuffer.Reset()
+
+    """
+    Returns everything the predictor has learnt, so far (for checkpointing)
+    RETURNS: dict {str predictor class, bool stalled, dict BTB state, dict direction buffer state}
+    """
+    def GetState(self) -> dict:
+        return {"predictor": type(self).__name__,
+                "stalled": self.stalled,
+                "BTB": self.BTB.GetState() if self.BTB is not None else None,
+                "DirectionBuffer": self.DirectionBuffer.GetState() if self.DirectionBuffer is not None else None}
+
+    """
+    Puts the predictor back in a state returned by GetState (must be the same type of predictor, w/ the same buffer sizes)
+    INPUTS: dict state
+    """
+    def SetState(self, state: dict):
+        if state["predictor"] != type(self).__name__:
+            raise Exception(f"Checkpoint was taken with a {state['predictor']} predictor, not {type(self).__name__}!")
+        self.stalled = state["stalled"]
+        if self.BTB is not None:
+            self.BTB.SetState(state["BTB"])
+        if self.DirectionBuffer is not None:
+            self.DirectionBuffer.SetState(state["DirectionBuffer"])
+
+    """
+    Describes how the predictor was created (e.g: so a branch trace records which predictor it came from)
+    RETURNS: dict {str predictor class, int BTB size, int direction buffer size, int global history length} (None = predictor doesn't have one)
+    """
+    def GetConfiguration(self) -> dict:
+        return {"predictor": type(self).__name__,
+                "btbSize": self.BTB.GetCapacity() if self.BTB is not None else None,
+                "directionBufferSize": self.DirectionBuffer.GetCapacity() if self.DirectionBuffer is not None else None,
+                "historyLength": None}
+
     """
     Predicts the next instruction to fetch based on the program counter
     INPUT: int program counter
@@ -70,22 +117,21 @@ class AlwaysTaken(BasePredictor):
             return programCounter
 
         ## Check if program counter is a key in BTB
-        BTBEntry = self.BTB.Get(programCounter)
+        destination = self.BTB.Get(programCounter)
         ## If not, return pc + 1
-        if type(BTBEntry) != dict:
+        if destination == Buffers.SetAssociativeBuffer.EMPTY:
             return programCounter + 1
         ## If so, return destination of found entry
-        return BTBEntry["destination"]
+        return destination
     
     def Update(self, source: int, destination: int, branchOutcome: bool):
         ## Check if source already in BTB
-        sourceInBTB = type(self.BTB.Get(source)) is dict
+        sourceInBTB = self.BTB.Get(source) != Buffers.SetAssociativeBuffer.EMPTY
         ## If so, return
         if sourceInBTB:
             return
         ## If not, add it
-        self.BTB.Add({"source": source,
-                      "destination": destination})
+        self.BTB.Add(source, destination)
 
 ## -----------------------------------------
 # LOCAL PREDICTORS
@@ -111,42 +157,31 @@ class BaseLastTime(BasePredictor):
             return programCounter
 
         ## Check if program counter is a key in BTB
-        BTBEntry = self.BTB.Get(programCounter)
+        destination = self.BTB.Get(programCounter)
         # If not, return pc + 1
-        if type(BTBEntry) != dict:
+        if destination == Buffers.SetAssociativeBuffer.EMPTY:
             return programCounter + 1
         
         ## Check outcome of last instance of this branch
         # If last instance of this branch taken, return btb entry
         predictedTaken = self.CheckIfBranchShouldBePredicted(programCounter)
         if predictedTaken:
-            return BTBEntry["destination"]
+            return destination
         # If not taken, return pc + 1
         return programCounter + 1
     
     def Update(self, source: int, destination: int, branchOutcome: bool):
-        ## Create Items to add to BTB and Direction Buffer
         self.newDirectionCertainty = self.CalculateNewDirectionCertainty(source, branchOutcome)
-        btbItem = {"source": source,
-                    "destination": destination}
-        directionItem = {"source": source,
-                         "certainty": self.newDirectionCertainty}
 
         ## Update BTB
         # Check if source already in BTB
-        sourceInBTB = type(self.BTB.Get(source)) is dict
+        sourceInBTB = self.BTB.Get(source) != Buffers.SetAssociativeBuffer.EMPTY
         ## If not, add it
         if not sourceInBTB:
-            self.BTB.Add(btbItem)
+            self.BTB.Add(source, destination)
         
-        ## Update Direction Buffer
-        sourceInDirectionBuffer = type(self.DirectionBuffer.Get(source)) is dict
-        # If so, update
-        if sourceInDirectionBuffer:
-            self.DirectionBuffer.Update(directionItem)
-            return
-        # If not, add it
-        self.DirectionBuffer.Add(directionItem)
+        ## Update Direction Buffer (adds source if not already in it)
+        self.DirectionBuffer.Add(source, int(self.newDirectionCertainty))
 
     """
     Checks if direction certainty indicates branch should be predicted taken
@@ -170,12 +205,12 @@ class OneBitLastTime(BaseLastTime):
 
     ## DIRECTION CERTAINTY GUIDE
     # -------------------------------
-    # True - Predict Taken
-    # False - Preict Not Taken
+    # 1 (True) - Predict Taken
+    # 0 (False) - Preict Not Taken
     # -------------------------------
 
     def CheckIfBranchShouldBePredicted(self, programCounter: int) -> bool:
-        return self.DirectionBuffer.Get(programCounter)["certainty"]
+        return self.DirectionBuffer.Get(programCounter) == 1
 
     def CalculateNewDirectionCertainty(self, programCounter: int, branchOutcome: bool) -> bool:
         return branchOutcome
@@ -194,21 +229,19 @@ class TwoBitLastTime(BaseLastTime):
     # --------------------------------
 
     def CheckIfBranchShouldBePredicted(self, programCounter: int) -> bool:
-        sourceInDirectionBuffer = self.DirectionBuffer.Get(programCounter)
-        certainty = sourceInDirectionBuffer["certainty"]
+        certainty = self.DirectionBuffer.Get(programCounter)
 
-        return True if certainty >= 2 else False
+        return True if certainty >= 2 else False # (Not in direction buffer (-1) -> not taken)
 
     def CalculateNewDirectionCertainty(self, programCounter: int, branchOutcome: bool) -> int:
         # Find branch in direction buffer
-        sourceInDirectionBuffer = self.DirectionBuffer.Get(programCounter)
+        certainty = self.DirectionBuffer.Get(programCounter)
         # If not in direction buffer, return 2 if predicted taken, 1 if predicted not taken
-        if type(sourceInDirectionBuffer) is not dict:
+        if certainty == Buffers.SetAssociativeBuffer.EMPTY:
             return 2 if branchOutcome else 1
-        # If in buffer, find current certainty
+        # If in buffer, update current certainty
         else:
             # If outcome = taken, add 1 if certainty not 3
-            certainty = sourceInDirectionBuffer["certainty"]
             if branchOutcome:
                 return certainty if certainty == 3 else certainty + 1
             # If not taken, sub 1 if certainty not 0 
@@ -220,17 +253,32 @@ class TwoBitLastTime(BaseLastTime):
 ## -----------------------------------------
 
 class gshare(BasePredictor):
-    # Creates an 8 bit global history register
-    def __init__(self, BTB, directionBuffer, name="gshare"):
+    USES_GLOBAL_HISTORY = True
+
+    # Creates a global history register, 8 bits by default
+    def __init__(self, BTB, directionBuffer, name="gshare", historyLength: int = 8):
         super().__init__(BTB, directionBuffer, name)
         ## BUFFERS IN GSHARE PREDICTOR
-        # GHR stores result of last 8 branches (including speculatively predicted ones)
-        # OBQ stores branches knocked out of GHR due to speculative execution
-        # When a branch is predicted, result is added to tail of GHR, and old head appended to OBQ
-        # When branch is evaluated, and PREDICTED CORRECTLY, GHR taken, OBQ appended to head, tail cut off to hit correct size. Head of OBQ removed
-        # When branch is evaluated, and MISPREDICTED, GHR taken, OBQ appended to head, tail cut off to his correct size. GHR <- this value (reset). OBQ flushed 
-        self.GlobalHistoryRegister = Buffers.GlobalHistoryRegister(8) # TODO: Would be cool to allow user to modify this
-        self.OutstandingBranchQueue = Buffers.CircularBuffer(16)
+        # GHR stores result of last historyLength branches (including speculatively predicted ones), as bits of an int
+        # OBQ (inside GHR) stores branches knocked out of GHR due to speculative execution
+        # When a branch is predicted, result is shifted into GHR, and oldest bit shifted into OBQ
+        # When branch is evaluated, and PREDICTED CORRECTLY, non-speculative history = GHR w/ OBQ in place of its speculative bits. Head of OBQ removed
+        # When branch is evaluated, and MISPREDICTED, GHR <- non-speculative history + branch outcome (restored). OBQ flushed
+        self.GlobalHistoryRegister = Buffers.GlobalHistoryRegister(historyLength)
+
+    def Reset(self):
+        super().Reset()
+        self.GlobalHistoryRegister.Reset()
+
+    def GetState(self) -> dict:
+        return {**super().GetState(), "GlobalHistoryRegister": self.GlobalHistoryRegister.GetState()}
+
+    def GetConfiguration(self) -> dict:
+        return {**super().GetConfiguration(), "historyLength": self.GlobalHistoryRegister.GetCapacity()}
+
+    def SetState(self, state: dict):
+        super().SetState(state)
+        self.GlobalHistoryRegister.SetState(state["GlobalHistoryRegister"])
 
     def Predict(self, programCounter):
         if self.stalled == True:
@@ -238,86 +286,56 @@ class gshare(BasePredictor):
             return programCounter
 
         ## Check if program counter is a key in BTB
-        BTBEntry = self.BTB.Get(programCounter)
+        destination = self.BTB.Get(programCounter)
         # If not, return pc + 1
-        if type(BTBEntry) != dict:
+        if destination == Buffers.SetAssociativeBuffer.EMPTY:
             return programCounter + 1
         
         # XOR program counter and GHR, predict
-        DirectionBufferIndex = programCounter ^ self.ConvertBufferToInt(self.GlobalHistoryRegister) # ^ denotes bitwise XOR
+        DirectionBufferIndex = programCounter ^ self.GlobalHistoryRegister.Get() # ^ denotes bitwise XOR
         prediction = self.DirectionBuffer.Get(DirectionBufferIndex)
-        if type(prediction) == dict: prediction = prediction["certainty"] # Prediction found in Direction Buffer!
+        if prediction != Buffers.SetAssociativeBuffer.EMPTY: prediction = bool(prediction) # Prediction found in Direction Buffer!
         else: prediction = True # For branches that have not been hit with given history yet, assume True
-        # Head of GHR added to OBQ
-        self.OutstandingBranchQueue.Add(self.GlobalHistoryRegister.Get())
-        # Prediction added to GHR
+        # Prediction added to GHR (head of GHR added to OBQ)
         self.GlobalHistoryRegister.Add(prediction)
         # Return correct program counter value based on prediction
         if prediction:
-            return BTBEntry["destination"]
+            return destination
         else:
             return programCounter + 1
     
     def Update(self, source, destination, branchOutcome):
-        # Take GHR, add OBQ to the end of it
-        nonSpeculativeGlobalHistory = Buffers.CircularBuffer(self.GlobalHistoryRegister._SIZE)
-        # OBQ Size = (rear - front) % max size + 1
-        OBQSize = self.OutstandingBranchQueue.Size()
-        
-        # Add non-speculative section of GHR
-        for i in range(self.GlobalHistoryRegister._SIZE - OBQSize):
-            nonSpeculativeGlobalHistory.Add(self.GlobalHistoryRegister.Get(i))
-        # Add oldest entries in OBQ until at GHR length
-        for i in range(self.GlobalHistoryRegister._SIZE - nonSpeculativeGlobalHistory.Size()):
-            nonSpeculativeGlobalHistory.Add(self.OutstandingBranchQueue.Get(i))
-
-        # Use (value xor source location) as index for BTB insertion
-        index = self.ConvertBufferToInt(nonSpeculativeGlobalHistory) ^ source
-        btbItem = {"source": source,
-                    "destination": destination}
-        directionItem = {"source": index,
-                         "certainty": branchOutcome}
-        
-        sourceInBTB = type(self.BTB.Get(source)) is dict
-        sourceInDirectionBuffer =  type(self.DirectionBuffer.Get(index)) is dict
+        # Use (non-speculative history xor source location) as index for DB insertion
+        index = self.GlobalHistoryRegister.GetNonSpeculative() ^ source
+        sourceInBTB = self.BTB.Get(source) != Buffers.SetAssociativeBuffer.EMPTY
         
-        # Check if DB needs to be added to, or updated
-        if sourceInDirectionBuffer:
-            self.DirectionBuffer.Update(directionItem)
-        else:
-            self.DirectionBuffer.Add(directionItem)
+        # Add to/update DB
+        self.DirectionBuffer.Add(index, int(branchOutcome))
 
         # Correct prediction => branch outcome is the same as GHR entry that pushed first entry in OBQ (prediction)
         if sourceInBTB: # Have encountered branch before - so we need to UPDATE its entries
-            correctlyPredicted = branchOutcome == self.GlobalHistoryRegister.Get(-(OBQSize))
+            correctlyPredicted = branchOutcome == self.GlobalHistoryRegister.GetOldestPrediction()
 
-            self.BTB.Update(btbItem)
+            self.BTB.Update(source, destination)
         else: # Happens when we have not encountered this branch yet - in this case, we need to add to BTB + GHR
             correctlyPredicted = False
             # Set BTB at index == destination
-            self.BTB.Add(btbItem)
+            self.BTB.Add(source, destination)
 
         # If predicted, remove from front of OBQ and return
         if correctlyPredicted:
-            self.OutstandingBranchQueue.Remove()
+            self.GlobalHistoryRegister.Remove()
             return
-        # If mispredicted, nonSpecGlobalHistory -> GHR, add new branch, clear OBQ, return
+        # If mispredicted, restore GHR to non-speculative history, add new branch, clear OBQ, return
         else:
-            # Reset GHR to non-speculative history
-            self.GlobalHistoryRegister.Flush()
-            self.GlobalHistoryRegister.Add(nonSpeculativeGlobalHistory._Buffer)
-            # Add latest branch result 
-            self.GlobalHistoryRegister.Add(branchOutcome)
-            # Flush OBQ
-            self.OutstandingBranchQueue.Flush()
+            self.GlobalHistoryRegister.Restore(branchOutcome)
             return
 
-    # Returns contents of buffer as int, by converting list to binary value, where T = 1, F = 0
-    def ConvertBufferToInt(self, buffer: type[Buffers.CircularBuffer]) -> int:        
-        bufferValue = 0
-        # For element in buffer, add 2^i * element to value
-        for i in range(buffer._SIZE):
-            element = buffer._Buffer[(buffer._frontPointer + i) % buffer._SIZE]
-            elementValue = (2**i) if element == True else 0
-            bufferValue += elementValue 
-        return bufferValue
\ No newline at end of file
+## -----------------------------------------
+# Predictors selectable by name (e.g: from the command line)
+## -----------------------------------------
+PREDICTORS = {"AlwaysNotTaken": AlwaysNotTaken,
+              "AlwaysTaken": AlwaysTaken,
+              "OneBitLastTime": OneBitLastTime,
+              "TwoBitLastTime": TwoBitLastTime,
+              "gshare": gshare}
@@ -0,0 +1,48 @@
+## Events published by the processor, w/ the arguments each listener is called with
+EVENTS = {"fetch": "int cycle no., int location fetched from, str instruction fetched, bool speculative (predicted taken)",
+          "predict": "int cycle no., int program counter, int predicted next program counter",
+          "decode": "int cycle no., int location of instruction, str instruction, list MicroOps issued to the ROB/pipeline buffer",
+          "execute": "int cycle no., int location of mu-op's instruction, MicroOp mu-op executed",
+          "update": "int cycle no., int branch location, int branch destination, bool taken, bool mispredicted",
+          "flush": "int cycle no., str cause (mispredict/exit/handOff/stop)",
+          "cycle": "int cycle no., bool Execute ran, bool Fetch ran (published once everything in the cycle has happened)"}
+
+"""
+Event Bus - Lets tools (tracers, visualisers, the debug screen, ..) listen in on what the processor does, without changing it
+Listeners are called in the order they subscribed, w/ the arguments given in EVENTS
+The processor only checks whether an event has any listeners before publishing it, so events nobody listens to cost next to nothing
+DATA:
+    dict {event name: list listeners}
+FUNCTIONALITY:
+    Subscribe / Unsubscribe
+    Publish (calls every listener of an event)
+"""
+class EventBus:
+    def __init__(self):
+        # Lists are never replaced, so the processor can keep a reference to each one
+        self.listeners = {event: [] for event in EVENTS}
+
+    """
+    Adds a listener to an event
+    INPUTS: str event name (from EVENTS), function listener (called w/ the event's arguments)
+    """
+    def Subscribe(self, event: str, listener):
+        if event not in self.listeners:
+            raise Exception(f"No such event: {event} (expected one of {list(EVENTS.keys())})")
+        self.listeners[event].append(listener)
+
+    """
+    Removes a listener from an event
+    INPUTS: str event name, function listener
+    """
+    def Unsubscribe(self, event: str, listener):
+        if listener in self.listeners.get(event, []):
+            self.listeners[event].remove(listener)
+
+    """
+    Calls every listener of an event
+    INPUTS: str event name, the event's arguments
+    """
+    def Publish(self, event: str, *arguments):
+        for listener in self.listeners[event]:
+            listener(*arguments)
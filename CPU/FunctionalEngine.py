@@ -0,0 +1,90 @@
+from CPU.MicroOps import Opcode
+
+"""
+Functional Engine - Runs an executable on a processor's registers and main memory one instruction at a time,
+without the pipeline (no Fetch/Decode/Execute stages, ROB or pipeline buffer), so it runs far faster than the pipeline
+Used to fast-forward through the start of a run, then hand the architectural state (registers, memory, program output) to the pipeline
+Instructions are decoded and executed using the processor's own decoder and instruction set, so they behave exactly as they do in the pipeline
+DATA:
+    Processor processor whose state is being run on
+FUNCTIONALITY:
+    Run (executes instructions, optionally warming up the predictor w/ every branch)
+    HandOff (gets the pipeline ready to carry on from the next instruction)
+"""
+class FunctionalEngine:
+    def __init__(self, processor: object):
+        self.processor = processor
+
+    """
+    Executes instructions, starting at rip, until the program exits or enough instructions have been executed
+    INPUTS: int max. no. instructions to execute (None = until program exits),
+            bool warm up the processor's predictor (predict + update it w/ every branch, so it isn't cold when the pipeline takes over)
+    RETURNS: int no. instructions executed
+    """
+    def Run(self, maxInstructions: int = None, warmPredictor: bool = True) -> int:
+        processor = self.processor
+        registers = processor.registers
+        mainMemory = processor.mainMemory
+        microOpCache = processor.microOpCache
+        predictor = processor.predictor
+        textStart = registers.Load("cs")
+        dataStart = registers.Load("ds")
+
+        executed = 0
+        while processor.running and (maxInstructions is None or executed < maxInstructions):
+            # Decode instruction at rip (rip outside the text section = noop, as in Fetch), sharing the pipeline's mu-op cache
+            location = registers.Load("rip")
+            decodedInstruction = microOpCache.get(location)
+            if decodedInstruction is None:
+                instruction = mainMemory.Retrieve(location) if textStart <= location < dataStart else "noop"
+                decodedInstruction = processor.DecodeInstruction(instruction, location)
+                microOpCache[location] = decodedInstruction
+
+            # Execute its mu-ops in order
+            nextLocation = location + 1
+            for mu_op in decodedInstruction["microOps"]:
+                operand = mu_op.operand
+                operandSize = mu_op.operandSize
+                address = processor.AGU.Generate(operand) if mu_op.memoryOperand else None
+                match mu_op.opcode:
+                    case Opcode.LOAD:
+                        processor.Load(operand, address, operandSize)
+                    case Opcode.STO:
+                        processor.Store(operand, address, operandSize)
+                    case Opcode.JMP:
+                        # Branch resolves straight away (no speculation), so predictor sees a predict then an update for each branch
+                        taken = processor.ConditionMet(operand)
+                        destination = registers.Load("rax")
+                        if warmPredictor:
+                            predictor.Predict(location)
+                            predictor.Update(location, destination, taken)
+                        if taken:
+                            nextLocation = destination
+                    case Opcode.ADD:
+                        processor.Add(operand, address, operandSize)
+                    case Opcode.SUB:
+                        processor.Subtract(operand, operandSize)
+                    case Opcode.CMP:
+                        processor.Compare(operand, address, operandSize)
+                    case Opcode.SYSCALL:
+                        processor.Syscall()
+                    case Opcode.NOOP:
+                        pass
+                    case _:
+                        raise Exception(f"Tried to execute invalid opcode! {mu_op.opcode}")
+
+            registers.Store("rip", nextLocation)
+            executed += 1
+
+        return executed
+
+    """
+    Gets the processor's pipeline ready to carry on from the next instruction (rip):
+    pipeline empty and stalled, and predictor stalled, so the first fetch is from rip, just like at the start of a run
+    """
+    def HandOff(self):
+        processor = self.processor
+        processor.Flush("handOff")
+        processor.stalledStages["Fetch"] = False
+        processor.predictor.Stall()
+        processor.bubbleCause = "pipelineFill"
@@ -1,35 +1,102 @@
+"""
+Main Memory - Addressed by integer location, split into 2 regions:
+    Text region (locations 0 up to start of data section) - header + instructions of the executable, 1 per location
+    Data region (start of data section onwards) - contiguous bytes, 1 byte per location (multi-byte values stored lowest byte first)
+"""
 class MainMemory:
     def __init__(self, size: int):
-        self._SIZE = size
-        self.__data__ = [None for i in range(self._SIZE)] # For now, store all data in memory in 4 byte sections
-    
+        self._SIZE = size # Size of data region (bytes)
+        self.Reset()
+
+    """
+    Clears every location in memory
+    """
+    def Reset(self):
+        self._text = []
+        self._dataStart = 0
+        self._data = bytearray(self._SIZE)
+        self._dataView = memoryview(self._data) # Used to read/write multi-byte values without copying the data region
+
+    """
+    Loads an executable into memory (header + text section into text region, data section into data region)
+    INPUTS: list executable file (header [start of text section, start of data section], then text section, then data section)
+    """
+    def LoadExecutable(self, executable: list):
+        self.Reset()
+        self._dataStart = executable[1]
+        self._text = executable[:self._dataStart]
+
+        data = executable[self._dataStart:]
+        if len(data) > self._SIZE:
+            raise Exception(f"Data section ({len(data)} bytes) doesn't fit in main memory ({self._SIZE} bytes)!")
+        for index, value in enumerate(data):
+            if not -128 <= value <= 255:
+                raise Exception(f"Data value {value} doesn't fit in a byte!")
+            self._data[index] = value & 0xFF
+
+    """
+    Returns the contents of memory (for checkpointing)
+    RETURNS: dict {list text region, int start of data section, bytes data region}
+    """
+    def GetState(self) -> dict:
+        return {"text": self._text,
+                "dataStart": self._dataStart,
+                "data": bytes(self._data)}
+
+    """
+    Restores the contents of memory from a checkpoint
+    INPUTS: dict state (from GetState)
+    """
+    def SetState(self, state: dict):
+        if len(state["data"]) != self._SIZE:
+            raise Exception(f"Checkpoint's data region ({len(state['data'])} bytes) is a different size to main memory's ({self._SIZE} bytes)!")
+        self._text = state["text"]
+        self._dataStart = state["dataStart"]
+        self._data[:] = state["data"] # Same size, so the memory view stays valid
+
     """
     Retrieves data from main memory
-    INPUTS: str location to retrieve from
-    RETURNS: int/str value at given location
+    INPUTS: int location to retrieve from, int size of value to retrieve (bytes, only used in data region)
+    RETURNS: int value/str instruction at given location
     """
-    def Retrieve(self, location: str) -> str: 
+    def Retrieve(self, location: int, size: int = 1) -> int|str:
         try:
-            location = int(location.strip('[]'))
-            return self.__data__[location]
-        except:
+            if location < self._dataStart:
+                if location < 0:
+                    raise IndexError()
+                return self._text[location]
+
+            offset = location - self._dataStart
+            if size == 1:
+                return self._data[offset]
+            if offset + size > self._SIZE:
+                raise IndexError()
+            return int.from_bytes(self._dataView[offset:offset + size], "little")
+        except (IndexError, TypeError):
             raise Exception(f"Tried to access invalid memory location:\n\
                             location: {location}")
-    
+
     """
-    Stores data in memory
-    INPUTS: str location to store in, int/str value to store/list of register values to store
+    Stores data in memory (only the data region can be written to)
+    INPUTS: int location to store in, int value to store, int size of value (bytes)
     """
-    def Store(self, location: str, value: list|int|str):
+    def Store(self, location: int, value: int, size: int = 1):
         try:
-            # Find location to store in
-            location = int(location.strip('[]'))
-            # Store value(s)
-            if type(value) == int or type(value) == str:
-                self.__data__[location] = value
+            offset = location - self._dataStart
+            if offset < 0 or offset + size > self._SIZE:
+                raise IndexError()
+            # Store value (negative values are stored in two's complement)
+            if size == 1:
+                self._data[offset] = value & 0xFF
             else:
-                for i in range(len(value)):
-                    self.__data__[location+i] = value[i]
-        except:
+                self._dataView[offset:offset + size] = (value & ((1 << (8 * size)) - 1)).to_bytes(size, "little")
+        except (IndexError, TypeError):
             raise Exception(f"Error trying to store data:\n\
-                            Tried to store {value} at {location}")
\ No newline at end of file
+                            Tried to store {value} at {location}")
+
+    """
+    Returns the contents of memory (for debugging)
+    RETURNS: list text region, then data region (without trailing empty bytes)
+    """
+    def GetMemory(self) -> list:
+        return self._text + list(self._data.rstrip(b'\x00'))
@@ -0,0 +1,55 @@
+from enum import Enum
+
+# Operations the execute stage can carry out (each instruction is decoded into one or more of these)
+class Opcode(Enum):
+    LOAD = "LOAD"
+    STO = "STO"
+    JMP = "JMP"
+    ADD = "ADD"
+    SUB = "SUB"
+    CMP = "CMP"
+    SYSCALL = "SYSCALL"
+    NOOP = "NOOP"
+
+"""
+Mu-op - One operation decoded from an instruction, as issued to the pipeline buffer
+Records are created once per text section location (kept in the mu-op cache) and shared by every issue of that instruction,
+so nothing that changes between issues (e.g: whether it was fetched speculatively - see ReorderBufferEntry) is kept here
+DATA:
+    Opcode opcode
+    int/str operand (None if opcode doesn't take one)
+    int operandSize (no. bytes the operation involves, e.g: In MOV [10] r10b, then mu-op STO [10] has an operand size of 1 byte)
+    bool memoryOperand (whether operand is a memory address, to be run through the AGU, e.g: [rdi+1])
+    bool retiresInstruction (whether mu-op is the last of its instruction)
+    int location (text section location of the instruction it was decoded from)
+FUNCTIONALITY:
+    GetState/SetState (for checkpointing)
+"""
+class MicroOp:
+    __slots__ = ("opcode", "operand", "operandSize", "memoryOperand", "retiresInstruction", "location")
+
+    def __init__(self, opcode: Opcode = None, operand: int|str = None, operandSize: int = 8, memoryOperand: bool = False, location: int = 0,
+                 retiresInstruction: bool = False):
+        self.opcode = opcode
+        self.operand = operand
+        self.operandSize = operandSize
+        self.memoryOperand = memoryOperand
+        self.retiresInstruction = retiresInstruction
+        self.location = location
+
+    def __repr__(self) -> str:
+        return f"{self.opcode.name}{f' {self.operand}' if self.operand is not None else ''} (size {self.operandSize}, from {self.location}{', retires' if self.retiresInstruction else ''})"
+
+    """
+    RETURNS: list mu-op fields, w/ opcode as its name (JSON serialisable)
+    """
+    def GetState(self) -> list:
+        return [self.opcode.name, self.operand, self.operandSize, self.memoryOperand, self.location, self.retiresInstruction]
+
+    """
+    Sets mu-op's fields from a list returned by GetState
+    INPUTS: list mu-op fields
+    """
+    def SetState(self, state: list):
+        opcode, self.operand, self.operandSize, self.memoryOperand, self.location, self.retiresInstruction = state
+        self.opcode = Opcode[opcode]
@@ -1,136 +1,299 @@
 from CPU.MainMemory import MainMemory
 from CPU.Buffers import ReorderBuffer, PipelineBuffer, BranchTargetBuffer, DirectionBuffer
 from CPU.AddressGenerationUnit import AGU
-from CPU.Registers import Registers
+from CPU.Registers import Registers, SUFFIX_MASKS, PF, ZF, SF
+from CPU.Statistics import Statistics
+from CPU.MicroOps import Opcode, MicroOp
+from CPU.Checkpoint import WriteCheckpoint, ReadCheckpoint
+from CPU.FunctionalEngine import FunctionalEngine
+from CPU.Events import EventBus
+from CPU.DebugScreen import DebugScreen
 import time
 
 class Processor:
 
-    def __init__(self, predictor: object):
+    def __init__(self, predictor: object, btbSize: int = 64, directionBufferSize: int = 256, predictorOptions: dict = None, memorySize: int = 1 << 20,
+                 statisticsOptions: dict = None):
         self.registers = Registers()
-        self.mainMemory = MainMemory(100) # 100 byte (lines) main memory
+        self.mainMemory = MainMemory(memorySize) # 1MB data region by default
         self.reorderBuffer = ReorderBuffer(16) # 16 byte (section) buffer
         self.pipelineBuffer = PipelineBuffer(16)
-        self.predictor = predictor(BranchTargetBuffer(64), DirectionBuffer(256))
+        # Predictor options are extra keyword arguments for the predictor (e.g: historyLength for gshare)
+        self.predictor = predictor(BranchTargetBuffer(btbSize), DirectionBuffer(directionBufferSize), **(predictorOptions or {}))
         self.AGU = AGU(self.registers)
+        # Statistics options set how much detail is collected (e.g: timeline bucket size, see Statistics)
+        self.statistics = Statistics(**(statisticsOptions or {}))
+        # Event bus for tools to listen in on the pipeline (see CPU.Events)
+        # Listener lists are kept here too, so each stage only has to check a list is non-empty before publishing (next to no cost w/ no listeners)
+        self.events = EventBus()
+        self._onFetch = self.events.listeners["fetch"]
+        self._onPredict = self.events.listeners["predict"]
+        self._onDecode = self.events.listeners["decode"]
+        self._onExecute = self.events.listeners["execute"]
+        self._onUpdate = self.events.listeners["update"]
+        self._onFlush = self.events.listeners["flush"]
+        self._onCycle = self.events.listeners["cycle"]
+        self.Reset()
+
+    OPERAND_SIZE_SUFFIXES = {1: 'b', 2: 'w', 4: 'l', 8: 'q'} # Operand size (bytes) : register suffix
+
+    PROGRESS_CHECK_CYCLES = 1024 # No. cycles between checks of the clock for rate-limited progress reports
+
+    """
+    Returns processor to the state it was created in (registers, memory, buffers, predictor and results all cleared),
+    so the same processor can run executable after executable without any state carrying over
+    """
+    def Reset(self):
+        self.registers.Reset()
+        self.mainMemory.Reset()
+        self.reorderBuffer.Reset()
+        self.pipelineBuffer.Reset()
+        self.predictor.Reset()
+        self.microOpCache = {} # Pre-decoded mu-ops, keyed by text section location {location: {instruction, microOps, size}}
 
         ## Control signals
         self.running = True
         self.stalledStages = {"Fetch" : False,
                       "Decode" : True,
                       "Execute" : True}
+        self.speculativeFetch = False # Whether instruction in cir was fetched speculatively (predicted taken), so its mu-ops are marked speculative in ROB
         
         ## Misprediction Counting
-        self.predictionTracker = {"Predicted": [], # List contains cycle no.s where mis/prediction occurs
-                                  "Mispredicted": []}
+        self.statistics.Reset()
+        self.flushedBranch = None # (location, cycle no.) of last mispredicted branch, until the pipeline executes again
+
+        ## Cycle Accounting (why cycles are lost, see AccountCycle)
+        self.bubbleCause = "pipelineFill" # Why Execute is stalled (set whenever pipeline is flushed)
+        self.refetching = False # Whether next fetch is from a stalled predictor (re-fetching after a mispredict)
+        self.decodeStall = None # Why Decode couldn't issue this cycle (ROB/pipeline buffer full)
         self.cycleCount = 0
+        self.fastForwardedInstructions = 0 # No. instructions run by the functional engine before the pipeline took over
 
-    DEBUG = {
-            "fetchedInstruction": None,
-            "decodedInstruction": None,
-            "decodedMicroOps": [],
-            "executedMicroOps": {"opcode": None,
-                                   "operand": None,
-                                   "operandSize": None}}
+        ## Program output (everything written by write syscalls)
+        self.programOutput = []
+        self.echoOutput = True
     
     """
     Computes an executable algorithm inoput to it
-    INPUTS: list executable file to run, bool run in debug mode or not
-    RETURNS: dict {cycle nos. of correctly predicted branches, cycle no.s of mispredicted branches}
+    INPUTS: list executable file to run, bool run in debug mode or not,
+            float min. no. seconds between progress reports (None = no progress reports), bool print program output/summary or not,
+            str path to write checkpoints to, int no. cycles between checkpoints (None = no checkpoints),
+            int no. instructions to fast-forward through (functionally, without the pipeline) before simulating the pipeline,
+            bool warm up the predictor while fast-forwarding
+    RETURNS: Statistics branch prediction results of the run (pipeline part only, if fast-forwarded)
+    """
+    def Compute(self, executable: list, debug: bool = False, progressInterval: float = None, echo: bool = True,
+                checkpointPath: str = None, checkpointInterval: int = None, fastForward: int = 0, warmPredictor: bool = True) -> Statistics:
+        self.echoOutput = echo
+        self.LoadExecutable(executable)
+
+        # Fast-forward through the first instructions, then hand over to the pipeline
+        if fastForward > 0:
+            self.FastForward(fastForward, warmPredictor)
+
+        # Run until program exits
+        return self.Run(debug, progressInterval, echo, checkpointPath, checkpointInterval)
+
     """
-    def Compute(self, executable: list, debug: bool) -> dict:
+    Loads an executable into memory, and points rip to the start of it
+    INPUTS: list executable file
+    """
+    def LoadExecutable(self, executable: list):
         # Stage 1 - Move executable into memory
-        for index, line in enumerate(executable):
-            self.mainMemory.Store(f"[{index}]", line)
+        self.mainMemory.LoadExecutable(executable)
         
         # Stage 2 - Assign start of text/data section to segment registers
-        self.registers.Store("cs", self.mainMemory.Retrieve(f"[0]"))
-        self.registers.Store("ds", self.mainMemory.Retrieve(f"[1]"))
+        self.registers.Store("cs", self.mainMemory.Retrieve(0))
+        self.registers.Store("ds", self.mainMemory.Retrieve(1))
 
         # Stage 3 - Assign rip to start of text section
-        self.registers.Store("ripw", self.registers.Load("cs")) # w, as cs is 2 bytes
-        
-        filterOpcode = None
-        filterOperand = None
-        filterCycle = None
-
-        # Stage 4 - Fetch, Decode, Execute, until exit syscall changes running flag
-        while self.running:
-            # Ignore stalled parts of pipeline
-            if not self.stalledStages["Execute"]:
+        self.registers.Store("rip", self.registers.Load("cs"))
+
+    """
+    Runs instructions functionally (without the pipeline) from rip, then gets the pipeline ready to carry on from where it stopped
+    INPUTS: int max. no. instructions to run, bool warm up the predictor w/ every branch run
+    RETURNS: int no. instructions run (fewer than asked for if the program exited)
+    """
+    def FastForward(self, instructions: int, warmPredictor: bool = True) -> int:
+        engine = FunctionalEngine(self)
+        executed = engine.Run(instructions, warmPredictor)
+        engine.HandOff()
+        self.fastForwardedInstructions += executed
+        return executed
+
+    """
+    Empties the pipeline after the last retired instruction, and points rip to the next instruction to run
+    (so the architectural state is exactly as if every retired instruction ran in order, e.g: for the functional engine to carry on from)
+    """
+    def StopPipeline(self):
+        # Oldest mu-op still in ROB belongs to the next instruction (wrong path mu-ops are flushed before they reach the front)
+        # If ROB is empty, nothing after the last retired instruction has been decoded, so the next instruction is at rip
+        if self.reorderBuffer.Size() > 0:
+            self.registers.Store("rip", self.reorderBuffer.Get().location)
+        self.Flush("stop")
+        self.flushedBranch = None
+
+    """
+    Carries on a run from a checkpoint (processor must have been created w/ the same predictor, buffer sizes and memory size)
+    INPUTS: str path to checkpoint, bool run in debug mode or not,
+            float min. no. seconds between progress reports (None = no progress reports), bool print program output/summary or not,
+            int no. cycles between checkpoints, which overwrite the one resumed from (None = no more checkpoints)
+    RETURNS: Statistics branch prediction results of the whole run (including cycles before the checkpoint)
+    """
+    def Resume(self, checkpointPath: str, debug: bool = False, progressInterval: float = None, echo: bool = True,
+               checkpointInterval: int = None) -> Statistics:
+        self.LoadCheckpoint(checkpointPath)
+        return self.Run(debug, progressInterval, echo, checkpointPath, checkpointInterval)
+
+    """
+    Runs the pipeline from its current state until an exit syscall (or until enough instructions have been retired)
+    INPUTS: bool run in debug mode or not, float min. no. seconds between progress reports (None = no progress reports),
+            bool print program output/summary or not, str path to write checkpoints to, int no. cycles between checkpoints (None = no checkpoints),
+            int stop once this many instructions have been retired in total (None = run until exit)
+    RETURNS: Statistics branch prediction results of the run
+    """
+    def Run(self, debug: bool = False, progressInterval: float = None, echo: bool = True,
+            checkpointPath: str = None, checkpointInterval: int = None, maxInstructions: int = None) -> Statistics:
+        if checkpointInterval is not None and (checkpointPath is None or checkpointInterval <= 0):
+            raise Exception(f"Checkpoints need a path to be written to, and a positive no. cycles between them (got {checkpointPath}, every {checkpointInterval} cycles)")
+        self.echoOutput = echo
+
+        # Debugging screen listens to the pipeline's events for the length of the run
+        debugScreen = None
+        if debug:
+            debugScreen = DebugScreen(self)
+            debugScreen.Attach()
+
+        # Progress reports are rate-limited (at most one every progressInterval seconds)
+        lastProgressReport = time.monotonic()
+
+        # Fetch, Decode, Execute, until exit syscall changes running flag
+        while self.running and (maxInstructions is None or self.statistics.instructions < maxInstructions):
+            # Ignore stalled parts of pipeline (noting which stages ran, to account for the cycle)
+            executed = not self.stalledStages["Execute"]
+            if executed:
                 self.Execute()
             if not self.stalledStages["Decode"]:
                 self.Decode()
-            if not self.stalledStages["Fetch"]:
+            fetched = not self.stalledStages["Fetch"]
+            if fetched:
                 self.Fetch()
+            self.AccountCycle(executed, fetched)
 
-            if debug:
-                # Debugging screen
-                print(f"""
-        -----------------------CYCLE {self.cycleCount}-----------------------
-                        PROGRAM COUNTER: {self.registers.Load("rip")}
-                        {f"Fetched: {self.DEBUG["fetchedInstruction"]} from location: {self.registers.Load("mar")}" if self.DEBUG["fetchedInstruction"] is not None else "Fetched stalled!"}
-                        Decoded: 
-                        {f"{self.DEBUG["decodedInstruction"]} into micro-ops: {self.DEBUG["decodedMicroOps"]}." if self.DEBUG["decodedMicroOps"] != [] else "Decode Stalled!"}
-                        Executed: 
-                        {f"{self.DEBUG["executedMicroOps"]}." if self.DEBUG["executedMicroOps"]["opcode"] is not None else "Execute Stalled!"}
-                        
-                        Pipeline: {self.pipelineBuffer._Buffer}
-                        (Front Pointer: {self.pipelineBuffer._frontPointer} Rear Pointer: {self.pipelineBuffer._rearPointer})
-
-                        Re-Order Buffer: {self.reorderBuffer._Buffer}
-                        (Front Pointer: {self.reorderBuffer._frontPointer} Rear Pointer: {self.reorderBuffer._rearPointer})
-
-                        Registers: {self.registers.Registers.items()}
-
-                        Main Memory: {self.mainMemory.__data__}
-                """)
-
-                if  (
-                        (
-                            (self.DEBUG["executedMicroOps"]["opcode"] == filterOpcode and filterOpcode is not None)\
-                            or (self.DEBUG["executedMicroOps"]["operand"] == filterOperand and filterOperand is not None)\
-                            or (self.cycleCount == filterCycle and filterCycle is not None)\
-                        )\
-                    )\
-                    or (\
-                            filterOpcode == None\
-                            and filterOperand == None\
-                            and filterCycle == None\
-                        ):
-                    
-                    # Reset filters
-                    filterOpcode = None 
-                    filterOperand = None
-                    filterCycle = None
-                    
-                    print("""
-                        NEXT CYCLE? (C to set breakpoint on next opcode, A to set breakpoint on next operand, N to set breakpoint on specific cycle)
-                        """)
-
-                    response = input()
-                    if response == 'C':
-                        filterOpcode = input("Enter opcode to set breakpoint on: ")
-                    elif response == 'A':
-                        filterOperand = input("Enter operand to set breakpoint on: ")
-                    elif response == 'N':
-                        filterCycle = int(input("Enter cycle number to set breakpoint on: "))
-
-            print(f"Cycle no. : {self.cycleCount}")
-            # Reset cycle data, increment cycle no, unstall fetch if stalled
-            self.DEBUG = {
-            "fetchedInstruction": None,
-            "decodedInstruction": None,
-            "decodedMicroOps": [],
-            "executedMicroOps": {"opcode": None,
-                                   "operand": None,
-                                   "operandSize": None}}
+            if self._onCycle:
+                self.events.Publish("cycle", self.cycleCount, executed, fetched)
+
+            if progressInterval is not None and self.cycleCount % self.PROGRESS_CHECK_CYCLES == 0:
+                currentTime = time.monotonic()
+                if currentTime - lastProgressReport >= progressInterval:
+                    print(f"Cycle no. : {self.cycleCount}")
+                    lastProgressReport = currentTime
+
+            # Increment cycle no, unstall fetch if stalled
             self.stalledStages["Fetch"] = False
             self.cycleCount += 1
 
-        # Stage 5 - Stop executing
-        print(f"DONE! In {self.cycleCount} cycles\nHave a nice day :)")
-        return self.predictionTracker
+            # Checkpoints are taken between cycles, so a resumed run starts at the beginning of a cycle
+            if checkpointInterval is not None and self.cycleCount % checkpointInterval == 0 and self.running:
+                self.SaveCheckpoint(checkpointPath)
+
+        if debugScreen is not None:
+            debugScreen.Detach()
+
+        # Stop executing
+        if echo and not self.running:
+            print(f"DONE! In {self.cycleCount} cycles\nHave a nice day :)")
+            self.PrintCPIStack()
+        return self.statistics
+
+    """
+    Collects the full state of the processor between cycles (for checkpointing)
+    The mu-op cache isn't included, as it's rebuilt from main memory as instructions are decoded again
+    RETURNS: dict state
+    """
+    def GetState(self) -> dict:
+        return {"registers": self.registers.GetState(),
+                "mainMemory": self.mainMemory.GetState(),
+                "reorderBuffer": self.reorderBuffer.GetState(),
+                "pipelineBuffer": self.pipelineBuffer.GetState(),
+                "predictor": self.predictor.GetState(),
+                "statistics": self.statistics.GetState(),
+                "running": self.running,
+                "stalledStages": self.stalledStages,
+                "speculativeFetch": self.speculativeFetch,
+                "cycleCount": self.cycleCount,
+                "fastForwardedInstructions": self.fastForwardedInstructions,
+                "flushedBranch": self.flushedBranch,
+                "bubbleCause": self.bubbleCause,
+                "refetching": self.refetching,
+                "programOutput": self.programOutput}
+
+    """
+    Puts the processor back in a state returned by GetState
+    INPUTS: dict state
+    """
+    def SetState(self, state: dict):
+        self.Reset()
+        self.registers.SetState(state["registers"])
+        self.mainMemory.SetState(state["mainMemory"])
+        self.reorderBuffer.SetState(state["reorderBuffer"])
+        self.pipelineBuffer.SetState(state["pipelineBuffer"])
+        self.predictor.SetState(state["predictor"])
+        self.statistics.SetState(state["statistics"])
+        self.running = state["running"]
+        self.stalledStages.update(state["stalledStages"])
+        self.speculativeFetch = state["speculativeFetch"]
+        self.cycleCount = state["cycleCount"]
+        self.fastForwardedInstructions = state["fastForwardedInstructions"]
+        self.flushedBranch = tuple(state["flushedBranch"]) if state["flushedBranch"] is not None else None
+        self.bubbleCause = state["bubbleCause"]
+        self.refetching = state["refetching"]
+        self.programOutput = state["programOutput"]
+
+    """
+    Writes the full state of the processor to a checkpoint file
+    INPUTS: str path to write to
+    """
+    def SaveCheckpoint(self, path: str):
+        WriteCheckpoint(path, self.GetState())
+
+    """
+    Puts the processor back in the state saved in a checkpoint file
+    INPUTS: str path to checkpoint
+    """
+    def LoadCheckpoint(self, path: str):
+        self.SetState(ReadCheckpoint(path))
+
+    """
+    Works out what the cycle was spent on, and records it in the statistics (building up a CPI stack)
+    If Execute ran, the cycle did useful work. Otherwise, it was lost to whatever stalled the pipeline
+    INPUTS: bool whether Execute ran this cycle, bool whether Fetch ran this cycle
+    """
+    def AccountCycle(self, executed: bool, fetched: bool):
+        if executed:
+            category = "execute"
+        elif self.decodeStall is not None:
+            category = self.decodeStall
+        elif fetched and self.refetching:
+            category = "predictorStall"
+        else:
+            category = self.bubbleCause
+        self.statistics.RecordCycle(category)
+
+        if fetched:
+            self.refetching = False
+        self.decodeStall = None
+
+    """
+    Prints the CPI stack of the run (cycles per instruction, split up by what the cycles were spent on)
+    """
+    def PrintCPIStack(self):
+        cpiStack = self.statistics.GetCPIStack()
+        if cpiStack["cpi"] is None:
+            return
+        print(f"CPI: {cpiStack['cpi']:.3f} ({cpiStack['instructions']} instructions)")
+        for category, cpi in cpiStack["stack"].items():
+            print(f"    {category:<20} {cpi:.3f} ({self.statistics.cycles[category]} cycles)")
             
 
 
@@ -138,8 +301,10 @@ class Processor:
 
     def Fetch(self):
         ## Stage 1: Branch Prediction (Predict next rip value)
-        rip = self.registers.Load("ripb") # As only first byte contains instruction pointer (bodge as rip is an 8 byte int on a cpu that only deals with 1 byte ints)
+        rip = self.registers.Load("rip")
         prediction = self.predictor.Predict(rip)
+        if self._onPredict:
+            self.events.Publish("predict", self.cycleCount, rip, prediction)
         if rip + 1 == prediction: # No branch taken
             speculative = False
         else: # Branch taken
@@ -151,36 +316,66 @@ class Processor:
         self.registers.Store("mar", self.registers.Load("rip"))
 
         # Check rip value is within text section
-        if prediction < self.registers.Load("csb") or prediction >= self.registers.Load("dsb"):
+        if prediction < self.registers.Load("cs") or prediction >= self.registers.Load("ds"):
             self.registers.Store("mbr", "noop")
         else:
-            self.registers.Store("mbr", self.mainMemory.Retrieve(f"[{self.registers.Load("marb")}]"))
+            self.registers.Store("mbr", self.mainMemory.Retrieve(self.registers.Load("mar")))
+
+        self.registers.Store("cir", self.registers.Load("mbr"))
+        self.speculativeFetch = speculative # Denote to decoder that mu-ops should be marked as speculative in ROB
 
-        if speculative: # Denote to decoder that mu-ops should be marked as speculative in ROB (by putting a * at end of instruction)
-            self.registers.Store("cir", f"{self.registers.Load("mbr")}*")
-        else:
-            self.registers.Store("cir", self.registers.Load("mbr"))
-        
         # Unstall Decode for next cycle
         self.stalledStages["Decode"] = False
 
-        ## Return fetc  hed instruction for output console
-        self.DEBUG["fetchedInstruction"] = self.registers.Load("cir")
+        if self._onFetch:
+            self.events.Publish("fetch", self.cycleCount, prediction, self.registers.Load("mbr"), speculative)
 
     def Decode(self):
         # TODO: Return if nothing in cir
-        ## Stage 0 (*): Determine if instruction is speculative
+        ## Stage 0: Determine if instruction is speculative (if so, its mu-ops will need to be marked in ROB)
         currentInstruction = self.registers.Load("cir")
-
-        if currentInstruction.endswith('*'):
-            speculative = True # If so, will need to be marked in mu-op queue to be marked in ROB
-            currentInstruction = currentInstruction.rstrip('*')
-        else:
-            speculative = False
+        speculative = self.speculativeFetch
 
         ## Stage 1: Break instruction into mu-ops
+        # Instructions at a given location never change, so only decode each location once, and re-issue the cached mu-ops after that
+        location = self.registers.Load("rip")
+        decodedInstruction = self.microOpCache.get(location)
+        if decodedInstruction is None:
+            decodedInstruction = self.DecodeInstruction(currentInstruction, location)
+            self.microOpCache[location] = decodedInstruction
+        mu_opBuffer = decodedInstruction["microOps"]
+
+        ## Stage 2 - 3 : Insert mu-ops into ROB and Pipeline Buffer (Not using reservation stations, as no tommasulo)
+
+        # Check if there's enough space in ROB and Pipeline Buffer for mu-ops (if not, fetch stalls) 
+        robOutOfSpace = self.reorderBuffer.GetNumberOfFreeSpaces() < len(mu_opBuffer)
+        pipelineOutOfSpace = self.pipelineBuffer.GetNumberOfFreeSpaces() < len(mu_opBuffer)
+
+        if robOutOfSpace or pipelineOutOfSpace:
+            self.stalledStages["Fetch"] = True
+            self.decodeStall = "robFull" if robOutOfSpace else "pipelineBufferFull"
+            self.statistics.RecordDecodeStall(self.decodeStall)
+            return
+
+        # Insert mu-ops into ROB and pipeline buffer (speculative mu-ops are marked in ROB)
+        self.reorderBuffer.Add(mu_opBuffer, decodedInstruction["size"], speculative)
+        self.pipelineBuffer.Add(mu_opBuffer, decodedInstruction["size"])
+
+        # Unstall fetch and execute for next cycle
+        self.stalledStages["Fetch"] = False
+        self.stalledStages["Execute"] = False
+
+        if self._onDecode:
+            self.events.Publish("decode", self.cycleCount, location, decodedInstruction["instruction"], mu_opBuffer)
+
+    """
+    Breaks an instruction into its mu-ops (only done once per location - result is stored in the mu-op cache)
+    INPUTS: str instruction, int text section location of instruction
+    RETURNS: dict {str instruction, list mu-op records (MicroOp), int size of operation (bytes)}
+    """
+    def DecodeInstruction(self, instruction: str, location: int) -> dict:
         # Split into tokens [opcode, operands..]
-        decomposedInstruction = currentInstruction.split()
+        decomposedInstruction = instruction.split()
     
         # Match opcode to set of mu-ops
         opcode = decomposedInstruction[0]
@@ -208,88 +403,92 @@ class Processor:
         match opcode:
             # mov a, b -> LOAD b, STO a
             case "mov":
-                mu_opBuffer.append("LOAD " + operands[1])
-                mu_opBuffer.append("STO " + operands[0])
+                mu_opBuffer.append((Opcode.LOAD, operands[1]))
+                mu_opBuffer.append((Opcode.STO, operands[0]))
             # jmp/je a -> JMP/JE/..
             case "jmp" | "je" | "jne" | "jg" | "jl" | "jge" | "jle":
-                mu_opBuffer.append("LOAD " + operands[0])
-                mu_opBuffer.append("JMP " + opcode.lstrip('j')) # e.g: JMP e / JMP ne / JMP g / JMP l / JMP mp (unconditional)
+                mu_opBuffer.append((Opcode.LOAD, operands[0]))
+                mu_opBuffer.append((Opcode.JMP, opcode.lstrip('j'))) # e.g: JMP e / JMP ne / JMP g / JMP l / JMP mp (unconditional)
             # inc/dec a -> LOAD a, ADD/SUB 1, STO a
             case "inc" | "dec":
-                mu_opBuffer.append("LOAD " + operands[0])
-                mu_opBuffer.append("ADD 1" if opcode == "inc" else "SUB 1")
-                mu_opBuffer.append("STO " + operands[0])
+                mu_opBuffer.append((Opcode.LOAD, operands[0]))
+                mu_opBuffer.append((Opcode.ADD, 1) if opcode == "inc" else (Opcode.SUB, 1))
+                mu_opBuffer.append((Opcode.STO, operands[0]))
             # cmp a, b -> LOAD b, CMP a
             case "cmp":
-                mu_opBuffer.append("LOAD " + operands[1])
-                mu_opBuffer.append("CMP " + operands[0])
+                mu_opBuffer.append((Opcode.LOAD, operands[1]))
+                mu_opBuffer.append((Opcode.CMP, operands[0]))
             # syscall -> syscall
             case "syscall":
-                mu_opBuffer.append("SYSCALL")
+                mu_opBuffer.append((Opcode.SYSCALL, None))
             # noop -> NOOP
             case "noop":
-                mu_opBuffer.append("NOOP")
+                mu_opBuffer.append((Opcode.NOOP, None))
             case _:
                 raise Exception(f"Invalid operation received: {opcode}")
-        
-        # Mark instructions if speculative
-        if speculative:
-            mu_opBuffer = list(map(lambda x: x+'*' , mu_opBuffer))
 
-        ## Stage 2 - 3 : Insert mu-ops into ROB and Pipeline Buffer (Not using reservation stations, as no tommasulo)
-
-        # Check if there's enough space in ROB and Pipeline Buffer for mu-ops (if not, fetch stalls) 
-        robOutOfSpace = self.reorderBuffer.GetNumberOfFreeSpaces() < len(mu_opBuffer)
-        pipelineOutOfSpace = self.pipelineBuffer.GetNumberOfFreeSpaces() < len(mu_opBuffer)
-
-        if robOutOfSpace or pipelineOutOfSpace:
-            self.stalledStages["Fetch"] = True
-            return
+        microOps = [self.CreateMicroOp(mu_opcode, operand, size, location) for mu_opcode, operand in mu_opBuffer]
+        microOps[-1].retiresInstruction = True # Instruction is complete once its last mu-op has executed
+        return {"instruction": instruction,
+                "microOps": microOps,
+                "size": size}
 
-        # Insert mu-ops into ROB and pipeline buffer
-        self.reorderBuffer.Add(mu_opBuffer, size, {"location" :self.registers.Load("ripb")})
-        self.pipelineBuffer.Add(mu_opBuffer, size)
-
-        # Unstall fetch and execute for next cycle
-        self.stalledStages["Fetch"] = False
-        self.stalledStages["Execute"] = False
-        
-        self.DEBUG["decodedInstruction"] = currentInstruction
-        self.DEBUG["decodedMicroOps"] = mu_opBuffer
+    """
+    Creates a mu-op record, ready to be issued to the ROB and pipeline buffer
+    INPUTS: Opcode opcode, int/str operand (e.g: [rdi+1], None if opcode doesn't take one),
+            int operandSize (no. bytes the operation involves), int text section location of mu-op's instruction
+    RETURNS: MicroOp mu-op record
+    """
+    def CreateMicroOp(self, opcode: Opcode, operand: int|str|None, operandSize: int, location: int) -> MicroOp:
+        # Convert operand to int, if possible
+        if type(operand) is str and operand.isnumeric():
+            operand = int(operand)
+        return MicroOp(opcode, operand, operandSize, self.isMemoryAddress(operand), location)
 
     def Execute(self):
+        # Stage 0 : If pipeline was flushed by a mispredict, it's running again - record the cycles lost
+        if self.flushedBranch is not None:
+            branchSource, flushCycle = self.flushedBranch
+            self.statistics.RecordPenalty(branchSource, self.cycleCount - flushCycle - 1)
+            self.flushedBranch = None
+
         # Stage 1 : Get next mu-op in pipeline buffer
         mu_op = self.pipelineBuffer.Get()
-        self.DEBUG["executedMicroOps"] = mu_op
+        if self._onExecute:
+            self.events.Publish("execute", self.cycleCount, mu_op.location, mu_op)
 
         # Stage 2 : If operand is a memory address, run through AGU to calculate mem address to access
-        if self.isMemoryAddress(mu_op["operand"]):
-            mu_op["operand"] = self.AGU.Generate(mu_op["operand"])
+        # (mu-op records are shared with the mu-op cache, so the generated address is kept separate from the record)
+        operand = mu_op.operand
+        operandSize = mu_op.operandSize
+        address = self.AGU.Generate(operand) if mu_op.memoryOperand else None
 
         # Stage 2 : Invoke correct subroutine for instruction
-        match mu_op["opcode"]:
-            case "LOAD":
-                self.Load(mu_op["operand"])
-            case "STO":
-                self.Store(mu_op["operand"])
-            case "JMP":
-                self.Jump(mu_op["operand"])
-            case "ADD":
-                self.Add(mu_op["operand"])
-            case "SUB":
-                self.Subtract(mu_op["operand"])
-            case "CMP":
-                self.Compare(mu_op["operand"])
-            case "SYSCALL":
+        match mu_op.opcode:
+            case Opcode.LOAD:
+                self.Load(operand, address, operandSize)
+            case Opcode.STO:
+                self.Store(operand, address, operandSize)
+            case Opcode.JMP:
+                self.Jump(operand)
+            case Opcode.ADD:
+                self.Add(operand, address, operandSize)
+            case Opcode.SUB:
+                self.Subtract(operand, operandSize)
+            case Opcode.CMP:
+                self.Compare(operand, address, operandSize)
+            case Opcode.SYSCALL:
                 self.Syscall() # Syscall doesn't take an operand
-            case "NOOP":
+            case Opcode.NOOP:
                 pass # No operation
             case _:
-                raise Exception(f"Tried to execute invalid opcode! {mu_op['opcode']}")
+                raise Exception(f"Tried to execute invalid opcode! {mu_op.opcode}")
             
         # Stage 3 : Remove mu-op from pipeline buffer + ROB
         self.pipelineBuffer.Remove()
         self.reorderBuffer.Remove()
+        if mu_op.retiresInstruction:
+            self.statistics.RecordInstruction()
 
 
     ##-------INSTRUCTION SET-------##
@@ -299,10 +498,10 @@ class Processor:
     # LOAD a
     # Load a into rax
     #-------------
-    def Load(self, operand: int|str):
-        # Find value of src
-        if self.isMemoryAddress(operand):
-            src = self.mainMemory.Retrieve(operand)
+    def Load(self, operand: int|str, address: int = None, operandSize: int = 8):
+        # Find value of src (address = memory address generated by the AGU, if operand is a memory address)
+        if address is not None:
+            src = self.mainMemory.Retrieve(address, operandSize)
 
         elif self.isRegister(operand):
             src = self.registers.Load(operand)
@@ -321,24 +520,23 @@ class Processor:
     # STO a
     # Store value of rax in location a
     #-------------
-    def Store(self, operand: int|str):
-        operandSize = self.pipelineBuffer.Get()["operandSize"]
+    def Store(self, operand: int|str, address: int = None, operandSize: int = 8):
         match operandSize:
             case 1:
-                address = "raxb"
+                source = "raxb"
             case 2:
-                address = "raxw"
+                source = "raxw"
             case 4:
-                address = "raxl"
+                source = "raxl"
             case 8:
-                address = "raxq"
+                source = "raxq"
             case _:
                 raise Exception(f"Invalid operand size specified: Expected 1, 2, 4, or 8, got {operandSize}")
             
-        value = self.registers.Load(address)
+        value = self.registers.Load(source)
         # Find location to store
-        if self.isMemoryAddress(operand):
-            self.mainMemory.Store(operand, value)
+        if address is not None:
+            self.mainMemory.Store(address, value, operandSize)
 
         elif self.isRegister(operand):
             self.registers.Store(operand, value)
@@ -354,9 +552,9 @@ class Processor:
     # ADD a
     # Add a to rax. a could be register, location, or immediate value
     #-------------
-    def Add(self, operand : int|str):
-        if self.isMemoryAddress(operand):
-            value = self.mainMemory.Retrieve(operand)
+    def Add(self, operand : int|str, address: int = None, operandSize: int = 8):
+        if address is not None:
+            value = self.mainMemory.Retrieve(address, operandSize)
         
         elif self.isRegister(operand):
             value = self.registers.Load(operand)
@@ -370,16 +568,7 @@ class Processor:
         
         # Add value to rax
         try:
-            rax = self.registers.Load("rax")
-            # If int, just add to lowest byte of rax
-            if type(value) == int:
-                rax[0] += value
-            # If list, add each element of value to rax in correct index
-            else:
-                for i in range(len(value)):
-                    rax[i] += value[i]
-
-            self.registers.Store("rax", rax)
+            self.registers.Store("rax", self.registers.Load("rax") + value)
 
         except:
             raise Exception(f"Couldn't add operand\n\
@@ -389,34 +578,24 @@ class Processor:
     # SUB a
     # Subtract a from rax 
     #-------------
-    def Subtract(self, operand : int|str):
-        return self.Add(-operand)
+    def Subtract(self, operand : int|str, operandSize: int = 8):
+        return self.Add(-operand, None, operandSize)
 
     #------LOGIC------#
     #-------------
     # cmp a
     # Changes flags in eflags based on a comparison between minuend and subtrahend
     #-------------
-    def Compare(self, operand: list):
-        # Retrieve minuend, convert from list of bytes to int
-        minuend = 0
-        rax = self.registers.Load("rax")
-        for index, byte in enumerate(rax):
-            minuend += byte * 2**index
+    def Compare(self, operand: int|str, address: int = None, operandSize: int = 8):
+        # Retrieve minuend
+        minuend = self.registers.Load("rax")
 
         # Retrieve Subtrahend
-        if self.isMemoryAddress(operand):
-            subtrahend = self.mainMemory.Retrieve(operand)
+        if address is not None:
+            subtrahend = self.mainMemory.Retrieve(address, operandSize)
 
         elif self.isRegister(operand):
-            # Convert from list of bytes to int
-            subtrahend = 0
-            register = self.registers.Load(operand)
-            if type(register) is int:
-                subtrahend = register
-            else:
-                for index, byte in enumerate(register):
-                    subtrahend += byte * 2**index
+            subtrahend = self.registers.Load(operand)
 
         elif self.isImmediateValue(operand): # Immediate value
             subtrahend = operand
@@ -425,16 +604,21 @@ class Processor:
             raise Exception(f"Unexpected minuend:\n\
                             Operand: {operand}")
 
-        difference = minuend - int(subtrahend)
+        # Difference is worked out at the size of the operation (in two's complement), so the top bit is the sign bit
+        mask = SUFFIX_MASKS[self.OPERAND_SIZE_SUFFIXES[operandSize]]
+        difference = (minuend - int(subtrahend)) & mask
 
         ## Modify eflags based on changes
-        eflags = self.registers.Load("eflags")
+        eflags = 0
         # SF = 1 if difference < 0
-        eflags["SF"] = 1 if difference < 0 else 0
+        if difference > (mask >> 1):
+            eflags |= SF
         # ZF = 1 if difference = 0
-        eflags["ZF"] = 1 if difference == 0 else 0
+        if difference == 0:
+            eflags |= ZF
         # PF = 1 if difference = even
-        eflags["PF"] = 1 if difference % 2 == 0 else 0
+        if difference % 2 == 0:
+            eflags |= PF
 
         self.registers.Store("eflags", eflags)
 
@@ -446,88 +630,99 @@ class Processor:
     # Jumps to address in rax, based on result of condition a
     #-------------
     def Jump(self, operand: int|str):
-        # Check if comparison condition is met in eflags
-        # JMP e / JMP ne / JMP g / JMP l / JMP ge / JMP le / JMP mp
-        eflags = self.registers.Load("eflags")
-        match operand:
-            case 'e':
-                comparisonMet = eflags["ZF"]
-            case "ne":
-                comparisonMet = not eflags["ZF"]
-            case 'g':
-                comparisonMet = eflags["SF"]
-            case 'l':
-                comparisonMet = not eflags["SF"]
-            case "ge":
-                comparisonMet = eflags["SF"] or eflags["ZF"]
-            case "le":
-                comparisonMet = not eflags["SF"] or eflags["ZF"] # Seems to logically be LE
-            case "mp":
-                comparisonMet = True
+        comparisonMet = self.ConditionMet(operand)
 
         # Update branch predictor with result
-        branchSource = self.reorderBuffer.Get()["location"]
-        branchDestination = self.registers.Load("raxb")
+        branchSource = self.reorderBuffer.Get().location
+        branchDestination = self.registers.Load("rax")
         self.predictor.Update(branchSource, branchDestination, bool(comparisonMet))
 
         # If met, next fetch location = rax
         if comparisonMet:
             nextFetchLocation = self.registers.Load("rax")
         else:
-            nextFetchLocation = self.reorderBuffer.Get()["location"] + 1 # +1 as want intruction AFTER branch
+            nextFetchLocation = branchSource + 1 # +1 as want intruction AFTER branch
 
         # Check if direction of branch correctly predicted - if not, flush pipeline, stall predictor, and point rip to correct address
         nextMu_op = self.reorderBuffer.Get(1)
-        if comparisonMet != nextMu_op["speculative"]:
-            self.Flush()
+        mispredicted = comparisonMet != nextMu_op.speculative
+        if mispredicted:
+            self.Flush("mispredict")
             self.predictor.Stall()
             self.registers.Store("rip", nextFetchLocation)
-            # Add cycle number to misprediction tracker
-            self.predictionTracker["Mispredicted"].append(self.cycleCount)
-        else:
-            # Add cycle number to prediction tracker
-            self.predictionTracker["Predicted"].append(self.cycleCount)
+            self.flushedBranch = (branchSource, self.cycleCount)
+            self.bubbleCause = "mispredictFlush"
+            self.refetching = True
+
+        # Record result in statistics
+        self.statistics.RecordBranch(self.cycleCount, branchSource, bool(comparisonMet), mispredicted)
+        if self._onUpdate:
+            self.events.Publish("update", self.cycleCount, branchSource, branchDestination, bool(comparisonMet), mispredicted)
 
         return
 
+    """
+    Checks if a jump's comparison condition is met in eflags
+    INPUTS: str condition (e / ne / g / l / ge / le / mp (unconditional))
+    RETURNS: bool condition met (= branch taken)
+    """
+    def ConditionMet(self, condition: str) -> bool:
+        eflags = self.registers.Load("eflags")
+        zeroFlag = eflags & ZF != 0
+        signFlag = eflags & SF != 0
+        match condition:
+            case 'e':
+                comparisonMet = zeroFlag
+            case "ne":
+                comparisonMet = not zeroFlag
+            case 'g':
+                comparisonMet = signFlag
+            case 'l':
+                comparisonMet = not signFlag
+            case "ge":
+                comparisonMet = signFlag or zeroFlag
+            case "le":
+                comparisonMet = not signFlag or zeroFlag # Seems to logically be LE
+            case "mp":
+                comparisonMet = True
+        return comparisonMet
+
     # SYSCALL
     # Performs a OS call operation (like printing to screen)
     def Syscall(self):
         ## Accepted Syscalls
-        callType = self.registers.Load("raxb")
+        callType = self.registers.Load("rax")
         match callType:
             ## 1 - Write
             case 1:
                 ## Get all elements in memory that are in range
-                # Convert start address and size from list -> ints
-                rsi = self.registers.Load("rsi")
-                startAddress = 0
-                for index, byte in enumerate(rsi):
-                    startAddress += byte * 2**index
-
-                rdx = self.registers.Load("rdx")
-                size = 0
-                for index, byte in enumerate(rdx):
-                    size += byte * 2**index
+                startAddress = self.registers.Load("rsi")
+                size = self.registers.Load("rdx")
                 # Put elements in write buffer
                 writeBuffer = []
                 for i in range(size):
-                    writeBuffer.append(self.mainMemory.Retrieve(f"[{startAddress + i}]"))
+                    writeBuffer.append(self.mainMemory.Retrieve(startAddress + i))
 
                 ## Output elements
-                print(writeBuffer)
+                self.programOutput.append(writeBuffer)
+                if self.echoOutput:
+                    print(writeBuffer)
                 return
             ## 60 - Exit
             case 60:
                 # Set running signal to 0 - stops FDE
                 self.running = False
                 # Flush pipeline
-                self.Flush()
+                self.Flush("exit")
+                self.bubbleCause = "syscallDrain"
                 return
 
     ##-------SPECIAL INSTRUCTIONS-------##
     # Flushes pipeline
-    def Flush(self):
+    # (cause is passed on to flush listeners: mispredict / exit / handOff / stop)
+    def Flush(self, cause: str = None):
+        if self._onFlush:
+            self.events.Publish("flush", self.cycleCount, cause)
         # Clear ROB, Pipeline buffer
         self.reorderBuffer.Flush()
         self.pipelineBuffer.Flush()
@@ -536,9 +731,9 @@ class Processor:
         self.registers.Store("mbr", '')
         self.registers.Store("cir", '')
         # Stall all pipeline stages
-        self.stalledStages = {"Fetch": True,
-                      "Decode": True,
-                      "Execute": True}
+        self.stalledStages["Fetch"] = True
+        self.stalledStages["Decode"] = True
+        self.stalledStages["Execute"] = True
 
     def isMemoryAddress(self, src: str) -> bool:
         if type(src) is not str:
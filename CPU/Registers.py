@@ -1,124 +1,144 @@
-class Registers:
-    ##-------REGISTERS-------##
-    Registers = {
+from array import array
+
+##-------REGISTER FILE LAYOUT-------##
+# Every (integer) register is a 64 bit slot in the register file, at the index given here
+REGISTER_NAMES = [
                 #--CALLEE-OWNED--#
-                "rax": [0 for i in range(8)], # Accumulator / Return value
-                "rdi": [0 for i in range(8)], # 1st arg
-                "rsi": [0 for i in range(8)], # 2nd arg
-                "rdx": [0 for i in range(8)], # 3rd arg
-                "rcx": [0 for i in range(8)], # 4th arg
-                "r8": [0 for i in range(8)], # 5th arg
-                "r9": [0 for i in range(8)], # 6th arg
-                "r10": [0 for i in range(8)], # temp
-                "r11": [0 for i in range(8)], # temp
+                "rax", # Accumulator / Return value
+                "rdi", # 1st arg
+                "rsi", # 2nd arg
+                "rdx", # 3rd arg
+                "rcx", # 4th arg
+                "r8", # 5th arg
+                "r9", # 6th arg
+                "r10", # temp
+                "r11", # temp
                 #--CALLER-OWNED (local vars)--#
-                "rbx": [0 for i in range(8)], 
-                "rbp": [0 for i in range(8)],
-                "r12": [0 for i in range(8)],
-                "r13": [0 for i in range(8)],
-                "r14": [0 for i in range(8)],
-                "r15": [0 for i in range(8)],
+                "rbx",
+                "rbp",
+                "r12",
+                "r13",
+                "r14",
+                "r15",
                 #--Address Registers--#
-                "rsp": [0 for i in range(8)], # Stack pointer - caller-owned
+                "rsp", # Stack pointer - caller-owned
 
-                # Status/condition code bits - used to store result of comp operations
-                "eflags": {
-                           'PF': 0, # Parity Flag - Indicates result of previous operation was odd (0) or even (1)
-                           'ZF': 0, # Zero Flag - Indicates result of previous operation was 0
-                           'SF': 0, # Sign Flag - Indicates result of previous operation was negative
-                           #CF, OF, AF Only needed if compaisons are done between binary numbers 
-                           }, 
+                # Status/condition code bits - used to store result of comp operations (bitfield, see EFLAGS BITS)
+                "eflags",
 
                 #--INTERNAL REGISTERS--#
-                "rip": [0 for i in range(8)], # Instruction pointer (Program Counter)
-                "mbr": [0 for i in range(8)], # Memory Buffer Register
-                "mar": [0 for i in range(8)], # Memory Address Register
-                "cir": [0 for i in range(8)], # Current Instruction register (Can't find any documentation on this - might be bc you can't change its value programatically?)
-                
+                "rip", # Instruction pointer (Program Counter)
+                "mar", # Memory Address Register
+
                 #--SEGMENT REGISTERS--#
-                "cs": [0 for i in range(2)], # (start of) Code(text) segment pointer  
-                "ds": [0 for i in range(2)], # (start of) Data segment pointer
-                "ss": [0 for i in range(2)] # (start of) Stack segment pointer (not currently implemented)
+                "cs", # (start of) Code(text) segment pointer
+                "ds", # (start of) Data segment pointer
+                "ss" # (start of) Stack segment pointer (not currently implemented)
+                ]
+
+# Registers that hold instructions (strings), rather than integers, so are kept outside the register file
+INSTRUCTION_REGISTERS = [
+                "mbr", # Memory Buffer Register
+                "cir" # Current Instruction register (Can't find any documentation on this - might be bc you can't change its value programatically?)
+                ]
+
+# Suffix : bits of the register accessed (from the lowest bit)
+SUFFIX_MASKS = {
+                'b': 0xFF, # Byte (8 bits) (last byte)
+                'w': 0xFFFF, # Word (16 bits) (last 2 bytes)
+                'l': 0xFFFFFFFF, # Long (32 bits) (last 4 bytes)
+                'q': 0xFFFFFFFFFFFFFFFF # Quadword (64 bits) (whole 8 bytes)
                 }
-    
+REGISTER_MASK = SUFFIX_MASKS['q'] # No suffix = whole register (8 bytes)
+
+# Register name (including suffix) : (index in register file, mask of bits accessed)
+# Worked out once here, so loading/storing a register is a single lookup
+REGISTER_VIEWS = {name + suffix: (index, mask)
+                  for index, name in enumerate(REGISTER_NAMES)
+                  for suffix, mask in [('', REGISTER_MASK)] + list(SUFFIX_MASKS.items())}
+
+##-------EFLAGS BITS-------##
+PF = 1 << 2 # Parity Flag - Indicates result of previous operation was odd (0) or even (1)
+ZF = 1 << 6 # Zero Flag - Indicates result of previous operation was 0
+SF = 1 << 7 # Sign Flag - Indicates result of previous operation was negative
+#CF, OF, AF Only needed if compaisons are done between binary numbers
+
+class Registers:
+    def __init__(self):
+        ##-------REGISTERS-------##
+        # Register file - one unsigned 64 bit int per register in REGISTER_NAMES
+        self.File = array('Q', [0 for i in range(len(REGISTER_NAMES))])
+        self.InstructionRegisters = {name: '' for name in INSTRUCTION_REGISTERS}
+
+    """
+    Sets every register back to 0 (and empties instruction registers)
+    """
+    def Reset(self):
+        for index in range(len(self.File)):
+            self.File[index] = 0
+        for name in self.InstructionRegisters:
+            self.InstructionRegisters[name] = ''
+
+    """
+    Returns the contents of every register (for checkpointing)
+    RETURNS: dict {bytes register file, dict instruction registers}
+    """
+    def GetState(self) -> dict:
+        return {"file": self.File.tobytes(),
+                "instructionRegisters": dict(self.InstructionRegisters)}
+
+    """
+    Restores every register from a checkpoint (in place, as the AGU's compiled addresses load from this register file)
+    INPUTS: dict state (from GetState)
+    """
+    def SetState(self, state: dict):
+        registerFile = array('Q')
+        registerFile.frombytes(state["file"])
+        if len(registerFile) != len(self.File):
+            raise Exception(f"Checkpoint has {len(registerFile)} registers, expected {len(self.File)}!")
+        self.File[:] = registerFile
+        self.InstructionRegisters.update(state["instructionRegisters"])
+
     """
     LOADS REGISTER VALUES INTO AN OPERATION
     INPUT: Register to access (including suffix)
-    RETURNS: list/int(if suffix=b) value of register (in mode denoted by suffix) 
+    RETURNS: int value of register (in mode denoted by suffix)/str instruction (if mbr/cir)
     """
-    def Load(self, register: str) -> list:
-        try:
-            suffix = register[-1]
-            register = register[:-1]
-            match suffix:
-                # Byte (8 bits) (last byte)
-                case 'b':
-                    return self.Registers[register][0] # Take lowest bit from reg
-                # Word (16 bits) (last 2 bytes)
-                case 'w':
-                    return self.Registers[register][0:2] 
-                # Long (32 bits) (last 4 bytes)
-                case 'l':
-                    return self.Registers[register][0:5]
-                # Quadword (64 bits) (whole 8 bytes)
-                case 'q':
-                    return self.Registers[register]
-                # If no suffix, return whole register (8 bytes)
-                case _:
-                    register += suffix
-                    return self.Registers[register]
-        except:
+    def Load(self, register: str) -> int|str:
+        view = REGISTER_VIEWS.get(register)
+        if view is None:
+            if register in self.InstructionRegisters:
+                return self.InstructionRegisters[register]
             raise Exception(f"Invalid register name accessed! {register}")
 
+        index, mask = view
+        return self.File[index] & mask
+
     """
-    Stores value (either 8-byte list, or single int, or an instruction string) into register
-    INPUTS: str register to store in, list/int/str value to store 
+    Stores value (either int, or an instruction string) into register
+    Only the bits denoted by the suffix are overwritten (e.g: storing into r10b leaves the upper 7 bytes of r10 alone)
+    INPUTS: str register to store in, int/str value to store
     """
-    def Store(self, register: str, value: list|int|str):
-        ## Non-general purpose registers
-        # eflags stores dictionary of flags, so overwrite eflags with dictionary
-        if register == "eflags":
-            self.Registers["eflags"] = value
-            return
-
-        if register == "cs" or register == "ds":
-            self.Registers[register] = [value, 0]
-            return 
-        
-        ## General-purpose registers
-        # String instructions are 8 bytes, so overwrite whole register with string
-        if type(value) == str:
-            self.Registers[register] = value
-            return
-        
-
-        # As registers are 8 byte, convert single ints into 8 byte lists
-        if type(value) == int:
-            value = [value] + [0 for i in range(7)]
-        
+    def Store(self, register: str, value: int|str):
+        view = REGISTER_VIEWS.get(register)
+        if view is None:
+            if register in self.InstructionRegisters:
+                self.InstructionRegisters[register] = value
+                return
+            raise Exception(f"Invalid register name accessed! {register}")
+
         try:
-            # Select correct amount of bits to overwrite based on suffix
-            suffix = register[-1]
-            register = register[:-1]
-            match suffix:
-                # Byte (8 bits) (last byte)
-                case 'b':
-                    bitsAffected = 1
-                # Word (16 bits) (last 2 bytes)
-                case 'w':
-                    bitsAffected = 2
-                # Long (32 bits) (last 4 bytes)
-                case 'l':
-                    bitsAffected = 4
-                # Quadword (64 bits) (whole 8 bytes)
-                case 'q':
-                    bitsAffected = 8
-                # If no suffix, return whole register (8 bytes)
-                case _:
-                    register += suffix
-                    bitsAffected = 8
-            
-            # Overwrite those register bits
-            self.Registers[register][0:bitsAffected] = value[0:bitsAffected]
-        except:
-            raise Exception(f"Invalid register name accessed! {register}")
\ No newline at end of file
+            index, mask = view
+            # Overwrite those register bits (negative values are stored in two's complement)
+            self.File[index] = (self.File[index] & ~mask) | (value & mask)
+        except TypeError:
+            raise Exception(f"Tried to store non-integer value {value} in register {register}")
+
+    """
+    Returns the value of every register (for debugging)
+    RETURNS: dict {register name: value}
+    """
+    def GetRegisters(self) -> dict:
+        registers = {name: self.File[index] for index, name in enumerate(REGISTER_NAMES)}
+        registers.update(self.InstructionRegisters)
+        return registers
@@ -0,0 +1,228 @@
+from collections import deque
+
+## What a cycle can be spent on (see Processor.AccountCycle)
+CYCLE_CATEGORIES = ["execute", # A mu-op was executed (useful work)
+                    "pipelineFill", # Pipeline filling up at the start of the run
+                    "predictorStall", # Re-fetching from a stalled predictor after a mispredict
+                    "mispredictFlush", # Pipeline refilling after being flushed by a mispredict
+                    "robFull", # Decode stalled, as the ROB was full
+                    "pipelineBufferFull", # Decode stalled, as the pipeline buffer was full
+                    "syscallDrain"] # Pipeline refilling after being flushed by a syscall
+
+"""
+Statistics - Collects branch prediction results while a program runs, using a fixed amount of memory however long the run is
+DATA:
+    int no. correctly predicted branches, int no. mispredicted branches, int no. cycles lost to flushes after mispredicts
+    dict per-branch counts {branch location: [executions, taken, mispredicted, penalty cycles]} (one entry per branch in the program)
+    deque outcomes of the most recent branches (for the windowed misprediction rate)
+    list timeline buckets [[predicted, mispredicted], ..] - each covering a fixed no. cycles, merged in pairs when there are too many
+    int no. instructions retired, dict no. cycles spent on each cycle category, dict no. decode stalls for each cause
+FUNCTIONALITY:
+    RecordBranch (called by the processor whenever a branch is resolved)
+    RecordPenalty (called by the processor once the pipeline is running again after a mispredict)
+    RecordCycle / RecordInstruction / RecordDecodeStall (called by the processor every cycle/instruction retired/decode stall)
+    GetCPIStack (cycles per instruction, split up by cycle category)
+    GetAccuracy / GetWindowedMispredictionRate
+    GetBranchStatistics (per-branch breakdown)
+    GetTimeline (cumulative predicted/mispredicted branches over time, e.g: for plotting)
+    GetState/SetState (for checkpointing)
+"""
+class Statistics:
+    def __init__(self, bucketCycles: int = 64, maxBuckets: int = 1024, windowSize: int = 256, trackBranches: bool = True, trackTimeline: bool = True):
+        if bucketCycles <= 0 or maxBuckets < 2:
+            raise Exception(f"Timeline needs at least 2 buckets of at least 1 cycle (got {maxBuckets} buckets of {bucketCycles} cycles)")
+        self._BUCKET_CYCLES = bucketCycles # Starting no. cycles per bucket (doubles each time buckets are merged)
+        self._MAX_BUCKETS = maxBuckets
+        self._WINDOW_SIZE = windowSize # No. most recent branches the windowed misprediction rate is taken over
+        self._TRACK_BRANCHES = trackBranches
+        self._TRACK_TIMELINE = trackTimeline
+        self.Reset()
+
+    """
+    Clears every statistic (for a new run)
+    """
+    def Reset(self):
+        ## Counters
+        self.predicted = 0
+        self.mispredicted = 0
+        self.penaltyCycles = 0
+
+        ## Per-branch breakdown
+        self.branches = {} # {branch location: [executions, taken, mispredicted, penalty cycles]}
+
+        ## Windowed misprediction rate
+        self._window = deque(maxlen=self._WINDOW_SIZE) # True = mispredicted
+        self._windowMispredicted = 0
+
+        ## Cycle accounting (CPI stack)
+        self.instructions = 0
+        self.cycles = {category: 0 for category in CYCLE_CATEGORIES}
+        self.decodeStalls = {"robFull": 0, # Counted even when Execute is still running (so no cycle is lost)
+                             "pipelineBufferFull": 0}
+
+        ## Timeline
+        self._bucketCycles = self._BUCKET_CYCLES
+        self._buckets = [] # [[predicted, mispredicted], ..], bucket i covers cycles i * bucketCycles -> (i + 1) * bucketCycles - 1
+
+    """
+    Returns every statistic collected so far (for checkpointing)
+    RETURNS: dict state
+    """
+    def GetState(self) -> dict:
+        return {"predicted": self.predicted,
+                "mispredicted": self.mispredicted,
+                "penaltyCycles": self.penaltyCycles,
+                "branches": [[location] + counts for location, counts in self.branches.items()],
+                "window": list(self._window),
+                "instructions": self.instructions,
+                "cycles": self.cycles,
+                "decodeStalls": self.decodeStalls,
+                "bucketCycles": self._bucketCycles,
+                "buckets": self._buckets}
+
+    """
+    Puts the statistics back in a state returned by GetState
+    INPUTS: dict state
+    """
+    def SetState(self, state: dict):
+        self.predicted = state["predicted"]
+        self.mispredicted = state["mispredicted"]
+        self.penaltyCycles = state["penaltyCycles"]
+        self.branches = {location: counts for location, *counts in state["branches"]}
+        self._window = deque(state["window"], maxlen=self._WINDOW_SIZE)
+        self._windowMispredicted = sum(self._window) # Worked out again, as window may be shorter than the checkpoint's
+        self.instructions = state["instructions"]
+        self.cycles = dict(state["cycles"])
+        self.decodeStalls = dict(state["decodeStalls"])
+        self._bucketCycles = state["bucketCycles"]
+        self._buckets = [list(bucket) for bucket in state["buckets"]]
+
+    """
+    Records the result of a resolved branch
+    INPUTS: int cycle no. branch was resolved in, int location of branch, bool branch taken, bool branch mispredicted
+    """
+    def RecordBranch(self, cycle: int, location: int, taken: bool, mispredicted: bool):
+        if mispredicted:
+            self.mispredicted += 1
+        else:
+            self.predicted += 1
+
+        if self._TRACK_BRANCHES:
+            branch = self.branches.get(location)
+            if branch is None:
+                branch = self.branches[location] = [0, 0, 0, 0]
+            branch[0] += 1
+            branch[1] += taken
+            branch[2] += mispredicted
+
+        if self._WINDOW_SIZE > 0:
+            # Oldest outcome falls out of a full window
+            if len(self._window) == self._WINDOW_SIZE:
+                self._windowMispredicted -= self._window[0]
+            self._window.append(mispredicted)
+            self._windowMispredicted += mispredicted
+
+        if self._TRACK_TIMELINE:
+            bucket = cycle // self._bucketCycles
+            # Too many buckets - merge each pair of buckets into one (covering twice as many cycles)
+            while bucket >= self._MAX_BUCKETS:
+                self.MergeBuckets()
+                bucket = cycle // self._bucketCycles
+            while len(self._buckets) <= bucket:
+                self._buckets.append([0, 0])
+            self._buckets[bucket][mispredicted] += 1
+
+    """
+    Records the cycles lost to flushing the pipeline after a branch was mispredicted
+    INPUTS: int location of mispredicted branch, int no. cycles until the pipeline executed again
+    """
+    def RecordPenalty(self, location: int, cycles: int):
+        self.penaltyCycles += cycles
+        if self._TRACK_BRANCHES:
+            self.branches[location][3] += cycles
+
+    """
+    Records what a cycle was spent on
+    INPUTS: str cycle category (from CYCLE_CATEGORIES)
+    """
+    def RecordCycle(self, category: str):
+        self.cycles[category] += 1
+
+    """
+    Records an instruction being retired (its last mu-op executed)
+    """
+    def RecordInstruction(self):
+        self.instructions += 1
+
+    """
+    Records Decode stalling, as there wasn't space for an instruction's mu-ops
+    INPUTS: str cause (robFull/pipelineBufferFull)
+    """
+    def RecordDecodeStall(self, cause: str):
+        self.decodeStalls[cause] += 1
+
+    """
+    Halves the no. timeline buckets, by merging each pair of neighbouring buckets (so each bucket covers twice as many cycles)
+    """
+    def MergeBuckets(self):
+        merged = []
+        for i in range(0, len(self._buckets), 2):
+            pair = self._buckets[i:i + 2]
+            merged.append([sum(bucket[0] for bucket in pair), sum(bucket[1] for bucket in pair)])
+        self._buckets = merged
+        self._bucketCycles *= 2
+
+    """
+    RETURNS: float fraction of branches correctly predicted (None if no branches have been resolved)
+    """
+    def GetAccuracy(self) -> float|None:
+        total = self.predicted + self.mispredicted
+        return self.predicted / total if total > 0 else None
+
+    """
+    RETURNS: float fraction of the most recent branches (up to the window size) that were mispredicted (None if no branches have been resolved)
+    """
+    def GetWindowedMispredictionRate(self) -> float|None:
+        return self._windowMispredicted / len(self._window) if len(self._window) > 0 else None
+
+    """
+    Works out the CPI stack of the run - cycles per instruction, split up by what the cycles were spent on
+    RETURNS: dict {int instructions, int cycles, float cpi, dict stack {cycle category: cycles in category per instruction}}
+             (cpi and stack are None if no instructions were retired)
+    """
+    def GetCPIStack(self) -> dict:
+        cycles = sum(self.cycles.values())
+        if self.instructions == 0:
+            return {"instructions": 0, "cycles": cycles, "cpi": None, "stack": None}
+        return {"instructions": self.instructions,
+                "cycles": cycles,
+                "cpi": cycles / self.instructions,
+                "stack": {category: categoryCycles / self.instructions for category, categoryCycles in self.cycles.items()}}
+
+    """
+    Breaks the results down by branch
+    RETURNS: list [{location, executions, taken, mispredicted, takenRate, mispredictionRate, penaltyCycles}, ..] in order of location
+    """
+    def GetBranchStatistics(self) -> list:
+        return [{"location": location,
+                 "executions": executions,
+                 "taken": taken,
+                 "mispredicted": mispredicted,
+                 "takenRate": taken / executions,
+                 "mispredictionRate": mispredicted / executions,
+                 "penaltyCycles": penaltyCycles}
+                for location, (executions, taken, mispredicted, penaltyCycles) in sorted(self.branches.items())]
+
+    """
+    Works out the total no. predicted/mispredicted branches at the end of each bucket of cycles
+    RETURNS: list [(int last cycle of bucket, int total predicted, int total mispredicted), ..]
+    """
+    def GetTimeline(self) -> list:
+        timeline = []
+        predicted = 0
+        mispredicted = 0
+        for index, (bucketPredicted, bucketMispredicted) in enumerate(self._buckets):
+            predicted += bucketPredicted
+            mispredicted += bucketMispredicted
+            timeline.append(((index + 1) * self._bucketCycles - 1, predicted, mispredicted))
+        return timeline
@@ -1,105 +1,158 @@
 import typing
+import Compiler.Image as Image
+
+ARITHMETIC_OPERATORS = ['+', '-', '/', '*'] # Operators that can be used next to a symbol (e.g: array+5)
+
 class Compiler:
-    SymbolTable = [None for i in range(100)]
-    Offsets = {}
+    VERSION = 1 # Increase whenever the executables produced change, so old cached images aren't used
 
-    # Deal w/ data values in the _data section (assign them locations in memory + replace pointers w/ their locations)
+    def __init__(self):
+        self.Reset()
+
+    """
+    Clears the symbol table and section offsets, so nothing is carried over from the last file compiled
+    """
+    def Reset(self):
+        self.SymbolTable = {} # {symbol name: memory location}
+        self.Offsets = {}
+
+    """
+    Compiles an algorithm file, using its cached executable image if it was compiled from the same source by this compiler version
+    (otherwise compiles it, and caches the executable as an image next to it)
+    INPUTS: str path to algorithm file, bool whether to use/write the cached image
+    RETURNS: list executable
+    """
+    def CompileFile(self, path: str, useCache: bool = True) -> list:
+        if not useCache:
+            with open(path, 'r') as f:
+                return self.Compile(f)
+
+        sourceHash = Image.HashFile(path)
+        imagePath = Image.GetImagePath(path)
+        image = Image.ReadImage(imagePath, sourceHash, self.VERSION)
+        if image is not None:
+            # Restore the symbol table as if the file had just been compiled
+            executable, symbolTable = image
+            self.Reset()
+            self.SymbolTable = symbolTable
+            self.Offsets = {"text": executable[0],
+                            "data": executable[1]}
+            return executable
+
+        with open(path, 'r') as f:
+            executable = self.Compile(f)
+        # Not being able to cache the executable (e.g: read-only folder) just means compiling again next time
+        try:
+            Image.WriteImage(imagePath, executable, self.SymbolTable, sourceHash, self.VERSION)
+        except OSError:
+            pass
+        return executable
+
+    """
+    Compiles an assembly file into an executable, reading it one line at a time
+    The text/data sections are built up as the file is read, w/ each symbol's location (from the start of its section) noted down.
+    Once the whole file has been read, the section offsets are known, so symbols are given their memory locations,
+    and every instruction using a symbol is patched w/ its location
+    INPUTS: TextIO assembly file
+    RETURNS: list executable (header [start of text section, start of data section], then text section, then data section)
+    """
     def Compile(self, f: typing.TextIO) -> list:
-        # Read in file
-        asm = f.readlines()
-
-        ## Convert to General Form
-        asm = self.ConvertToGeneralForm(asm)
-
-        ##DATA SECTION
-        # Find the start and end of data section
-        data = self.FindSection(asm, "data")
-
-        # Convert data to 1d array of tokens (a token is separated by whitespace) 
-        data = " ".join(data) 
-        data = data.split(' ')
-
-        # Remove all db/dw/dq, for now
-        data = list(filter(lambda x: not x in ["db", "dw", "dd", "dq", "dt"], data))
-
-
-        # Generate a list of pointers in data section, and their locations
-        dataPointers = []
-        for index, token in enumerate(data):
-            # If token is non-numeric, it's a pointer, so add it and location to list of pointers, then remove it
-            if not token.isnumeric():
-                dataPointers.append({"name": token,
-                                        "location": index,
-                                        "section": "data"})
-                data.pop(index)
-        
-        # Convert all data values to ints
-        data = list(map(int, data))
-
-        ##TEXT SECTION
-        # Find the start and end of the text section
-        text = self.FindSection(asm, "text")
-
-        # Generate a list of labels in text section, and their location
-        labels = []
-        for index, token in enumerate(text):
-            if token.startswith('.') and token.endswith(':'):
-                labels.append({"name": token[:-1], # Remove the last (:) part of token
-                                "location": index,
-                                "section": "text"})
-                text.pop(index)
-
-        # Create Symbol Table
-        self.GenerateSymbolTable(dataPointers + labels) # Generate symbol table
+        self.Reset()
 
         ## HEADER SECTION
         # Used for ensuring rip doesn't go into data section
-        header = [2, # Start of text section
-                    2 + len(text) # Start of data section
-                    ]
-        # Generate executable file
+        executable = [2, # Start of text section
+                      None # Start of data section (known once text section has been read)
+                      ]
+        data = []
+        dataPointers = {} # {pointer name: location in data section}
+        labels = {} # {label name: location in text section}
+
+        section = None # Section currently being read
+        foundSections = set()
+        for line in f:
+            ## Convert to General Form
+            line = self.ConvertToGeneralForm(line)
+            if line is None:
+                continue
+
+            # Only the first data/text section is compiled, and any other line mentioning a section ends the current one
+            if "section" in line:
+                sectionName = line.removeprefix("section .")
+                if line.startswith("section .") and sectionName in ["data", "text"] and sectionName not in foundSections:
+                    section = sectionName
+                    foundSections.add(sectionName)
+                else:
+                    section = None
+
+            ##DATA SECTION
+            elif section == "data":
+                # Split into tokens (a token is separated by whitespace)
+                for token in line.split(' '):
+                    # Remove all db/dw/dq, for now
+                    if token in ["db", "dw", "dd", "dq", "dt"]:
+                        continue
+                    # If token is non-numeric, it's a pointer to the next data value, so note down its location
+                    if not token.isnumeric():
+                        dataPointers[token] = len(data)
+                    # Otherwise, convert it to an int
+                    else:
+                        data.append(int(token))
+
+            ##TEXT SECTION
+            elif section == "text":
+                # Labels point to the next instruction
+                if line.startswith('.') and line.endswith(':'):
+                    labels[line[:-1]] = len(executable) - executable[0] # Remove the last (:) part of token
+                else:
+                    executable.append(line)
+
+        for sectionName in ["data", "text"]:
+            if sectionName not in foundSections:
+                raise Exception(f"Tried to compile with invalid {sectionName} section")
+
+        # Generate executable file - header, then text section, then data section
+        executable[1] = len(executable)
         self.Offsets = {"text": 2,
-                        "data": 2 + len(text)}
-        executable = header + text + data # header, then text section, then data section
+                        "data": executable[1]}
+        executable.extend(data)
 
-        # Final pass - remove symbols
-        executable = list(map(self.ReplaceSymbols, executable))
+        # Create Symbol Table (now section offsets are known), labels take priority over data pointers w/ the same name
+        self.GenerateSymbolTable([{"name": name, "location": location, "section": "data"} for name, location in dataPointers.items()] +
+                                 [{"name": name, "location": location, "section": "text"} for name, location in labels.items()])
+
+        # Final pass - replace symbols in text section w/ their locations
+        for location in range(self.Offsets["text"], self.Offsets["data"]):
+            executable[location] = self.ReplaceSymbols(executable[location])
         return executable
 
     """
-    Converts Assembly file into a generalised form, without whitespace and comments, in order for compilation to begin
-    INPUTS: list lines of Assembly file to generalise
-    RETURNS: list Assembly file in General Form
+    Converts a line of an Assembly file into a generalised form, without whitespace and comments, in order for compilation to begin
+    INPUTS: str line of Assembly file to generalise
+    RETURNS: str line in General Form, or None if line is empty/only a comment
     """
-    def ConvertToGeneralForm(self, asm: list) -> list:
+    def ConvertToGeneralForm(self, line: str) -> str|None:
         # Remove Empty lines/indentation
-        asm = list(filter(lambda x: not x.isspace(), asm)) # isspace returns true of whole string only consists of spaces
-        asm = list(map(lambda x: x.strip(), asm))
+        if line.isspace(): # isspace returns true of whole string only consists of spaces
+            return None
+        line = line.strip()
         # Remove Whole line Comments
-        asm = list(filter(lambda x: not x.startswith(';'), asm)) # Filter only returns elements that return true out of the function
+        if line.startswith(';'):
+            return None
         # Remove inline Comments
-        asm = list(map(lambda x: x[:x.find(';') - 1] if x.find(';') != -1 else x, asm)) # Find returns 1st instance of substring in string (or -1 if not found)
+        if line.find(';') != -1: # Find returns 1st instance of substring in string (or -1 if not found)
+            line = line[:line.find(';') - 1]
         # Remove all commas from entries
-        asm = list(map(lambda x: x.replace(',', ''), asm))
-
-        return asm
+        return line.replace(',', '')
 
+    """
+    Works out the memory location of every symbol, and adds it to the symbol table
+    (If a name is used more than once, the last symbol w/ that name is used)
+    INPUTS: list symbols [{name, location (from start of its section), section}, ..]
+    """
     def GenerateSymbolTable(self, symbols: list):
-        if len(symbols) == 0:
-            return
-        else:
-            symbol = symbols.pop()
-            # Hash
-            key = self.hash(symbol["name"])
-            # Insert dict {name: memory location} into index of hash in symbol table
-            for i in range(100):
-                if self.SymbolTable[(key + i) % 100] is not None: continue
-
-                self.SymbolTable[(key + i) % 100] = symbol
-                break
-            else:
-                raise Exception("Symbol Table is full!")
-            return self.GenerateSymbolTable(symbols)
+        for symbol in symbols:
+            self.SymbolTable[symbol["name"]] = symbol["location"] + self.Offsets[symbol["section"]]
 
     """
     Takes in line of code, and, if part of the line is a symbol, converts it to the corresponding memory address in the symbol table
@@ -109,82 +162,41 @@ class Compiler:
     def ReplaceSymbols(self, line: str) -> str:
         if type(line) is int: return line
 
-        replacedLine = ""
+        replacedTokens = []
         # Split into tokens
-        tokens = line.split(' ')
-        for token in tokens:
+        for token in line.split(' '):
             # Remove []s, to allow symbols inside direct addresses to be replaced
             rawToken = token.strip('[').strip(']')
             # Deal with +-/* (arithmetic) operations next to symbols
+            # e.g "array+5" -> operator: +, potentialSymbolName: array, operand: 5
             operator = None
-            operand = None
-            arithmeticOperators = ['+', '-', '/', '*']
-            for arithmeticOperator in arithmeticOperators:
+            for arithmeticOperator in ARITHMETIC_OPERATORS:
                 if arithmeticOperator in rawToken:
                     operator = arithmeticOperator
                     potentialSymbolName = rawToken.split(arithmeticOperator)[0] # Name of potential symbol is first half of token
-                    operand = int(rawToken.split(arithmeticOperator)[1]) # Bit to add/sub/mult/div is 2nd half of token
-                    # e.g "array+5" -> operator: +, potentialSymbolName: array, operand: 5
                     break
             else:
                 potentialSymbolName = rawToken
 
-            # Find the label in the symbol table
-            key = self.hash(potentialSymbolName) # There's never going to be a comma on the end of a label, is there? Don't believe so, as we should only be using them for jumps
-            for i in range(100):
-                # If token doesn't exist in table (so not a symbol), return token  
-                if self.SymbolTable[key + i] is None: 
-                    replacedLine += token + ' '
-                    break
-                # When found, check if the token is acutally a symbol
-                if self.SymbolTable[key + i]["name"] == potentialSymbolName:
-                    # If so, return the location
-                    location = self.SymbolTable[key + i]["location"] + self.Offsets[self.SymbolTable[key + i]["section"]]
-                    # Perform arithmetic operation, if needed
-                    if operator is not None: 
-                        match operator:
-                            case '+':
-                                location += operand
-                            case '-':
-                                location -= operand
-                            case '*':
-                                location *= operand
-                            case '/':
-                                location /= operand
-                    # Return the value
-                    replacedLine += str(location) + ' ' # []s not needed, as [] denotes VALUE of mem. address - we just want the address itself
-                    break
-            else:  
-                raise Exception(f"Symbol Table full (and label {rawToken} couldn't be found)! {self.SymbolTable}")
-        
-        return replacedLine.strip() # Removes final trailing whitespace
-    
-    """
-    Converts input string to a random key between 0 - 99
-    INPUT: string s
-    RETURNS: int key (0 - 99)
-    """
-    def hash(self, input: str) -> int:
-        SumOfASCIIInput = 0
-        for char in input:
-            SumOfASCIIInput += ord(char)
-        
-        return SumOfASCIIInput % 100 
-    
-    """
-    Finds a given section in an asm file, and returns it
-    INPUT: string[] asm file
-    RETURNS: string[] section in asm file, from start to end
-    """
-    def FindSection(self, asm: list, sectionName: str) -> list:
-        try:
-            startPointer = asm.index('section .' + sectionName) + 1
-        except ValueError:
-            raise Exception(f"Tried to compile with invalid {sectionName} section")
-        for i in range(startPointer, len(asm)):
-            if "section" in asm[i]: 
-                endPointer = i
-                break
-        else:
-            endPointer = None
-        return asm[startPointer : endPointer]
\ No newline at end of file
+            # Find the symbol in the symbol table - if it isn't one, keep the token as it is
+            location = self.SymbolTable.get(potentialSymbolName)
+            if location is None:
+                replacedTokens.append(token)
+                continue
+
+            # Perform arithmetic operation, if needed
+            if operator is not None:
+                operand = int(rawToken.split(operator)[1]) # Bit to add/sub/mult/div is 2nd half of token
+                match operator:
+                    case '+':
+                        location += operand
+                    case '-':
+                        location -= operand
+                    case '*':
+                        location *= operand
+                    case '/':
+                        location /= operand
+            # []s not needed, as [] denotes VALUE of mem. address - we just want the address itself
+            replacedTokens.append(str(location))
+
+        return " ".join(replacedTokens).strip() # Removes any trailing whitespace
@@ -0,0 +1,119 @@
+import hashlib
+import struct
+
+"""
+Executable Image - A compiled executable stored as a compact binary file next to its source,
+so the source only needs compiling again when it (or the compiler) changes
+
+FILE FORMAT:
+    Header: MAGIC, 1 byte format version, uint32 compiler version, 32 byte SHA-256 hash of source, uint32 no. entries, uint32 no. symbols
+    Entries (little-endian, 1 byte entry type then its value):
+        INTEGER     - int64 value (header/data section values)
+        INSTRUCTION - uint32 length, then UTF-8 instruction (text section)
+    Symbols (symbol table the executable was compiled with): int64 memory location, uint32 length, then UTF-8 name
+"""
+MAGIC = b"BEXEC"
+VERSION = 2
+EXTENSION = ".img"
+HASH_CHUNK_SIZE = 1 << 16 # No. bytes of source read at a time when hashing
+
+## Entry types
+INTEGER = 0
+INSTRUCTION = 1
+
+HEADER = struct.Struct("<BI32sII")
+INTEGER_ENTRY = struct.Struct("<Bq")
+INSTRUCTION_ENTRY = struct.Struct("<BI")
+SYMBOL_ENTRY = struct.Struct("<qI")
+
+"""
+Works out the path of the image for a source file (same name, w/ the image extension)
+INPUTS: str path to source file
+RETURNS: str path to image
+"""
+def GetImagePath(sourcePath: str) -> str:
+    return sourcePath.removesuffix(".txt") + EXTENSION
+
+"""
+Hashes a source file's contents (to check whether an image was compiled from it), reading it a chunk at a time
+INPUTS: str path to source file
+RETURNS: bytes SHA-256 hash
+"""
+def HashFile(path: str) -> bytes:
+    sourceHash = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            sourceHash.update(chunk)
+    return sourceHash.digest()
+
+"""
+Writes an executable (and its symbol table) to an image file
+INPUTS: str path to write to, list executable, dict symbol table {name: memory location},
+        bytes hash of the source it was compiled from, int version of compiler that compiled it
+"""
+def WriteImage(path: str, executable: list, symbolTable: dict, sourceHash: bytes, compilerVersion: int):
+    image = bytearray(MAGIC)
+    image += HEADER.pack(VERSION, compilerVersion, sourceHash, len(executable), len(symbolTable))
+    for entry in executable:
+        if type(entry) is int:
+            image += INTEGER_ENTRY.pack(INTEGER, entry)
+        else:
+            instruction = entry.encode()
+            image += INSTRUCTION_ENTRY.pack(INSTRUCTION, len(instruction))
+            image += instruction
+    for name, location in symbolTable.items():
+        encodedName = name.encode()
+        image += SYMBOL_ENTRY.pack(location, len(encodedName))
+        image += encodedName
+
+    with open(path, "wb") as f:
+        f.write(image)
+
+"""
+Reads an executable (and its symbol table) from an image file, if the image is still valid for its source
+INPUTS: str path to image, bytes hash of the current source, int version of the current compiler
+RETURNS: tuple (list executable, dict symbol table), or None if there's no image, or it was compiled from a different source/by a different compiler version
+"""
+def ReadImage(path: str, sourceHash: bytes, compilerVersion: int) -> tuple|None:
+    try:
+        with open(path, "rb") as f:
+            image = f.read()
+    except OSError:
+        return None
+
+    if not image.startswith(MAGIC) or len(image) < len(MAGIC) + HEADER.size:
+        return None
+    version, imageCompilerVersion, imageSourceHash, entryCount, symbolCount = HEADER.unpack_from(image, len(MAGIC))
+    if version != VERSION or imageCompilerVersion != compilerVersion or imageSourceHash != sourceHash:
+        return None
+
+    executable = []
+    offset = len(MAGIC) + HEADER.size
+    try:
+        for i in range(entryCount):
+            match image[offset]:
+                case 0: # INTEGER
+                    executable.append(INTEGER_ENTRY.unpack_from(image, offset)[1])
+                    offset += INTEGER_ENTRY.size
+                case 1: # INSTRUCTION
+                    length = INSTRUCTION_ENTRY.unpack_from(image, offset)[1]
+                    offset += INSTRUCTION_ENTRY.size
+                    if offset + length > len(image):
+                        return None
+                    executable.append(image[offset:offset + length].decode())
+                    offset += length
+                case _:
+                    return None
+
+        symbolTable = {}
+        for i in range(symbolCount):
+            location, length = SYMBOL_ENTRY.unpack_from(image, offset)
+            offset += SYMBOL_ENTRY.size
+            if offset + length > len(image):
+                return None
+            symbolTable[image[offset:offset + length].decode()] = location
+            offset += length
+    # Truncated/corrupted image - just recompile
+    except (IndexError, struct.error, UnicodeDecodeError):
+        return None
+    return executable, symbolTable
@@ -0,0 +1,82 @@
+import csv
+import json
+import os
+import time
+from Compiler.Compiler import Compiler
+from CPU.Processor import Processor
+from Simulation.Trace import TraceRecorder
+
+# Keys of a run summary (returned by RunSimulation)
+SUMMARY_FIELDS = ["algorithm", "predictor", "btbSize", "directionBufferSize", "historyLength", "fastForwarded", "cycles", "instructions", "cpi", "predicted", "mispredicted", "accuracy", "seconds", "output"]
+# Columns written when results are saved as CSV (failed runs have an error instead of results)
+RESULT_FIELDS = SUMMARY_FIELDS + ["error"]
+
+"""
+Compiles an algorithm and runs it on a processor using the given predictor, without any interactive input/output
+INPUTS: str path to algorithm file, type predictor class to run, float min. no. seconds between progress reports (None = no progress reports),
+        int BTB size, int direction buffer size, int global history length (only used by predictors with a global history register),
+        str path to record the run's branch trace to (None = don't record),
+        str path to checkpoint the run to (if a checkpoint is already there, the run is resumed from it. Removed once the run finishes),
+        int no. cycles between checkpoints,
+        int no. instructions to fast-forward through before simulating the pipeline, bool warm up predictor while fast-forwarding
+RETURNS: dict summary of run (keys in SUMMARY_FIELDS)
+"""
+def RunSimulation(algorithmPath: str, predictor: type, progressInterval: float = None,
+                  btbSize: int = 64, directionBufferSize: int = 256, historyLength: int = 8, tracePath: str = None,
+                  checkpointPath: str = None, checkpointInterval: int = 1 << 22, fastForward: int = 0, warmPredictor: bool = True) -> dict:
+    if tracePath is not None and checkpointPath is not None:
+        raise Exception("Can't checkpoint a run whose branch trace is being recorded (a resumed run would only record part of the trace)")
+    executable = Compiler().CompileFile(algorithmPath)
+
+    if not predictor.USES_GLOBAL_HISTORY:
+        historyLength = None
+    predictorOptions = {"historyLength": historyLength} if historyLength is not None else {}
+    P = Processor(predictor, btbSize, directionBufferSize, predictorOptions)
+    if tracePath is not None:
+        P.predictor = TraceRecorder(P.predictor, tracePath)
+
+    startTime = time.perf_counter()
+    try:
+        if checkpointPath is None:
+            statistics = P.Compute(executable, progressInterval=progressInterval, echo=False, fastForward=fastForward, warmPredictor=warmPredictor)
+        elif os.path.exists(checkpointPath):
+            statistics = P.Resume(checkpointPath, progressInterval=progressInterval, echo=False, checkpointInterval=checkpointInterval)
+        else:
+            statistics = P.Compute(executable, progressInterval=progressInterval, echo=False,
+                                   checkpointPath=checkpointPath, checkpointInterval=checkpointInterval,
+                                   fastForward=fastForward, warmPredictor=warmPredictor)
+    finally:
+        if tracePath is not None:
+            P.predictor.Close()
+    elapsedTime = time.perf_counter() - startTime # (Only since the run was resumed, if it was)
+    if checkpointPath is not None and os.path.exists(checkpointPath):
+        os.remove(checkpointPath)
+
+    return {"algorithm": os.path.basename(algorithmPath).removesuffix(".txt"),
+            "predictor": predictor.__name__,
+            "btbSize": btbSize,
+            "directionBufferSize": directionBufferSize,
+            "historyLength": historyLength,
+            "fastForwarded": P.fastForwardedInstructions, # Cycles, instructions and branches are only counted after the fast-forward
+            "cycles": P.cycleCount,
+            "instructions": statistics.instructions,
+            "cpi": statistics.GetCPIStack()["cpi"],
+            "predicted": statistics.predicted,
+            "mispredicted": statistics.mispredicted,
+            "accuracy": statistics.GetAccuracy(),
+            "seconds": elapsedTime,
+            "output": P.programOutput}
+
+"""
+Writes a list of run summaries to a file (CSV if the path ends in .csv, JSON otherwise)
+INPUTS: list run summaries (from RunSimulation), str path to write to
+"""
+def WriteResults(results: list, path: str):
+    with open(path, 'w', newline='') as f:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for result in results:
+                writer.writerow({**result, "output": json.dumps(result["output"]) if result["output"] is not None else None})
+        else:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,191 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from Compiler.Compiler import Compiler
+from CPU.Processor import Processor
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Suite import LoadManifest, MANIFEST_PATH
+
+# Peak RSS is only available on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+HISTORY_PATH = "benchmark-history.jsonl"
+STAGES = ["Fetch", "Decode", "Execute"]
+
+"""
+Simulator Throughput Benchmark - Times fixed workloads running through Processor.Compute, so changes to the simulator
+can be checked for speed-ups/regressions. Each run of the benchmark is appended to a history file (JSON Lines, one run per line):
+    {commit, dirty, timestamp, python, repeats, results: [{workload, predictor, cycles, instructions, seconds,
+     cyclesPerSecond, instructionsPerSecond, peakRSS, stageSeconds {Fetch, Decode, Execute}}, ..]}
+"""
+
+"""
+Replaces a processor's pipeline stages w/ versions that add up how long each stage takes
+(Timing every call slows the run down, so throughput is measured on separate runs without timers)
+INPUTS: Processor processor to time
+RETURNS: dict {stage: total seconds spent in it}, added to as the processor runs
+"""
+def AddStageTimers(processor: Processor) -> dict:
+    stageSeconds = {stage: 0.0 for stage in STAGES}
+
+    def CreateTimer(stage: str, method):
+        def TimedStage():
+            startTime = time.perf_counter()
+            method()
+            stageSeconds[stage] += time.perf_counter() - startTime
+        return TimedStage
+
+    for stage in STAGES:
+        setattr(processor, stage, CreateTimer(stage, getattr(processor, stage)))
+    return stageSeconds
+
+"""
+Times a workload on a predictor (run in its own process, so peak RSS is the workload's alone)
+Throughput is taken from the fastest of several untimed runs, and the per-stage breakdown from one more run w/ stage timers
+INPUTS: str path to algorithm file, str predictor name, int no. timed runs
+RETURNS: dict result {workload, predictor, cycles, instructions, seconds, cyclesPerSecond, instructionsPerSecond, peakRSS (bytes), stageSeconds}
+"""
+def BenchmarkWorkload(algorithmPath: str, predictorName: str, repeats: int = 3) -> dict:
+    executable = Compiler().CompileFile(algorithmPath) # (Compiling isn't part of the timed run)
+    predictor = PREDICTORS[predictorName]
+
+    seconds = None
+    for i in range(repeats):
+        P = Processor(predictor)
+        startTime = time.perf_counter()
+        statistics = P.Compute(executable, echo=False)
+        elapsedTime = time.perf_counter() - startTime
+        seconds = elapsedTime if seconds is None else min(seconds, elapsedTime)
+
+    timedProcessor = Processor(predictor)
+    stageSeconds = AddStageTimers(timedProcessor)
+    timedProcessor.Compute(executable, echo=False)
+
+    peakRSS = None
+    if resource is not None:
+        peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peakRSS *= 1 if platform.system() == "Darwin" else 1024 # Bytes on macOS, KB everywhere else
+
+    return {"workload": os.path.basename(algorithmPath).removesuffix(".txt"),
+            "predictor": predictorName,
+            "cycles": P.cycleCount,
+            "instructions": statistics.instructions,
+            "seconds": seconds,
+            "cyclesPerSecond": P.cycleCount / seconds,
+            "instructionsPerSecond": statistics.instructions / seconds,
+            "peakRSS": peakRSS,
+            "stageSeconds": stageSeconds}
+
+"""
+Finds the commit being benchmarked
+RETURNS: tuple (str short commit hash, bool uncommitted changes), or (None, None) if not in a git repository
+"""
+def GetCommit() -> tuple:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+"""
+Benchmarks every workload on every predictor, one at a time (so runs don't slow each other down), each in a fresh process
+INPUTS: list algorithm paths, list predictor names, int no. timed runs of each
+RETURNS: dict benchmark run {commit, dirty, timestamp, python, repeats, results}
+"""
+def RunBenchmark(algorithms: list, predictors: list, repeats: int = 3) -> dict:
+    commit, dirty = GetCommit()
+    results = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        for algorithmPath in algorithms:
+            for predictorName in predictors:
+                results.append(executor.submit(BenchmarkWorkload, algorithmPath, predictorName, repeats).result())
+    return {"commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "repeats": repeats,
+            "results": results}
+
+"""
+Appends a benchmark run to the history file
+INPUTS: dict benchmark run, str path to history file
+"""
+def AppendHistory(run: dict, path: str = HISTORY_PATH):
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+"""
+Reads every benchmark run from the history file
+INPUTS: str path to history file
+RETURNS: list benchmark runs, oldest first (empty if there's no history yet)
+"""
+def ReadHistory(path: str = HISTORY_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip() != ""]
+
+"""
+Prints a benchmark run as a table, w/ the change in throughput since an earlier run (if given)
+INPUTS: dict benchmark run, dict earlier benchmark run to compare against (None = no comparison)
+"""
+def PrintBenchmark(run: dict, baseline: dict = None):
+    baselineResults = {}
+    if baseline is not None:
+        baselineResults = {(result["workload"], result["predictor"]): result for result in baseline["results"]}
+        print(f"Compared against {baseline['commit']}{' (dirty)' if baseline['dirty'] else ''} from {baseline['timestamp']}")
+
+    print(f"{'Workload':<16} {'Predictor':<16} {'Cycles':>8} {'Cycles/s':>9} {'Instr/s':>9} {'Peak RSS':>9} "
+          f"{'Fetch':>6} {'Decode':>6} {'Execute':>7} {'Change':>7}")
+    for result in run["results"]:
+        peakRSS = f"{result['peakRSS'] / (1 << 20):.1f}MB" if result["peakRSS"] is not None else "-"
+        # Share of pipeline time spent in each stage
+        stageTime = sum(result["stageSeconds"].values())
+        stageShares = [result["stageSeconds"][stage] / stageTime if stageTime > 0 else 0 for stage in STAGES]
+        change = "-"
+        earlier = baselineResults.get((result["workload"], result["predictor"]))
+        if earlier is not None:
+            change = f"{result['cyclesPerSecond'] / earlier['cyclesPerSecond'] - 1:+.1%}"
+        print(f"{result['workload']:<16} {result['predictor']:<16} {result['cycles']:>8} {result['cyclesPerSecond']:>9.0f} "
+              f"{result['instructionsPerSecond']:>9.0f} {peakRSS:>9} {stageShares[0]:>6.1%} {stageShares[1]:>6.1%} {stageShares[2]:>7.1%} {change:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how fast the simulator runs fixed workloads, and keep a history of the results")
+    parser.add_argument("-a", "--algorithm", dest="algorithms", action="append",
+                        help="Algorithm file to run (can be given multiple times, defaults to every workload in the suite manifest)")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Branch predictor to run (can be given multiple times, defaults to TwoBitLastTime and gshare)")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="No. timed runs of each workload (fastest is kept)")
+    parser.add_argument("--history", default=HISTORY_PATH, help="History file to append results to (JSON Lines)")
+    parser.add_argument("--no-history", dest="record", action="store_false", help="Don't append results to the history file")
+    parser.add_argument("--compare", default=None, metavar="COMMIT",
+                        help="Show change in throughput since the latest run of COMMIT in the history (defaults to the previous run)")
+    args = parser.parse_args()
+
+    algorithms = args.algorithms
+    if algorithms is None:
+        algorithms = [workload["path"] for workload in LoadManifest(MANIFEST_PATH)]
+    predictors = args.predictors if args.predictors is not None else ["TwoBitLastTime", "gshare"]
+
+    history = ReadHistory(args.history)
+    if args.compare is not None:
+        baseline = next((run for run in reversed(history) if run["commit"] == args.compare), None)
+        if baseline is None:
+            raise Exception(f"No run of commit {args.compare} in {args.history}")
+    else:
+        baseline = history[-1] if len(history) > 0 else None
+
+    run = RunBenchmark(algorithms, predictors, args.repeats)
+    PrintBenchmark(run, baseline)
+    if args.record:
+        AppendHistory(run, args.history)
@@ -0,0 +1,136 @@
+import argparse
+import bisect
+import csv
+import json
+import os
+from Compiler.Compiler import Compiler
+from CPU.Processor import Processor
+from CPU.DirectionPredictors import PREDICTORS
+
+# Columns written when profiles are saved as CSV
+PROFILE_FIELDS = ["algorithm", "predictor", "location", "site", "instruction", "executions", "taken", "takenRate", "mispredicted", "mispredictionRate", "penaltyCycles"]
+
+"""
+Labels Lookup - Finds the labels (from the compiler's symbol table) that text section locations belong to
+DATA:
+    list label locations (sorted), list label names (in the same order)
+    dict {location: label name} (for replacing jump destinations w/ labels)
+FUNCTIONALITY:
+    GetSite (nearest label at/before a location, e.g: .mainLoop+4)
+    DescribeInstruction (instruction w/ jump destinations shown as labels, e.g: jg .swap)
+"""
+class LabelsLookup:
+    def __init__(self, symbolTable: dict, executable: list):
+        # Only labels in the text section (data pointers are after it)
+        labels = sorted((location, name) for name, location in symbolTable.items() if executable[0] <= location < executable[1])
+        self._locations = [location for location, name in labels]
+        self._names = [name for location, name in labels]
+        self._labelAt = {location: name for location, name in labels}
+
+    """
+    INPUTS: int location in text section
+    RETURNS: str nearest label at/before location, w/ offset from it (e.g: .mainLoop+4), or None if there isn't a label before it
+    """
+    def GetSite(self, location: int) -> str|None:
+        index = bisect.bisect_right(self._locations, location) - 1
+        if index < 0:
+            return None
+        offset = location - self._locations[index]
+        return self._names[index] if offset == 0 else f"{self._names[index]}+{offset}"
+
+    """
+    INPUTS: str instruction from executable (e.g: jg 12)
+    RETURNS: str instruction w/ its jump destination replaced by the label there (e.g: jg .swap)
+    """
+    def DescribeInstruction(self, instruction: str) -> str:
+        tokens = instruction.split(' ')
+        if tokens[0].startswith('j'):
+            tokens = [self._labelAt.get(int(token), token) if token.isnumeric() else token for token in tokens]
+        return " ".join(tokens)
+
+"""
+Builds a misprediction profile of every branch site in a run, worst first
+INPUTS: Statistics results of the run (w/ per-branch tracking on), list executable run, dict symbol table it was compiled with
+RETURNS: list [{location, site, instruction, executions, taken, takenRate, mispredicted, mispredictionRate, penaltyCycles}, ..],
+         sorted by penalty cycles, then mispredictions (most first)
+"""
+def CreateProfile(statistics: object, executable: list, symbolTable: dict) -> list:
+    labels = LabelsLookup(symbolTable, executable)
+    profile = []
+    for branch in statistics.GetBranchStatistics():
+        profile.append({"location": branch["location"],
+                        "site": labels.GetSite(branch["location"]),
+                        "instruction": labels.DescribeInstruction(executable[branch["location"]]),
+                        "executions": branch["executions"],
+                        "taken": branch["taken"],
+                        "takenRate": branch["takenRate"],
+                        "mispredicted": branch["mispredicted"],
+                        "mispredictionRate": branch["mispredictionRate"],
+                        "penaltyCycles": branch["penaltyCycles"]})
+    profile.sort(key=lambda branch: (branch["penaltyCycles"], branch["mispredicted"]), reverse=True)
+    return profile
+
+"""
+Runs an algorithm on a predictor, and profiles its branch sites
+INPUTS: str path to algorithm file, type predictor class to run, int BTB size, int direction buffer size, int global history length
+RETURNS: list profile rows (from CreateProfile), each w/ the algorithm and predictor added
+"""
+def ProfileAlgorithm(algorithmPath: str, predictor: type, btbSize: int = 64, directionBufferSize: int = 256, historyLength: int = 8) -> list:
+    compiler = Compiler()
+    executable = compiler.CompileFile(algorithmPath)
+
+    predictorOptions = {"historyLength": historyLength} if predictor.USES_GLOBAL_HISTORY else {}
+    P = Processor(predictor, btbSize, directionBufferSize, predictorOptions, statisticsOptions={"trackTimeline": False})
+    statistics = P.Compute(executable, echo=False)
+
+    algorithm = os.path.basename(algorithmPath).removesuffix(".txt")
+    return [{"algorithm": algorithm, "predictor": predictor.__name__, **branch}
+            for branch in CreateProfile(statistics, executable, compiler.SymbolTable)]
+
+"""
+Writes profile rows to a file (CSV if the path ends in .csv, JSON otherwise)
+INPUTS: list profile rows, str path to write to
+"""
+def WriteProfile(profile: list, path: str):
+    with open(path, 'w', newline='') as f:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(profile)
+        else:
+            json.dump(profile, f, indent=4)
+
+"""
+Prints the worst branch sites of a profile as a table
+INPUTS: list profile rows (for one algorithm + predictor), int max. no. rows to print (None = all)
+"""
+def PrintProfile(profile: list, top: int = None):
+    print(f"{'Site':<16} {'Instruction':<20} {'Executions':>10} {'Taken':>6} {'Mispredicted':>12} {'Rate':>6} {'Penalty':>8}")
+    for branch in profile[:top]:
+        site = branch["site"] if branch["site"] is not None else str(branch["location"])
+        print(f"{site:<16} {branch['instruction']:<20} {branch['executions']:>10} {branch['takenRate']:>6.2f} "
+              f"{branch['mispredicted']:>12} {branch['mispredictionRate']:>6.2f} {branch['penaltyCycles']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile which branch sites lose the most cycles to mispredicts, for each predictor")
+    parser.add_argument("algorithm", help="Algorithm file to profile")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Branch predictor to profile (can be given multiple times, defaults to all)")
+    parser.add_argument("--btb-size", type=int, default=64, help="Branch target buffer size")
+    parser.add_argument("--direction-buffer-size", type=int, default=256, help="Direction buffer size")
+    parser.add_argument("--history-length", type=int, default=8, help="Global history register length (1-64)")
+    parser.add_argument("-n", "--top", type=int, default=None, help="No. worst branch sites to print for each predictor (defaults to all)")
+    parser.add_argument("-o", "--output", default=None, help="File to write every profile to (.csv for CSV, otherwise JSON)")
+    args = parser.parse_args()
+
+    predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+    profiles = []
+    for predictorName in predictors:
+        profile = ProfileAlgorithm(args.algorithm, PREDICTORS[predictorName], args.btb_size, args.direction_buffer_size, args.history_length)
+        print(f"\n{predictorName}")
+        PrintProfile(profile, args.top)
+        profiles += profile
+
+    if args.output is not None:
+        WriteProfile(profiles, args.output)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import math
+import os
+import time
+from statistics import NormalDist
+from Compiler.Compiler import Compiler
+from CPU.Processor import Processor
+from CPU.DirectionPredictors import PREDICTORS
+
+"""
+Sampled Simulation - Only simulates the pipeline for short windows spread evenly through a run,
+running everything in between on the functional engine (far faster), then extrapolates the results of the whole run from the windows
+
+Every period of instructions is split into:
+    Fast-forward - run functionally, predictor left alone
+    Warm-up      - run functionally, predictor trained on every branch (so it isn't cold when the window starts)
+    Detailed warm-up - run in the pipeline, but not measured (so the window doesn't start w/ an empty pipeline)
+    Window       - run in the pipeline, and measured (one sample)
+The run's CPI and misprediction rate are estimated from the samples (as ratios of their totals),
+w/ confidence intervals from the variation between samples
+"""
+
+"""
+Estimates a ratio of totals (e.g: cycles / instructions) from samples, w/ a confidence interval
+Uses the ratio estimator (sum of numerators / sum of denominators), w/ the usual approximation of its standard error
+INPUTS: list numerators (one per sample), list denominators (one per sample), float confidence level (e.g: 0.95)
+RETURNS: tuple (float estimate, float half width of confidence interval), estimate is None if denominators are all 0,
+         half width is None if there are too few samples to estimate it (fewer than 2)
+"""
+def EstimateRatio(numerators: list, denominators: list, confidence: float = 0.95) -> tuple:
+    sampleCount = len(denominators)
+    if sum(denominators) == 0:
+        return None, None
+    ratio = sum(numerators) / sum(denominators)
+    if sampleCount < 2:
+        return ratio, None
+
+    meanDenominator = sum(denominators) / sampleCount
+    residuals = sum((numerator - ratio * denominator) ** 2 for numerator, denominator in zip(numerators, denominators))
+    standardError = math.sqrt(residuals / (sampleCount * (sampleCount - 1))) / meanDenominator
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return ratio, z * standardError
+
+"""
+Runs an executable w/ sampled simulation, collecting a sample from each period of instructions
+INPUTS: Processor processor to run on, list executable, int no. instructions in each period, int no. instructions measured in each window,
+        int no. instructions warming up the predictor before each window, int no. instructions warming up the pipeline before each window
+RETURNS: list samples [{start, instructions, cycles, branches, mispredicted}, ..] (start = no. instructions run before the window)
+"""
+def CollectSamples(processor: Processor, executable: list, period: int, window: int, warmUp: int, detailedWarmUp: int) -> list:
+    fastForward = period - warmUp - detailedWarmUp - window
+    if window <= 0 or warmUp < 0 or detailedWarmUp < 0 or fastForward < 0:
+        raise Exception(f"Period ({period} instructions) must fit its warm-ups ({warmUp} + {detailedWarmUp}) and a window ({window}) of at least 1 instruction")
+
+    statistics = processor.statistics
+    processor.Reset()
+    processor.echoOutput = False
+    processor.LoadExecutable(executable)
+
+    samples = []
+    while processor.running:
+        processor.FastForward(fastForward, warmPredictor=False)
+        processor.FastForward(warmUp, warmPredictor=True)
+        if not processor.running:
+            break
+        processor.Run(echo=False, maxInstructions=statistics.instructions + detailedWarmUp)
+
+        # Measure the window
+        start = {"instructions": statistics.instructions,
+                 "cycles": processor.cycleCount,
+                 "branches": statistics.predicted + statistics.mispredicted,
+                 "mispredicted": statistics.mispredicted}
+        processor.Run(echo=False, maxInstructions=statistics.instructions + window)
+        sample = {"start": processor.fastForwardedInstructions + start["instructions"],
+                  "instructions": statistics.instructions - start["instructions"],
+                  "cycles": processor.cycleCount - start["cycles"],
+                  "branches": statistics.predicted + statistics.mispredicted - start["branches"],
+                  "mispredicted": statistics.mispredicted - start["mispredicted"]}
+        # (Last window may be cut short by the program exiting)
+        if sample["instructions"] > 0:
+            samples.append(sample)
+
+        processor.StopPipeline()
+    return samples
+
+"""
+Extrapolates the results of a whole run from its samples
+INPUTS: list samples (from CollectSamples), int total no. instructions in the run, float confidence level
+RETURNS: dict {samples, instructions, cpi, cpiInterval, cycles, cyclesInterval, mispredictionRate, mispredictionRateInterval}
+         (intervals are half widths, so the estimate is value +/- interval)
+"""
+def Extrapolate(samples: list, totalInstructions: int, confidence: float = 0.95) -> dict:
+    cpi, cpiInterval = EstimateRatio([sample["cycles"] for sample in samples], [sample["instructions"] for sample in samples], confidence)
+    mispredictionRate, mispredictionRateInterval = EstimateRatio([sample["mispredicted"] for sample in samples],
+                                                                 [sample["branches"] for sample in samples], confidence)
+    return {"samples": len(samples),
+            "instructions": totalInstructions,
+            "cpi": cpi,
+            "cpiInterval": cpiInterval,
+            "cycles": cpi * totalInstructions if cpi is not None else None,
+            "cyclesInterval": cpiInterval * totalInstructions if cpiInterval is not None else None,
+            "mispredictionRate": mispredictionRate,
+            "mispredictionRateInterval": mispredictionRateInterval}
+
+"""
+Results of a run simulated in full in the pipeline, in the same form as Extrapolate (exact, so no intervals)
+INPUTS: Processor processor that ran the whole program
+RETURNS: dict {samples (0), instructions, cpi, cpiInterval, cycles, cyclesInterval, mispredictionRate, mispredictionRateInterval}
+"""
+def GetExactResults(processor: Processor) -> dict:
+    statistics = processor.statistics
+    branches = statistics.predicted + statistics.mispredicted
+    return {"samples": 0,
+            "instructions": statistics.instructions,
+            "cpi": processor.cycleCount / statistics.instructions if statistics.instructions > 0 else None,
+            "cpiInterval": None,
+            "cycles": processor.cycleCount,
+            "cyclesInterval": None,
+            "mispredictionRate": statistics.mispredicted / branches if branches > 0 else None,
+            "mispredictionRateInterval": None}
+
+"""
+Compiles an algorithm and runs it on a predictor w/ sampled simulation
+If the program exits before the first window (so nothing was sampled), it's run again in full in the pipeline, and its exact results given instead
+INPUTS: str path to algorithm file, type predictor class to run, int period, int window, int warm-up, int detailed warm-up (see CollectSamples),
+        float confidence level, int BTB size, int direction buffer size, int global history length
+RETURNS: dict estimated results (from Extrapolate, or GetExactResults), w/ the algorithm, predictor, whether results are exact
+         and no. seconds taken added
+"""
+def RunSampled(algorithmPath: str, predictor: type, period: int = 100000, window: int = 2000, warmUp: int = 10000, detailedWarmUp: int = 200,
+               confidence: float = 0.95, btbSize: int = 64, directionBufferSize: int = 256, historyLength: int = 8) -> dict:
+    executable = Compiler().CompileFile(algorithmPath)
+    predictorOptions = {"historyLength": historyLength} if predictor.USES_GLOBAL_HISTORY else {}
+    P = Processor(predictor, btbSize, directionBufferSize, predictorOptions, statisticsOptions={"trackBranches": False, "trackTimeline": False})
+
+    startTime = time.perf_counter()
+    samples = CollectSamples(P, executable, period, window, warmUp, detailedWarmUp)
+    if len(samples) > 0:
+        totalInstructions = P.fastForwardedInstructions + P.statistics.instructions
+        results = Extrapolate(samples, totalInstructions, confidence)
+    else:
+        # Program is shorter than a period, so is cheap to simulate in full
+        P.Reset()
+        P.Compute(executable, echo=False)
+        results = GetExactResults(P)
+    elapsedTime = time.perf_counter() - startTime
+
+    return {"algorithm": os.path.basename(algorithmPath).removesuffix(".txt"),
+            "predictor": predictor.__name__,
+            **results,
+            "exact": len(samples) == 0,
+            "seconds": elapsedTime}
+
+"""
+Formats an estimate and its confidence interval (e.g: 2.281 +/- 0.034)
+INPUTS: float estimate, float half width of interval, str format spec
+RETURNS: str formatted estimate
+"""
+def FormatEstimate(value: float|None, interval: float|None, formatSpec: str) -> str:
+    if value is None:
+        return "-"
+    if interval is None:
+        return format(value, formatSpec)
+    return f"{value:{formatSpec}} +/- {interval:{formatSpec}}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate cycles and misprediction rate by simulating the pipeline for sampled windows only")
+    parser.add_argument("algorithm", help="Algorithm file to run")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Branch predictor to run (can be given multiple times, defaults to all)")
+    parser.add_argument("--period", type=int, default=100000, help="No. instructions between the starts of each window")
+    parser.add_argument("--window", type=int, default=2000, help="No. instructions measured in each window")
+    parser.add_argument("--warm-up", type=int, default=10000, help="No. instructions training the predictor before each window")
+    parser.add_argument("--detailed-warm-up", type=int, default=200, help="No. instructions run in the pipeline before each window (not measured)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of intervals")
+    parser.add_argument("--btb-size", type=int, default=64, help="Branch target buffer size")
+    parser.add_argument("--direction-buffer-size", type=int, default=256, help="Direction buffer size")
+    parser.add_argument("--history-length", type=int, default=8, help="Global history register length (1-64)")
+    parser.add_argument("-o", "--output", default=None, help="File to write estimates to (JSON)")
+    args = parser.parse_args()
+
+    predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+    results = []
+    print(f"{'Predictor':<16} {'Samples':>7} {'Instructions':>12} {'Cycles':>26} {'CPI':>18} {'Misprediction Rate':>20} {'Seconds':>8}")
+    for predictorName in predictors:
+        result = RunSampled(args.algorithm, PREDICTORS[predictorName], args.period, args.window, args.warm_up, args.detailed_warm_up,
+                            args.confidence, args.btb_size, args.direction_buffer_size, args.history_length)
+        samples = "full" if result["exact"] else result["samples"] # (program exited before the first window, so was run in full)
+        print(f"{predictorName:<16} {samples:>7} {result['instructions']:>12} "
+              f"{FormatEstimate(result['cycles'], result['cyclesInterval'], '.0f'):>26} "
+              f"{FormatEstimate(result['cpi'], result['cpiInterval'], '.3f'):>18} "
+              f"{FormatEstimate(result['mispredictionRate'], result['mispredictionRateInterval'], '.4f'):>20} "
+              f"{result['seconds']:>8.2f}")
+        results.append(result)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import sys
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Batch import WriteResults
+from Simulation.Sweep import CreateJobs, Sweep
+
+MANIFEST_PATH = os.path.join(os.curdir, "Algorithms", "manifest.json")
+
+"""
+Benchmark Suite - The workloads listed in the manifest, each w/ the branch pattern it exercises and the results it must produce
+MANIFEST FORMAT (JSON):
+    {"workloads": [{name, file (relative to manifest), pattern, description, expectedOutput (program output), expectedInstructions}, ..]}
+"""
+
+"""
+Reads the benchmark suite's manifest
+INPUTS: str path to manifest
+RETURNS: list workloads [{name, file, pattern, description, expectedOutput, expectedInstructions, path}, ..] (path = path to algorithm file)
+"""
+def LoadManifest(path: str = MANIFEST_PATH) -> list:
+    with open(path, 'r') as f:
+        workloads = json.load(f)["workloads"]
+    for workload in workloads:
+        workload["path"] = os.path.join(os.path.dirname(path), workload["file"])
+    return workloads
+
+"""
+Writes workloads back to the manifest (e.g: after updating their expected results)
+Each workload's expected output is kept on one line, so the manifest stays readable
+INPUTS: list workloads (from LoadManifest), str path to manifest
+"""
+def WriteManifest(workloads: list, path: str = MANIFEST_PATH):
+    entries = []
+    for index, workload in enumerate(workloads):
+        entry = {key: value for key, value in workload.items() if key != "path"}
+        entry["expectedOutput"] = f"@OUTPUT{index}@" # Placeholder, replaced by the compact output once the rest is formatted
+        entries.append(entry)
+    manifest = json.dumps({"workloads": entries}, indent=4)
+    for index, workload in enumerate(workloads):
+        manifest = manifest.replace(f'"@OUTPUT{index}@"', json.dumps(workload["expectedOutput"]))
+    with open(path, 'w') as f:
+        f.write(manifest + '\n')
+
+"""
+Checks a run produced the output and no. instructions its workload expects
+INPUTS: dict summary of run (from RunSimulation), dict workload
+RETURNS: str what was wrong, or None if run was correct
+"""
+def CheckResult(result: dict, workload: dict) -> str|None:
+    if result.get("error") is not None:
+        return f"failed: {result['error']}"
+    if result["output"] != workload["expectedOutput"]:
+        return f"output {result['output']} != expected {workload['expectedOutput']}"
+    if result["instructions"] != workload["expectedInstructions"]:
+        return f"{result['instructions']} instructions != expected {workload['expectedInstructions']}"
+    return None
+
+"""
+Runs every workload in the suite under every given predictor (in parallel), and checks each run's results against the manifest
+INPUTS: list workloads (from LoadManifest), list predictor names, int no. worker processes (None = one per core)
+RETURNS: list summaries of runs (from RunSimulation), each w/ the workload's pattern, simulated cycles per second,
+         and check (None = correct, otherwise what was wrong) added
+"""
+def RunSuite(workloads: list, predictors: list, workers: int = None) -> list:
+    workloadsByPath = {workload["path"]: workload for workload in workloads}
+    jobs = CreateJobs(list(workloadsByPath.keys()), predictors, [64], [256], [8])
+    results = Sweep(jobs, workers)
+    for job, result in zip(jobs, results):
+        workload = workloadsByPath[job["algorithmPath"]]
+        result["pattern"] = workload["pattern"]
+        result["cyclesPerSecond"] = result["cycles"] / result["seconds"] if result.get("error") is None else None
+        result["check"] = CheckResult(result, workload)
+    return results
+
+"""
+Prints the results of the suite as a table
+INPUTS: list summaries of runs (from RunSuite)
+"""
+def PrintSuite(results: list):
+    print(f"{'Workload':<16} {'Pattern':<16} {'Predictor':<16} {'Cycles':>8} {'CPI':>6} {'Accuracy':>8} {'Cycles/s':>9}  Check")
+    for result in results:
+        if result.get("error") is not None:
+            print(f"{result['algorithm']:<16} {result['pattern']:<16} {result['predictor']:<16} {result['check']}")
+            continue
+        accuracy = f"{result['accuracy']:.4f}" if result["accuracy"] is not None else "-"
+        print(f"{result['algorithm']:<16} {result['pattern']:<16} {result['predictor']:<16} {result['cycles']:>8} {result['cpi']:>6.3f} "
+              f"{accuracy:>8} {result['cyclesPerSecond']:>9.0f}  {result['check'] or 'OK'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite under every predictor, checking each workload's results against the manifest")
+    parser.add_argument("-m", "--manifest", default=MANIFEST_PATH, help="Suite manifest")
+    parser.add_argument("-w", "--workload", dest="workloads", action="append", help="Workload to run (can be given multiple times, defaults to all)")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Branch predictor to run (can be given multiple times, defaults to all)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="No. worker processes (defaults to one per core)")
+    parser.add_argument("-o", "--output", default=None, help="File to write results to (.csv for CSV, otherwise JSON)")
+    parser.add_argument("--update", action="store_true",
+                        help="Record each workload's output and no. instructions in the manifest as its expected results (e.g: after changing a workload)")
+    args = parser.parse_args()
+
+    workloads = LoadManifest(args.manifest)
+    if args.workloads is not None:
+        workloads = [workload for workload in workloads if workload["name"] in args.workloads]
+    predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+
+    results = RunSuite(workloads, predictors, args.workers)
+    PrintSuite(results)
+    if args.output is not None:
+        WriteResults(results, args.output)
+
+    if args.update:
+        # Output/no. instructions don't depend on the predictor, so any correct run will do
+        for workload in workloads:
+            result = next(result for result in results if result["algorithm"] == os.path.basename(workload["file"]).removesuffix(".txt"))
+            workload["expectedOutput"] = result["output"]
+            workload["expectedInstructions"] = result["instructions"]
+        allWorkloads = LoadManifest(args.manifest)
+        updated = {workload["name"]: workload for workload in workloads}
+        WriteManifest([updated.get(workload["name"], workload) for workload in allWorkloads], args.manifest)
+    elif any(result["check"] is not None for result in results):
+        sys.exit(1)
@@ -0,0 +1,118 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Batch import RunSimulation, WriteResults, SUMMARY_FIELDS
+
+ALGORITHMS_PATH = os.path.join(os.curdir, "Algorithms")
+
+"""
+Builds every combination of algorithm, predictor and buffer sizes to run
+(history lengths are only varied for predictors that have a global history register)
+INPUTS: list algorithm paths, list predictor names, list BTB sizes, list direction buffer sizes, list global history lengths
+RETURNS: list jobs [{algorithmPath, predictorName, btbSize, directionBufferSize, historyLength}, ..]
+"""
+def CreateJobs(algorithms: list, predictors: list, btbSizes: list, directionBufferSizes: list, historyLengths: list) -> list:
+    jobs = []
+    for algorithmPath, predictorName, btbSize, directionBufferSize in itertools.product(algorithms, predictors, btbSizes, directionBufferSizes):
+        for historyLength in (historyLengths if PREDICTORS[predictorName].USES_GLOBAL_HISTORY else [None]):
+            jobs.append({"algorithmPath": algorithmPath,
+                         "predictorName": predictorName,
+                         "btbSize": btbSize,
+                         "directionBufferSize": directionBufferSize,
+                         "historyLength": historyLength})
+    return jobs
+
+"""
+Runs a single sweep job (in a worker process)
+INPUTS: dict job (from CreateJobs)
+RETURNS: dict summary of run (from RunSimulation)
+"""
+def RunJob(job: dict) -> dict:
+    return RunSimulation(job["algorithmPath"], PREDICTORS[job["predictorName"]],
+                         btbSize=job["btbSize"],
+                         directionBufferSize=job["directionBufferSize"],
+                         historyLength=job["historyLength"])
+
+"""
+Creates the summary of a job that failed, so one failed run doesn't lose the rest of the sweep
+INPUTS: dict job (from CreateJobs), Exception raised by the job
+RETURNS: dict summary of run (every field in SUMMARY_FIELDS), w/ no results and the error message
+"""
+def CreateFailedResult(job: dict, error: Exception) -> dict:
+    return {**dict.fromkeys(SUMMARY_FIELDS),
+            "algorithm": os.path.basename(job["algorithmPath"]).removesuffix(".txt"),
+            "predictor": job["predictorName"],
+            "btbSize": job["btbSize"],
+            "directionBufferSize": job["directionBufferSize"],
+            "historyLength": job["historyLength"],
+            "error": str(error)}
+
+"""
+Runs every job across a pool of worker processes, each job on its own Processor
+INPUTS: list jobs (from CreateJobs), int no. worker processes (None = one per core), bool print each result as it finishes
+RETURNS: list summaries of every run, in the same order as jobs (failed runs have an error message instead of results)
+"""
+def Sweep(jobs: list, workers: int = None, verbose: bool = False) -> list:
+    results = [None for i in range(len(jobs))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(RunJob, job): index for index, job in enumerate(jobs)}
+        for completed, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = CreateFailedResult(jobs[index], e)
+            if verbose:
+                print(f"[{completed}/{len(jobs)}] {FormatRow(results[index])}")
+    return results
+
+"""
+Formats a run summary as a single row of the results table
+INPUTS: dict summary of run
+RETURNS: str row
+"""
+def FormatRow(result: dict) -> str:
+    historyLength = result["historyLength"] if result["historyLength"] is not None else "-"
+    row = f"{result['algorithm']:<20} {result['predictor']:<16} {result['btbSize']:>6} {result['directionBufferSize']:>6} {historyLength:>4} "
+    if result.get("error") is not None:
+        return row + f"FAILED: {result['error']}"
+    accuracy = f"{result['accuracy']:.4f}" if result["accuracy"] is not None else "-"
+    return row + f"{result['cycles']:>10} {result['predicted']:>9} {result['mispredicted']:>12} {accuracy:>8}"
+
+"""
+Prints the results of a sweep as a table
+INPUTS: list summaries of runs
+"""
+def PrintTable(results: list):
+    print(f"{'Algorithm':<20} {'Predictor':<16} {'BTB':>6} {'DB':>6} {'GHR':>4} {'Cycles':>10} {'Predicted':>9} {'Mispredicted':>12} {'Accuracy':>8}")
+    for result in results:
+        print(FormatRow(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every combination of algorithms, predictors and buffer sizes in parallel")
+    parser.add_argument("-a", "--algorithm", dest="algorithms", action="append",
+                        help="Algorithm file to run (can be given multiple times, defaults to everything in Algorithms/)")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Branch predictor to run (can be given multiple times, defaults to all)")
+    parser.add_argument("--btb-sizes", type=int, nargs='+', default=[64], help="Branch target buffer sizes")
+    parser.add_argument("--direction-buffer-sizes", type=int, nargs='+', default=[256], help="Direction buffer sizes")
+    parser.add_argument("--history-lengths", type=int, nargs='+', default=[8], help="Global history register lengths (1-64)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="No. worker processes (defaults to one per core)")
+    parser.add_argument("-o", "--output", default=None, help="File to write results to (.csv for CSV, otherwise JSON)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each result as it finishes")
+    args = parser.parse_args()
+
+    algorithms = args.algorithms
+    if algorithms is None:
+        algorithms = [os.path.join(ALGORITHMS_PATH, alg) for alg in sorted(os.listdir(ALGORITHMS_PATH)) if alg.endswith(".txt")]
+    predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+
+    jobs = CreateJobs(algorithms, predictors, args.btb_sizes, args.direction_buffer_sizes, args.history_lengths)
+    results = Sweep(jobs, args.workers, args.verbose)
+
+    PrintTable(results)
+    if args.output is not None:
+        WriteResults(results, args.output)
@@ -0,0 +1,233 @@
+import argparse
+import json
+import struct
+from collections import deque
+from CPU.Buffers import BranchTargetBuffer, DirectionBuffer
+from CPU.DirectionPredictors import PREDICTORS
+
+"""
+Branch Trace - Every call the pipeline makes to its branch predictor, in order, stored as a compact binary file
+so predictors can be evaluated without re-simulating the pipeline
+
+A trace is only replayed exactly by the predictor that recorded it, created w/ the same configuration (see CheckReplayable):
+    - It includes predictions made on the wrong path (fetched after a mispredicted branch, then flushed), which look up (so change the LRU order of)
+      the predictor's tables, and are shifted into a global history
+    - Each prediction is made at the point in the run the recording predictor made it, so sees the branches that had resolved by then.
+      Another predictor (or table size) mispredicts different branches, so would have made its predictions at different points
+Only predictors w/ no tables (always not taken) give the same results on any trace
+
+FILE FORMAT:
+    Header: MAGIC, 1 byte version, uint16 length of recording, then recording (JSON, configuration of the predictor that recorded the trace,
+            from BasePredictor.GetConfiguration: {predictor, btbSize, directionBufferSize, historyLength})
+    Events (little-endian, 1 byte event type then its fields):
+        PREDICT           - uint32 program counter
+        STALL             - (no fields)
+        UPDATE_NOT_TAKEN  - uint32 branch source, uint32 branch destination
+        UPDATE_TAKEN      - uint32 branch source, uint32 branch destination
+"""
+MAGIC = b"BTRACE"
+VERSION = 2
+
+## Event types
+PREDICT = 0
+STALL = 1
+UPDATE_NOT_TAKEN = 2
+UPDATE_TAKEN = 3
+
+PREDICT_EVENT = struct.Struct("<BI")
+STALL_EVENT = struct.Struct("<B")
+UPDATE_EVENT = struct.Struct("<BII")
+RECORDING_LENGTH = struct.Struct("<H")
+
+"""
+Trace Recorder - Wraps a branch predictor, recording every call made to it before passing it on
+DATA:
+    BasePredictor predictor being recorded
+    file trace file being written to
+FUNCTIONALITY:
+    Predict/Update/Stall (same as BasePredictor)
+    Close (writes any remaining events to file)
+"""
+class TraceRecorder:
+    FLUSH_SIZE = 1 << 16 # No. bytes of events to buffer before writing to file
+
+    def __init__(self, predictor: object, path: str):
+        self.predictor = predictor
+        self.name = predictor.name
+        self._file = open(path, "wb")
+        recording = json.dumps(predictor.GetConfiguration()).encode()
+        self._file.write(MAGIC + bytes([VERSION]) + RECORDING_LENGTH.pack(len(recording)) + recording)
+        self._events = bytearray()
+
+    def Predict(self, programCounter: int) -> int:
+        self._events += PREDICT_EVENT.pack(PREDICT, programCounter)
+        self.FlushIfFull()
+        return self.predictor.Predict(programCounter)
+
+    def Update(self, source: int, destination: int, branchOutcome: bool):
+        self._events += UPDATE_EVENT.pack(UPDATE_TAKEN if branchOutcome else UPDATE_NOT_TAKEN, source, destination)
+        self.FlushIfFull()
+        self.predictor.Update(source, destination, branchOutcome)
+
+    def Stall(self):
+        self._events += STALL_EVENT.pack(STALL)
+        self.FlushIfFull()
+        self.predictor.Stall()
+
+    """
+    Writes buffered events to file once enough have built up
+    """
+    def FlushIfFull(self):
+        if len(self._events) >= self.FLUSH_SIZE:
+            self._file.write(self._events)
+            self._events.clear()
+
+    """
+    Writes remaining events to file, and closes it
+    """
+    def Close(self):
+        self._file.write(self._events)
+        self._events.clear()
+        self._file.close()
+
+"""
+Reads a trace file into the configuration of the predictor that recorded it, and a list of events
+INPUTS: str path to trace file
+RETURNS: tuple (dict recording {predictor, btbSize, directionBufferSize, historyLength},
+                list events [(int event type, int field 1, int field 2), ..] (unused fields are None))
+"""
+def ReadTrace(path: str) -> tuple:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if not data.startswith(MAGIC) or len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+        raise Exception(f"{path} is not a version {VERSION} branch trace!")
+
+    offset = len(MAGIC) + 1
+    recordingLength = RECORDING_LENGTH.unpack_from(data, offset)[0]
+    offset += RECORDING_LENGTH.size
+    recording = json.loads(data[offset:offset + recordingLength])
+    offset += recordingLength
+
+    events = []
+    while offset < len(data):
+        match data[offset]:
+            case 0: # PREDICT
+                events.append((PREDICT, PREDICT_EVENT.unpack_from(data, offset)[1], None))
+                offset += PREDICT_EVENT.size
+            case 1: # STALL
+                events.append((STALL, None, None))
+                offset += STALL_EVENT.size
+            case 2 | 3: # UPDATE_NOT_TAKEN / UPDATE_TAKEN
+                events.append(UPDATE_EVENT.unpack_from(data, offset))
+                offset += UPDATE_EVENT.size
+            case _:
+                raise Exception(f"Invalid event type {data[offset]} at byte {offset} of {path}")
+    return recording, events
+
+"""
+Checks a trace can be replayed exactly on a predictor (it must be the predictor that recorded the trace, w/ the same configuration,
+unless it has no tables - see module description)
+INPUTS: dict recording (from ReadTrace), dict configuration of predictor to replay on (from BasePredictor.GetConfiguration)
+RETURNS: str why trace can't be replayed on predictor, or None if it can
+"""
+def CheckReplayable(recording: dict, configuration: dict) -> str|None:
+    hasTables = any(configuration[table] is not None for table in ["btbSize", "directionBufferSize", "historyLength"])
+    if not hasTables or configuration == recording:
+        return None
+    return (f"trace can only be replayed exactly by the predictor that recorded it, w/ the same configuration "
+            f"(predictor: {configuration}, trace recorded by: {recording})")
+
+"""
+Runs a predictor over a recorded branch trace, calling it exactly as the pipeline did
+Each prediction is matched to the branch it was made for in fetch order (the same branch can be in flight more than once),
+and a branch is counted as predicted if that prediction matches its outcome
+(i.e: predicted taken <-> predictor didn't return the next location, same as the speculative flag in the pipeline)
+INPUTS: list events (from ReadTrace), BasePredictor predictor to evaluate, dict recording (from ReadTrace)
+RETURNS: dict {int no. correctly predicted branches, int no. mispredicted branches}
+"""
+def ReplayTrace(events: list, predictor: object, recording: dict) -> dict:
+    problem = CheckReplayable(recording, predictor.GetConfiguration())
+    if problem is not None:
+        raise Exception(f"Can't replay trace exactly: {problem}")
+
+    predicted = 0
+    mispredicted = 0
+    inFlightPredictions = {} # {location: queue of predicted taken, oldest first}
+    for eventType, first, second in events:
+        if eventType == PREDICT:
+            # Stalled predictors only re-fetch the current location, so don't make a prediction for it
+            if predictor.stalled:
+                predictor.Predict(first)
+            else:
+                predictedTaken = predictor.Predict(first) != first + 1
+                if first not in inFlightPredictions:
+                    inFlightPredictions[first] = deque()
+                inFlightPredictions[first].append(predictedTaken)
+        elif eventType == STALL:
+            # Stalls come from mispredicts, which flush every in-flight instruction
+            predictor.Stall()
+            inFlightPredictions.clear()
+        else:
+            branchOutcome = eventType == UPDATE_TAKEN
+            predictor.Update(first, second, branchOutcome)
+            queue = inFlightPredictions.get(first)
+            if queue and queue.popleft() == branchOutcome:
+                predicted += 1
+            else:
+                mispredicted += 1
+    return {"Predicted": predicted,
+            "Mispredicted": mispredicted}
+
+"""
+Creates a predictor the same way the Processor does
+INPUTS: type predictor class, int BTB size, int direction buffer size, int global history length (ignored by predictors without one)
+RETURNS: BasePredictor predictor
+"""
+def CreatePredictor(predictor: type, btbSize: int = 64, directionBufferSize: int = 256, historyLength: int = 8) -> object:
+    predictorOptions = {"historyLength": historyLength} if predictor.USES_GLOBAL_HISTORY else {}
+    return predictor(BranchTargetBuffer(btbSize), DirectionBuffer(directionBufferSize), **predictorOptions)
+
+
+if __name__ == "__main__":
+    from Simulation.Batch import RunSimulation
+
+    parser = argparse.ArgumentParser(description="Record branch traces from full pipeline runs, and replay them "
+                                                 "(exactly, only on the predictor + configuration that recorded them)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recordParser = subparsers.add_parser("record", help="Run an algorithm on the full pipeline, recording its branch trace")
+    recordParser.add_argument("algorithm", help="Algorithm file to run")
+    recordParser.add_argument("-p", "--predictor", default="TwoBitLastTime", choices=PREDICTORS.keys(), help="Predictor to run the pipeline with")
+    recordParser.add_argument("-o", "--output", required=True, help="Trace file to write")
+
+    replayParser = subparsers.add_parser("replay", help="Replay a branch trace on predictor(s)")
+    replayParser.add_argument("trace", help="Trace file to replay")
+    replayParser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                              help="Predictor to replay (can be given multiple times, defaults to all that can replay the trace exactly)")
+    replayParser.add_argument("--btb-size", type=int, default=64, help="Branch target buffer size")
+    replayParser.add_argument("--direction-buffer-size", type=int, default=256, help="Direction buffer size")
+    replayParser.add_argument("--history-length", type=int, default=8, help="Global history register length (1-64)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        result = RunSimulation(args.algorithm, PREDICTORS[args.predictor], tracePath=args.output)
+        print(f"Recorded {args.algorithm} ({result['cycles']} cycles, {result['predicted']} predicted, {result['mispredicted']} mispredicted) to {args.output}")
+    else:
+        recording, events = ReadTrace(args.trace)
+        predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+        print(f"Trace recorded by {recording['predictor']}")
+        print(f"{'Predictor':<16} {'Predicted':>9} {'Mispredicted':>12} {'Accuracy':>8}")
+        for predictorName in predictors:
+            predictor = CreatePredictor(PREDICTORS[predictorName], args.btb_size, args.direction_buffer_size, args.history_length)
+            problem = CheckReplayable(recording, predictor.GetConfiguration())
+            if problem is not None:
+                # Only an error if predictor was asked for - otherwise it's skipped, so no wrong results are printed
+                if args.predictors is not None:
+                    raise Exception(f"Can't replay trace exactly: {problem}")
+                print(f"{predictorName:<16} skipped: {problem}")
+                continue
+            results = ReplayTrace(events, predictor, recording)
+            total = results["Predicted"] + results["Mispredicted"]
+            accuracy = f"{results['Predicted'] / total:.4f}" if total > 0 else "-"
+            print(f"{predictorName:<16} {results['Predicted']:>9} {results['Mispredicted']:>12} {accuracy:>8}")
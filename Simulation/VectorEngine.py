@@ -0,0 +1,351 @@
+import argparse
+import itertools
+from collections import deque
+import numpy as np
+from CPU.DirectionPredictors import PREDICTORS, AlwaysNotTaken, AlwaysTaken, OneBitLastTime, TwoBitLastTime, gshare
+from Simulation.Trace import ReadTrace, CheckReplayable, CreatePredictor, PREDICT, STALL, UPDATE_TAKEN
+
+"""
+Vector Engine - Replays a branch trace on many configurations (buffer sizes, history lengths) of one predictor at once
+Every configuration's tables are a row of a NumPy array, so each event in the trace is a handful of array operations
+across every configuration, instead of a Python method call per configuration
+Gives exactly the same results as ReplayTrace on the predictor classes (same set-associative LRU tables, same gshare history),
+so has the same limit: a trace can only be replayed on the predictor + configuration that recorded it (see Trace.CheckReplayable).
+It does NOT sweep one trace over many configurations - each configuration needs a trace recorded w/ it (always not taken excepted)
+"""
+
+## Operations replayed on every configuration (worked out once from the trace, as they're the same for every configuration)
+PREDICT_OP = 0 # (PREDICT_OP, program counter, prediction no.)
+UPDATE_OP = 1 # (UPDATE_OP, branch source, branch destination, branch outcome, prediction no. it's matched to (-1 = none))
+
+ALL_BITS = np.uint64((1 << 64) - 1)
+
+"""
+Vector Table - A set-associative buffer (same as CPU.Buffers.SetAssociativeBuffer) for every configuration,
+each configuration's entries being a row of the arrays (rows are padded to the largest size)
+DATA:
+    int no. ways
+    array no. sets in each row, array tags, array valid bits, array values, array last time each entry was used (for LRU)
+FUNCTIONALITY:
+    Get/Add (same as SetAssociativeBuffer, but for every row at once)
+"""
+class VectorTable:
+    def __init__(self, sizes: list, ways: int = 4):
+        for size in sizes:
+            if ways <= 0 or size % ways != 0:
+                raise Exception(f"Table size ({size}) must be a multiple of its no. ways ({ways})!")
+        rows = len(sizes)
+        rowSize = max(sizes)
+        self._WAYS = ways
+        self._sets = np.array([size // ways for size in sizes], dtype=np.uint64)
+        # Each row's entries are stored one after another, so an entry in any row can be found w/ a single flat index
+        self._rowStarts = (np.arange(rows, dtype=np.int64) * rowSize)[:, None]
+        self._wayOffsets = np.arange(ways, dtype=np.int64)[None, :]
+        # Every tag is a valid index (e.g: gshare's pc xor 64 bit history), so empty entries are marked by their valid bit
+        self._tags = np.zeros(rows * rowSize, dtype=np.uint64)
+        self._valid = np.zeros(rows * rowSize, dtype=bool)
+        self._values = np.zeros(rows * rowSize, dtype=np.int64)
+        self._lastUsed = np.zeros(rows * rowSize, dtype=np.int64)
+
+    # Finds the entries of the set each row's index belongs in, and which of them (if any) hold the index
+    def FindSet(self, index: np.ndarray) -> tuple:
+        entries = self._rowStarts + ((index % self._sets) * np.uint64(self._WAYS)).astype(np.int64)[:, None] + self._wayOffsets
+        matches = (self._tags[entries] == index[:, None]) & self._valid[entries]
+        return entries, matches
+
+    """
+    Looks up an index in every row (only rows in active are counted as accessed, for LRU)
+    INPUTS: array index to look up in each row, array bool whether each row is accessed, int time of access
+    RETURNS: array bool whether index was found in each active row, array value found in each row
+    """
+    def Get(self, index: np.ndarray, active: np.ndarray, time: int) -> tuple:
+        entries, matches = self.FindSet(index)
+        found = matches.any(axis=1) & active
+        entry = entries[np.arange(len(entries)), matches.argmax(axis=1)]
+        self._lastUsed[entry[found]] = time
+        return found, self._values[entry]
+
+    """
+    Adds value at index in every active row (replacing value already there, otherwise evicting the least recently used entry in its set)
+    INPUTS: array index to add at in each row, array value to add in each row, array bool whether each row is added to, int time of access
+    """
+    def Add(self, index: np.ndarray, value: np.ndarray, active: np.ndarray, time: int):
+        entries, matches = self.FindSet(index)
+        rows = np.arange(len(entries))
+        # Index already in row - replace its value, otherwise least recently used entry (empty entries were last used at time 0)
+        way = np.where(matches.any(axis=1), matches.argmax(axis=1), self._lastUsed[entries].argmin(axis=1))
+        entry = entries[rows, way][active]
+        self._tags[entry] = index[active]
+        self._valid[entry] = True
+        self._values[entry] = value[active]
+        self._lastUsed[entry] = time
+
+"""
+Vector Global History Register - A gshare global history register + outstanding branch queue (same as CPU.Buffers.GlobalHistoryRegister)
+for every configuration, each row w/ its own history length
+FUNCTIONALITY:
+    Add/Remove/GetNonSpeculative/GetOldestPrediction/Restore (same as GlobalHistoryRegister, but for every row at once)
+"""
+class VectorGlobalHistoryRegister:
+    MAX_OUTSTANDING = 64 # Outstanding branch queue is a 64 bit int in each row
+
+    def __init__(self, sizes: list):
+        for size in sizes:
+            if not 1 <= size <= 64:
+                raise Exception(f"Global history length must be 1-64 bits, not {size}")
+        self._SIZES = np.array(sizes, dtype=np.uint64)
+        self._NEWEST_BITS = self._SIZES - np.uint64(1)
+        self._MASKS = np.array([(1 << size) - 1 for size in sizes], dtype=np.uint64)
+        # Fill registers with taken outcomes, no outstanding branches
+        self.history = self._MASKS.copy()
+        self._outstanding = np.zeros(len(sizes), dtype=np.uint64)
+        self._outstandingCount = np.zeros(len(sizes), dtype=np.uint64)
+
+    def Add(self, prediction: np.ndarray, active: np.ndarray):
+        if self._outstandingCount.max() >= self.MAX_OUTSTANDING:
+            raise Exception(f"More than {self.MAX_OUTSTANDING} outstanding branches in global history register!")
+        outstanding = self._outstanding | ((self.history & np.uint64(1)) << self._outstandingCount)
+        history = (self.history >> np.uint64(1)) | (prediction.astype(np.uint64) << self._NEWEST_BITS)
+        self._outstanding = np.where(active, outstanding, self._outstanding)
+        self._outstandingCount = np.where(active, self._outstandingCount + np.uint64(1), self._outstandingCount)
+        self.history = np.where(active, history, self.history)
+
+    def Remove(self, active: np.ndarray):
+        active = active & (self._outstandingCount > 0)
+        self._outstanding = np.where(active, self._outstanding >> np.uint64(1), self._outstanding)
+        self._outstandingCount = np.where(active, self._outstandingCount - np.uint64(1), self._outstandingCount)
+
+    def GetNonSpeculative(self) -> np.ndarray:
+        full = self._outstandingCount >= self._SIZES
+        nonSpeculativeBits = np.where(full, np.uint64(0), self._SIZES - self._outstandingCount)
+        # (1 << 64) doesn't fit, so rows w/ no outstanding branches and 64 bit histories use every bit
+        nonSpeculativeMask = np.where(nonSpeculativeBits >= np.uint64(64), ALL_BITS,
+                                      (np.uint64(1) << np.minimum(nonSpeculativeBits, np.uint64(63))) - np.uint64(1))
+        return np.where(full, self._outstanding & self._MASKS,
+                        (self.history & nonSpeculativeMask) | (self._outstanding << nonSpeculativeBits))
+
+    def GetOldestPrediction(self) -> np.ndarray:
+        bit = (self._SIZES - self._outstandingCount % self._SIZES) % self._SIZES
+        return ((self.history >> bit) & np.uint64(1)).astype(bool)
+
+    def Restore(self, branchOutcome: bool, active: np.ndarray):
+        history = (self.GetNonSpeculative() >> np.uint64(1)) | (np.uint64(branchOutcome) << self._NEWEST_BITS)
+        self.history = np.where(active, history, self.history)
+        self._outstanding = np.where(active, np.uint64(0), self._outstanding)
+        self._outstandingCount = np.where(active, np.uint64(0), self._outstandingCount)
+
+"""
+Works out the operations that need replaying on every configuration from a branch trace,
+matching each branch outcome to the prediction made for it (same as ReplayTrace)
+Predictions are only replayed for locations that have been a branch source before, as nothing else can be in the BTB (so is predicted not taken)
+INPUTS: list events (from ReadTrace)
+RETURNS: list operations [(PREDICT_OP, ..)/(UPDATE_OP, ..), ..], int total no. predictions made
+"""
+def CreateOperations(events: list) -> tuple:
+    operations = []
+    predictionCount = 0
+    stalled = True
+    branchSources = set()
+    inFlightPredictions = {} # {location: queue of prediction nos., oldest first}
+    for eventType, first, second in events:
+        if eventType == PREDICT:
+            # Stalled predictors only re-fetch the current location, so don't make a prediction for it
+            if stalled:
+                stalled = False
+                continue
+            if first in branchSources:
+                operations.append((PREDICT_OP, first, predictionCount))
+            if first not in inFlightPredictions:
+                inFlightPredictions[first] = deque()
+            inFlightPredictions[first].append(predictionCount)
+            predictionCount += 1
+        elif eventType == STALL:
+            stalled = True
+            inFlightPredictions.clear()
+        else:
+            branchSources.add(first)
+            queue = inFlightPredictions.get(first)
+            operations.append((UPDATE_OP, first, second, eventType == UPDATE_TAKEN, queue.popleft() if queue else -1))
+    return operations, predictionCount
+
+"""
+Vector Engine - Simulates one predictor class w/ many configurations side by side
+DATA:
+    type predictor class being simulated
+    list configurations [{btbSize, directionBufferSize, historyLength}, ..]
+    VectorTable BTB, VectorTable direction buffer, VectorGlobalHistoryRegister GHR (gshare only)
+FUNCTIONALITY:
+    Replay (runs every configuration over a trace)
+"""
+class VectorEngine:
+    SUPPORTED_PREDICTORS = [AlwaysNotTaken, AlwaysTaken, OneBitLastTime, TwoBitLastTime, gshare]
+
+    def __init__(self, predictor: type, configurations: list, ways: int = 4):
+        if predictor not in self.SUPPORTED_PREDICTORS:
+            raise Exception(f"Vector engine can't simulate {predictor.__name__}!")
+        self.predictor = predictor
+        self.configurations = configurations
+        self._ways = ways
+
+    """
+    Runs every configuration over a branch trace, from empty tables
+    INPUTS: list events (from ReadTrace), dict recording (from ReadTrace)
+    RETURNS: list {int no. correctly predicted branches, int no. mispredicted branches} for each configuration (same as ReplayTrace)
+    """
+    def Replay(self, events: list, recording: dict) -> list:
+        for configuration in self.configurations:
+            problem = CheckReplayable(recording, self.GetConfiguration(configuration))
+            if problem is not None:
+                raise Exception(f"Can't replay trace exactly: {problem}")
+
+        configurationCount = len(self.configurations)
+        self.BTB = VectorTable([configuration["btbSize"] for configuration in self.configurations], self._ways)
+        self.DirectionBuffer = VectorTable([configuration["directionBufferSize"] for configuration in self.configurations], self._ways)
+        if self.predictor is gshare:
+            self.GlobalHistoryRegister = VectorGlobalHistoryRegister([configuration["historyLength"] for configuration in self.configurations])
+        self._time = 0
+
+        operations, predictionCount = CreateOperations(events)
+        predictedTaken = np.zeros((predictionCount, configurationCount), dtype=bool)
+        predicted = np.zeros(configurationCount, dtype=np.int64)
+        mispredicted = np.zeros(configurationCount, dtype=np.int64)
+        everyRow = np.ones(configurationCount, dtype=bool)
+
+        # Always not taken never predicts a branch taken, and has no tables to update
+        if self.predictor is AlwaysNotTaken:
+            operations = [operation for operation in operations if operation[0] == UPDATE_OP]
+
+        for operation in operations:
+            if operation[0] == PREDICT_OP:
+                _, programCounter, prediction = operation
+                predictedTaken[prediction] = self.Predict(np.full(configurationCount, programCounter, dtype=np.uint64), everyRow)
+            else:
+                _, source, destination, branchOutcome, prediction = operation
+                self.Update(np.full(configurationCount, source, dtype=np.uint64), destination, branchOutcome, everyRow)
+                if prediction == -1:
+                    mispredicted += 1
+                else:
+                    correct = predictedTaken[prediction] == branchOutcome
+                    predicted += correct
+                    mispredicted += ~correct
+
+        return [{"Predicted": int(predicted[row]),
+                 "Mispredicted": int(mispredicted[row])} for row in range(configurationCount)]
+
+    """
+    Describes a configuration the same way the predictor class would (see BasePredictor.GetConfiguration)
+    INPUTS: dict configuration {btbSize, directionBufferSize, historyLength}
+    RETURNS: dict {predictor, btbSize, directionBufferSize, historyLength}
+    """
+    def GetConfiguration(self, configuration: dict) -> dict:
+        # Asks the predictor class, so tables it doesn't have (e.g: always taken's direction buffer) are left out the same way
+        return CreatePredictor(self.predictor, configuration["btbSize"], configuration["directionBufferSize"],
+                               configuration["historyLength"]).GetConfiguration()
+
+    # Each table access gets a new time, so least recently used entries can be found
+    def Tick(self) -> int:
+        self._time += 1
+        return self._time
+
+    """
+    Predicts whether the branch at a location is taken, in every configuration (same as Predict on the predictor class)
+    INPUTS: array program counter (same in every row), array bool rows to predict in
+    RETURNS: array bool predicted taken (predictor didn't return the next location) in each row
+    """
+    def Predict(self, programCounter: np.ndarray, active: np.ndarray) -> np.ndarray:
+        inBTB, destination = self.BTB.Get(programCounter, active, self.Tick())
+        takenToNewLocation = inBTB & (destination != programCounter.astype(np.int64) + 1)
+        if self.predictor is AlwaysTaken:
+            return takenToNewLocation
+
+        if self.predictor is gshare:
+            inDirectionBuffer, prediction = self.DirectionBuffer.Get(programCounter ^ self.GlobalHistoryRegister.history, inBTB, self.Tick())
+            # For branches that have not been hit with given history yet, assume True
+            prediction = ~inDirectionBuffer | (prediction != 0)
+            self.GlobalHistoryRegister.Add(prediction, inBTB)
+            return takenToNewLocation & prediction
+
+        inDirectionBuffer, certainty = self.DirectionBuffer.Get(programCounter, inBTB, self.Tick())
+        if self.predictor is OneBitLastTime:
+            return takenToNewLocation & inDirectionBuffer & (certainty == 1)
+        return takenToNewLocation & inDirectionBuffer & (certainty >= 2)
+
+    """
+    Updates every configuration w/ the outcome of a branch (same as Update on the predictor class)
+    INPUTS: array branch source (same in every row), int branch destination, bool branch outcome, array bool rows to update
+    """
+    def Update(self, source: np.ndarray, destination: int, branchOutcome: bool, active: np.ndarray):
+        destinations = np.full(len(source), destination, dtype=np.int64)
+
+        if self.predictor is AlwaysTaken:
+            inBTB, _ = self.BTB.Get(source, active, self.Tick())
+            self.BTB.Add(source, destinations, active & ~inBTB, self.Tick())
+
+        elif self.predictor in (OneBitLastTime, TwoBitLastTime):
+            if self.predictor is OneBitLastTime:
+                certainty = np.full(len(source), int(branchOutcome), dtype=np.int64)
+            else:
+                inDirectionBuffer, certainty = self.DirectionBuffer.Get(source, active, self.Tick())
+                # If not in direction buffer, 2 if taken, 1 if not taken. Otherwise move 1 towards outcome (saturating at 0/3)
+                certainty = np.where(inDirectionBuffer, np.clip(certainty + (1 if branchOutcome else -1), 0, 3), 2 if branchOutcome else 1)
+            inBTB, _ = self.BTB.Get(source, active, self.Tick())
+            self.BTB.Add(source, destinations, active & ~inBTB, self.Tick())
+            self.DirectionBuffer.Add(source, certainty, active, self.Tick())
+
+        elif self.predictor is gshare:
+            index = self.GlobalHistoryRegister.GetNonSpeculative() ^ source
+            inBTB, _ = self.BTB.Get(source, active, self.Tick())
+            self.DirectionBuffer.Add(index, np.full(len(source), int(branchOutcome), dtype=np.int64), active, self.Tick())
+            # Correct prediction => branch outcome is the same as the oldest speculative entry in GHR
+            correctlyPredicted = inBTB & (self.GlobalHistoryRegister.GetOldestPrediction() == branchOutcome)
+            self.BTB.Add(source, destinations, active, self.Tick())
+            self.GlobalHistoryRegister.Remove(active & correctlyPredicted)
+            self.GlobalHistoryRegister.Restore(branchOutcome, active & ~correctlyPredicted)
+
+"""
+Builds every combination of buffer sizes (and history lengths, for predictors w/ a global history register) to simulate
+INPUTS: type predictor class, list BTB sizes, list direction buffer sizes, list global history lengths
+RETURNS: list configurations [{btbSize, directionBufferSize, historyLength}, ..]
+"""
+def CreateConfigurations(predictor: type, btbSizes: list, directionBufferSizes: list, historyLengths: list) -> list:
+    historyLengths = historyLengths if predictor.USES_GLOBAL_HISTORY else [None]
+    return [{"btbSize": btbSize,
+             "directionBufferSize": directionBufferSize,
+             "historyLength": historyLength}
+            for btbSize, directionBufferSize, historyLength in itertools.product(btbSizes, directionBufferSizes, historyLengths)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a branch trace on predictor configurations at once "
+                                                 "(exactly, only on the predictor + configuration that recorded it)")
+    parser.add_argument("trace", help="Trace file to replay (from python -m Simulation.Trace record)")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=PREDICTORS.keys(),
+                        help="Predictor to replay (can be given multiple times, defaults to all)")
+    parser.add_argument("--btb-sizes", type=int, nargs='+', default=[64], help="Branch target buffer sizes")
+    parser.add_argument("--direction-buffer-sizes", type=int, nargs='+', default=[256], help="Direction buffer sizes")
+    parser.add_argument("--history-lengths", type=int, nargs='+', default=[8], help="Global history register lengths (1-64)")
+    args = parser.parse_args()
+
+    recording, events = ReadTrace(args.trace)
+    predictors = args.predictors if args.predictors is not None else list(PREDICTORS.keys())
+    print(f"Trace recorded by {recording['predictor']}")
+    print(f"{'Predictor':<16} {'BTB':>6} {'DB':>6} {'GHR':>4} {'Predicted':>9} {'Mispredicted':>12} {'Accuracy':>8}")
+    for predictorName in predictors:
+        configurations = CreateConfigurations(PREDICTORS[predictorName], args.btb_sizes, args.direction_buffer_sizes, args.history_lengths)
+        engine = VectorEngine(PREDICTORS[predictorName], configurations)
+        # Configurations that can't replay the trace exactly are only an error if their predictor was asked for - otherwise they're skipped
+        problems = [CheckReplayable(recording, engine.GetConfiguration(configuration)) for configuration in configurations]
+        if args.predictors is not None and any(problem is not None for problem in problems):
+            raise Exception(f"Can't replay trace exactly: {next(problem for problem in problems if problem is not None)}")
+        if all(problem is not None for problem in problems):
+            print(f"{predictorName:<16} skipped: {problems[0]}")
+            continue
+        engine.configurations = [configuration for configuration, problem in zip(configurations, problems) if problem is None]
+        if len(engine.configurations) < len(configurations):
+            print(f"{predictorName:<16} skipped {len(configurations) - len(engine.configurations)} configuration(s) the trace wasn't recorded with")
+        for configuration, results in zip(engine.configurations, engine.Replay(events, recording)):
+            total = results["Predicted"] + results["Mispredicted"]
+            accuracy = f"{results['Predicted'] / total:.4f}" if total > 0 else "-"
+            historyLength = configuration["historyLength"] if configuration["historyLength"] is not None else "-"
+            print(f"{predictorName:<16} {configuration['btbSize']:>6} {configuration['directionBufferSize']:>6} {historyLength:>4} "
+                  f"{results['Predicted']:>9} {results['Mispredicted']:>12} {accuracy:>8}")
@@ -1,80 +1,133 @@
+import argparse
 import os
+import sys
 from Compiler.Compiler import Compiler
 from CPU.Processor import Processor
 import CPU.DirectionPredictors
-import matplotlib.pyplot as plt
-
-C = Compiler()
+from Simulation.Batch import RunSimulation, WriteResults
 
 CURRENT_PATH = os.curdir
 ALGORITHMS_PATH = os.path.join(CURRENT_PATH, "Algorithms")
 
 
-## Allow user to select algorithm
-# Display files  in algorithms folder
-AvailableAlgorithms = os.listdir(ALGORITHMS_PATH)
-print("Select which algorithm you would like to run: ")
-for index, alg in enumerate(AvailableAlgorithms):
-    print(f"{index}. {alg.removesuffix(".txt")}")
+"""
+Runs the simulator interactively (select algorithm/predictor from menus, then plot results)
+"""
+def RunInteractive():
+    import matplotlib.pyplot as plt
+
+    C = Compiler()
+
+    ## Allow user to select algorithm
+    # Display files  in algorithms folder
+    AvailableAlgorithms = [alg for alg in os.listdir(ALGORITHMS_PATH) if alg.endswith(".txt")]
+    print("Select which algorithm you would like to run: ")
+    for index, alg in enumerate(AvailableAlgorithms):
+        print(f"{index}. {alg.removesuffix(".txt")}")
 
-SelectedAlgorithm = AvailableAlgorithms[int(input())]
+    SelectedAlgorithm = AvailableAlgorithms[int(input())]
 
-# Open correct file and compile it
-with open(os.path.join(ALGORITHMS_PATH, f"{SelectedAlgorithm}"), 'r') as f:
+    # Compile correct file (or load its cached executable)
     print("Compiling...")
-    executable = C.Compile(f)
+    executable = C.CompileFile(os.path.join(ALGORITHMS_PATH, f"{SelectedAlgorithm}"))
     print("Compiled to executable!")
 
-## Allow user to select branch predictor to run
-while True:
-    print("Select Branch Predictor to run: ")
-    print("""0. Always Not Taken
+    ## Allow user to select branch predictor to run
+    while True:
+        print("Select Branch Predictor to run: ")
+        print("""0. Always Not Taken
 1. Always Taken
 2. One-Bit Last Time
 3. Two-Bit Last Time
 4. gshare""")
-    match input():
-        case '0':
-            predictor = CPU.DirectionPredictors.AlwaysNotTaken
-            break
-        case '1':
-            predictor = CPU.DirectionPredictors.AlwaysTaken
-            break
-        case '2':
-            predictor = CPU.DirectionPredictors.OneBitLastTime
-            break
-        case '3':
-            predictor = CPU.DirectionPredictors.TwoBitLastTime
-            break
-        case '4':
-            predictor = CPU.DirectionPredictors.gshare
-            break
-        case _:
-            continue
-
-P = Processor(predictor)
-
-## Run on processor
-debug = None
-while type(debug) != bool:
-    debug = input("Run in debug mode? (y/n): ").upper()
-    if debug == "Y":
-        debug = True
-    elif debug == "N":
-        debug = False
-
-predictionResults = P.Compute(executable, debug)
-
-## Display graph of mispredictions/cycles
-predictedY = [i for i in range(1, len(predictionResults["Predicted"]) + 1)]
-mispredictedY = [i for i in range(1, len(predictionResults["Mispredicted"]) + 1)]
-
-plt.title(SelectedAlgorithm)
-plt.xlabel("Cycles") 
-plt.ylabel("Total") 
-plt.plot(predictionResults["Mispredicted"], mispredictedY, "o-", color="blue", label="Mispredicted")
-plt.plot(predictionResults["Predicted"], predictedY, "o-", color="green", label="Predicted")
-plt.legend()
-plt.show()
+        match input():
+            case '0':
+                predictor = CPU.DirectionPredictors.AlwaysNotTaken
+                break
+            case '1':
+                predictor = CPU.DirectionPredictors.AlwaysTaken
+                break
+            case '2':
+                predictor = CPU.DirectionPredictors.OneBitLastTime
+                break
+            case '3':
+                predictor = CPU.DirectionPredictors.TwoBitLastTime
+                break
+            case '4':
+                predictor = CPU.DirectionPredictors.gshare
+                break
+            case _:
+                continue
+
+    P = Processor(predictor)
+
+    ## Run on processor
+    debug = None
+    while type(debug) != bool:
+        debug = input("Run in debug mode? (y/n): ").upper()
+        if debug == "Y":
+            debug = True
+        elif debug == "N":
+            debug = False
+
+    statistics = P.Compute(executable, debug, progressInterval=1.0)
+
+    ## Display graph of mispredictions/cycles
+    timeline = statistics.GetTimeline()
+    cycles = [cycle for cycle, predicted, mispredicted in timeline]
+
+    plt.title(SelectedAlgorithm)
+    plt.xlabel("Cycles")
+    plt.ylabel("Total")
+    plt.plot(cycles, [mispredicted for cycle, predicted, mispredicted in timeline], "o-", color="blue", label="Mispredicted")
+    plt.plot(cycles, [predicted for cycle, predicted, mispredicted in timeline], "o-", color="green", label="Predicted")
+    plt.legend()
+    plt.show()
+
+"""
+Runs every given algorithm under every given predictor without any prompts or per-cycle output, then writes the results to a file
+INPUTS: list command line arguments
+"""
+def RunBatch(arguments: list):
+    parser = argparse.ArgumentParser(description="Run algorithms on the simulated processor without any interaction")
+    parser.add_argument("algorithms", nargs='+', help="Algorithm file(s) to run")
+    parser.add_argument("-p", "--predictor", dest="predictors", action="append", choices=CPU.DirectionPredictors.PREDICTORS.keys(),
+                        help="Branch predictor(s) to run (can be given multiple times, defaults to all)")
+    parser.add_argument("-o", "--output", required=True, help="File to write results to (.csv for CSV, otherwise JSON)")
+    parser.add_argument("--progress", type=float, default=None, metavar="SECONDS",
+                        help="Report progress at most once every SECONDS seconds (off by default)")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="Directory to checkpoint each run to, so runs can be resumed after a crash by running the same command again (off by default)")
+    parser.add_argument("--checkpoint-interval", type=int, default=1 << 22, metavar="CYCLES", help="No. cycles between checkpoints")
+    parser.add_argument("--fast-forward", type=int, default=0, metavar="INSTRUCTIONS",
+                        help="Run the first INSTRUCTIONS instructions without the pipeline (much faster), then simulate the rest in the pipeline")
+    parser.add_argument("--no-warm-up", dest="warm_predictor", action="store_false",
+                        help="Don't train the predictor on branches while fast-forwarding")
+    args = parser.parse_args(arguments)
+    if args.checkpoint_dir is not None:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+
+    predictors = args.predictors if args.predictors is not None else list(CPU.DirectionPredictors.PREDICTORS.keys())
+
+    results = []
+    for algorithm in args.algorithms:
+        for predictorName in predictors:
+            if args.progress is not None:
+                print(f"Running {algorithm} with {predictorName}...")
+            checkpointPath = None
+            if args.checkpoint_dir is not None:
+                algorithmName = os.path.basename(algorithm).removesuffix(".txt")
+                checkpointPath = os.path.join(args.checkpoint_dir, f"{algorithmName}-{predictorName}.ckpt")
+            results.append(RunSimulation(algorithm, CPU.DirectionPredictors.PREDICTORS[predictorName], args.progress,
+                                         checkpointPath=checkpointPath, checkpointInterval=args.checkpoint_interval,
+                                         fastForward=args.fast_forward, warmPredictor=args.warm_predictor))
+
+    WriteResults(results, args.output)
 
 
+if __name__ == "__main__":
+    # No arguments = interactive mode
+    if len(sys.argv) > 1:
+        RunBatch(sys.argv[1:])
+    else:
+        RunInteractive()
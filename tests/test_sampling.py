@@ -0,0 +1,25 @@
+import os
+import unittest
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Batch import RunSimulation
+from Simulation.Sampling import RunSampled
+
+ALGORITHMS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "Algorithms")
+
+"""
+A program that exits before the first window must be run in full, giving the pipeline's exact results instead of nothing
+"""
+class TestSampledShortPrograms(unittest.TestCase):
+    def test_program_shorter_than_a_period_is_run_in_full(self):
+        algorithmPath = os.path.join(ALGORITHMS_PATH, "Bubble Sort.txt")
+        for predictorName, predictorClass in PREDICTORS.items():
+            with self.subTest(predictor=predictorName):
+                pipeline = RunSimulation(algorithmPath, predictorClass)
+                sampled = RunSampled(algorithmPath, predictorClass)
+                self.assertTrue(sampled["exact"])
+                self.assertEqual((sampled["instructions"], sampled["cycles"]), (pipeline["instructions"], pipeline["cycles"]))
+                self.assertAlmostEqual(sampled["mispredictionRate"], pipeline["mispredicted"] / (pipeline["predicted"] + pipeline["mispredicted"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Batch import RunSimulation
+from Simulation.Trace import ReadTrace, ReplayTrace, CreatePredictor
+
+ALGORITHMS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "Algorithms")
+
+"""
+Replaying a branch trace on the predictor that recorded it must give the same results as running the predictor in the pipeline,
+including w/ tables small enough to evict. Every other predictor/configuration must be refused
+"""
+class TestReplayMatchesPipeline(unittest.TestCase):
+    ALGORITHMS = ["Insertion Sort.txt", "Bubble Sort.txt", "Binary Search.txt"]
+    CONFIGURATIONS = [(4, 4, 4), (16, 8, 2), (64, 256, 8)] # (BTB size, direction buffer size, history length)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.tracePath = os.path.join(self.directory.name, "trace.btr")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_predictors_replay_their_own_traces(self):
+        for algorithm in self.ALGORITHMS:
+            algorithmPath = os.path.join(ALGORITHMS_PATH, algorithm)
+            for predictorName, predictorClass in PREDICTORS.items():
+                for btbSize, directionBufferSize, historyLength in self.CONFIGURATIONS:
+                    with self.subTest(algorithm=algorithm, predictor=predictorName,
+                                      btbSize=btbSize, directionBufferSize=directionBufferSize, historyLength=historyLength):
+                        pipeline = RunSimulation(algorithmPath, predictorClass, btbSize=btbSize, directionBufferSize=directionBufferSize,
+                                                 historyLength=historyLength, tracePath=self.tracePath)
+                        recording, events = ReadTrace(self.tracePath)
+                        replay = ReplayTrace(events, CreatePredictor(predictorClass, btbSize, directionBufferSize, historyLength), recording)
+                        self.assertEqual((replay["Predicted"], replay["Mispredicted"]), (pipeline["predicted"], pipeline["mispredicted"]))
+
+    def test_always_not_taken_replays_any_trace(self):
+        algorithmPath = os.path.join(ALGORITHMS_PATH, "Bubble Sort.txt")
+        RunSimulation(algorithmPath, PREDICTORS["TwoBitLastTime"], btbSize=4, directionBufferSize=4, tracePath=self.tracePath)
+        recording, events = ReadTrace(self.tracePath)
+        pipeline = RunSimulation(algorithmPath, PREDICTORS["AlwaysNotTaken"])
+        replay = ReplayTrace(events, CreatePredictor(PREDICTORS["AlwaysNotTaken"]), recording)
+        self.assertEqual((replay["Predicted"], replay["Mispredicted"]), (pipeline["predicted"], pipeline["mispredicted"]))
+
+    def test_other_predictors_and_configurations_are_refused(self):
+        algorithmPath = os.path.join(ALGORITHMS_PATH, "Bubble Sort.txt")
+        RunSimulation(algorithmPath, PREDICTORS["TwoBitLastTime"], tracePath=self.tracePath)
+        recording, events = ReadTrace(self.tracePath)
+        for predictorName, sizes in [("OneBitLastTime", ()), ("gshare", ()), ("TwoBitLastTime", (4, 4)), ("TwoBitLastTime", (64, 4))]:
+            with self.subTest(predictor=predictorName, sizes=sizes):
+                with self.assertRaises(Exception):
+                    ReplayTrace(events, CreatePredictor(PREDICTORS[predictorName], *sizes), recording)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from CPU.DirectionPredictors import PREDICTORS
+from Simulation.Batch import RunSimulation
+from Simulation.Trace import ReadTrace
+from Simulation.VectorEngine import VectorEngine, CreateConfigurations
+
+ALGORITHMS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "Algorithms")
+
+"""
+The vector engine must give the same results as running the predictor in the pipeline (Processor.Compute) on the configuration
+that recorded the trace, including w/ tables small enough to evict. Every other configuration must be refused
+"""
+class TestVectorEngineMatchesPipeline(unittest.TestCase):
+    ALGORITHMS = ["Insertion Sort.txt", "Bubble Sort.txt", "Binary Search.txt"]
+    CONFIGURATIONS = [(4, 4, 4), (16, 8, 2), (64, 256, 8)] # (BTB size, direction buffer size, history length)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.tracePath = os.path.join(self.directory.name, "trace.btr")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_configuration_that_recorded_trace(self):
+        for algorithm in self.ALGORITHMS:
+            algorithmPath = os.path.join(ALGORITHMS_PATH, algorithm)
+            for predictorName, predictorClass in PREDICTORS.items():
+                for btbSize, directionBufferSize, historyLength in self.CONFIGURATIONS:
+                    with self.subTest(algorithm=algorithm, predictor=predictorName,
+                                      btbSize=btbSize, directionBufferSize=directionBufferSize, historyLength=historyLength):
+                        pipeline = RunSimulation(algorithmPath, predictorClass, btbSize=btbSize, directionBufferSize=directionBufferSize,
+                                                 historyLength=historyLength, tracePath=self.tracePath)
+                        recording, events = ReadTrace(self.tracePath)
+                        configurations = CreateConfigurations(predictorClass, [btbSize], [directionBufferSize], [historyLength])
+                        results = VectorEngine(predictorClass, configurations).Replay(events, recording)[0]
+                        self.assertEqual((results["Predicted"], results["Mispredicted"]), (pipeline["predicted"], pipeline["mispredicted"]))
+
+    def test_other_configurations_are_refused(self):
+        algorithmPath = os.path.join(ALGORITHMS_PATH, "Bubble Sort.txt")
+        RunSimulation(algorithmPath, PREDICTORS["gshare"], btbSize=4, directionBufferSize=4, historyLength=4, tracePath=self.tracePath)
+        recording, events = ReadTrace(self.tracePath)
+        for predictorName, btbSizes, directionBufferSizes, historyLengths in [("gshare", [4, 16], [4], [4]),
+                                                                              ("gshare", [4], [4], [2]),
+                                                                              ("TwoBitLastTime", [4], [4], [4])]:
+            with self.subTest(predictor=predictorName, btbSizes=btbSizes, directionBufferSizes=directionBufferSizes, historyLengths=historyLengths):
+                configurations = CreateConfigurations(PREDICTORS[predictorName], btbSizes, directionBufferSizes, historyLengths)
+                with self.assertRaises(Exception):
+                    VectorEngine(PREDICTORS[predictorName], configurations).Replay(events, recording)
+
+
+if __name__ == "__main__":
+    unittest.main()